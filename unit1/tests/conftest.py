@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tool modules are imported on their own, without the tools package __init__ (and its other tools)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+
+import get_timezone
+from get_timezone import FindTimezone, GeocodeCache
+
+PLACES = {"tokyo": (35.68, 139.76), "paris": (48.85, 2.35)}
+
+
+@pytest.fixture
+def geocoder(monkeypatch, tmp_path):
+    """Offline Nominatim stand-in that counts lookups, with a fresh SQLite cache."""
+    lookups = []
+
+    def fake_geocode(query):
+        lookups.append(query)
+        position = PLACES.get(query.lower())
+        return SimpleNamespace(latitude=position[0], longitude=position[1]) if position else None
+
+    monkeypatch.setattr(get_timezone, "_rate_limited_geocode", fake_geocode)
+    monkeypatch.setattr(get_timezone, "_geocode_cache", GeocodeCache(str(tmp_path / "geocode.sqlite")))
+    return lookups
+
+
+def test_batch_is_split_and_duplicates_are_geocoded_once(geocoder):
+    result = FindTimezone().forward("Tokyo; Paris ;Tokyo;;")
+
+    assert geocoder == ["Tokyo", "Paris"]
+    answers = result.split("\n\n")
+    assert len(answers) == 3  # one answer per requested place, in order
+    assert "Asia/Tokyo" in answers[0] and "Europe/Paris" in answers[1] and answers[2] == answers[0]
+
+
+def test_places_are_cached_across_calls(geocoder):
+    FindTimezone().forward("Paris")
+    assert "Europe/Paris" in FindTimezone().forward("  PARIS ")  # the key ignores case and whitespace
+    assert geocoder == ["Paris"]
+
+
+def test_not_found_places_expire_after_the_ttl(geocoder, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(get_timezone.time, "time", lambda: now[0])
+    tool = FindTimezone()
+
+    assert tool.forward("Atlantis") == "Could not find location: Atlantis"
+    assert tool.forward("Atlantis") == "Could not find location: Atlantis"
+    assert geocoder == ["Atlantis"]  # the miss is cached
+
+    now[0] += get_timezone.NOT_FOUND_TTL + 1
+    tool.forward("Atlantis")
+    assert geocoder == ["Atlantis", "Atlantis"]  # retried once the miss is a day old
@@ -2,41 +2,144 @@ from typing import Any, Optional
 from smolagents.tools import Tool
 from timezonefinder import TimezoneFinder
 from geopy.geocoders import Nominatim
+import os
+import sqlite3
+import threading
+import time
+
+# Nominatim's usage policy: at most one request per second, with an identifying user agent
+NOMINATIM_USER_AGENT = "smolagents_timezone_finder/1.0"
+NOMINATIM_MIN_DELAY_SECONDS = 1.0
+GEOCODE_TIMEOUT = 10
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tool_cache", "geocode.sqlite"),
+)
+NOT_FOUND_TTL = 24 * 3600  # unknown places are retried after a day
+BATCH_SEPARATOR = ";"
+
+
+# process-wide objects shared by every FindTimezone instance, created on first use
+_timezone_finder = None
+_geolocator = None
+_last_geocode_at = 0.0
+_shared_lock = threading.Lock()
+_geocode_lock = threading.Lock()
+
+
+def get_timezone_finder() -> TimezoneFinder:
+    global _timezone_finder
+    with _shared_lock:
+        if _timezone_finder is None:
+            _timezone_finder = TimezoneFinder()
+    return _timezone_finder
+
+
+def _rate_limited_geocode(query: str):
+    """Geocodes with Nominatim, never more often than once per NOMINATIM_MIN_DELAY_SECONDS across threads."""
+    global _geolocator, _last_geocode_at
+    with _geocode_lock:
+        if _geolocator is None:
+            _geolocator = Nominatim(user_agent=NOMINATIM_USER_AGENT)
+        wait = _last_geocode_at + NOMINATIM_MIN_DELAY_SECONDS - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return _geolocator.geocode(query, timeout=GEOCODE_TIMEOUT)
+        finally:
+            _last_geocode_at = time.monotonic()
+
+
+class GeocodeCache:
+    """Persistent query -> (latitude, longitude) map; a None position records a place Nominatim did not find."""
+
+    def __init__(self, path: str = GEOCODE_CACHE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode (query TEXT PRIMARY KEY, latitude REAL, longitude REAL, cached_at REAL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def get(self, query: str):
+        """Returns (latitude, longitude), None for a known miss, or False when the query is not cached."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT latitude, longitude, cached_at FROM geocode WHERE query = ?", (self._key(query),)
+            ).fetchone()
+        if row is None:
+            return False
+        if row[0] is None:
+            return None if time.time() - row[2] < NOT_FOUND_TTL else False
+        return row[0], row[1]
+
+    def set(self, query: str, position):
+        latitude, longitude = position if position is not None else (None, None)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", (self._key(query), latitude, longitude, time.time())
+            )
+            self._db.commit()
+
+
+_geocode_cache = None
+
+
+def get_geocode_cache() -> GeocodeCache:
+    global _geocode_cache
+    with _shared_lock:
+        if _geocode_cache is None:
+            _geocode_cache = GeocodeCache()
+    return _geocode_cache
+
+
+def geocode(query: str):
+    """(latitude, longitude) of `query`, or None if it cannot be found; cached across runs."""
+    cache = get_geocode_cache()
+    position = cache.get(query)
+    if position is not False:
+        return position
+    location = _rate_limited_geocode(query)
+    position = (location.latitude, location.longitude) if location is not None else None
+    cache.set(query, position)
+    return position
+
 
 class FindTimezone(Tool):
     name = "find_timezone_of_location"
-    description = "This tool helps to find the timezone of a specific location"
-    inputs = {'query': {'type': 'string', 'description': 'The string desription of the location we want the timezone of.'}}
+    description = ("This tool helps to find the timezone of a specific location. "
+                   f"To look up several locations in one call, separate them with '{BATCH_SEPARATOR}' "
+                   "(e.g. 'Tokyo; Paris; New York').")
+    inputs = {'query': {'type': 'string', 'description': "The string desription of the location we want the timezone of, "
+                                                         f"or several locations separated by '{BATCH_SEPARATOR}'."}}
     output_type = "string"
 
     def __init__(self, **kwargs):
         super().__init__()
+        # the geocoder and the timezone index are shared by all instances and created on first use
 
-        # defensive import of packages to ensure agent knows if something in the tool goes wrong
-        try:
-            from timezonefinder import TimezoneFinder
-        except ImportError as e:
-            raise ImportError("The package timezonefinder is not installed. Please install the package.") from e
-        
-        try:
-            from geopy.geocoders import Nominatim
-        except ImportError as e:
-            raise ImportError("The package geopy is not installed. Please install the package.") from e
-        
-        # creating objects for later search
-        self.geolocator = Nominatim(user_agent="smolagents_timezone_finder/1.0")
-        self.timezone_finder = TimezoneFinder()
-
-    def forward(self, query) -> str:
+    def _find(self, query: str) -> str:
         try:
             # get the longitude and latitude of the location
-            location = self.geolocator.geocode(query, timeout=10)
-            if location is None:
+            position = geocode(query)
+            if position is None:
                 return f"Could not find location: {query}"
-            
-            tz = self.timezone_finder.timezone_at(lng=location.longitude, lat=location.latitude)
-            
+            latitude, longitude = position
+
+            tz = get_timezone_finder().timezone_at(lng=longitude, lat=latitude)
+
             # merge results into a string
-            return f"Location: {query}\nLongitude: {location.longitude}\nLatitude: {location.latitude}\nTimezone: {tz}"
+            return f"Location: {query}\nLongitude: {longitude}\nLatitude: {latitude}\nTimezone: {tz}"
         except Exception as e:
-            return f"Error finding timezone for {query}: {str(e)}"
\ No newline at end of file
+            return f"Error finding timezone for {query}: {str(e)}"
+
+    def forward(self, query) -> str:
+        queries = [q.strip() for q in query.split(BATCH_SEPARATOR) if q.strip()] or [query]
+        # duplicates are answered once; uncached places are geocoded one per second
+        results = {q: self._find(q) for q in dict.fromkeys(queries)}
+        return "\n\n".join(results[q] for q in queries)
@@ -6,18 +6,21 @@ from llama_index.core.workflow import Context
 
 def create_alfred_agent():
 
-    retriever_agent = get_retriever_agent_as_tool()
-
     llm = HuggingFaceInferenceAPI(model_name="Qwen/Qwen2.5-Coder-32B-Instruct", max_new_tokens=4096, timeout=120)
 
+    # direct retrieval by default (INVITEES_TOOL_MODE): guest questions cost no extra LLM calls
+    retriever_agent = get_retriever_agent_as_tool(llm=llm)
+
 
     tool_list =[retriever_agent, 
                 toolbox.get_most_downloaded_model_by_creator_tool, 
                 toolbox.websearch_tool, 
                 toolbox.get_latest_news_tool,
                 toolbox.get_coordinates_tool,
+                toolbox.get_coordinates_batch_tool,
                 toolbox.get_weather_forecast_tool,
-                toolbox.get_current_weather_tool]
+                toolbox.get_current_weather_tool,
+                toolbox.get_full_output_tool]
 
     tool_descriptions = "\n".join([f"{tool.metadata.name}: {tool.metadata.description}" for tool in tool_list])
 
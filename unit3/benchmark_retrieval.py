@@ -0,0 +1,114 @@
+"""
+Recall@k and latency of dense-only vs hybrid (BM25 + dense, RRF) invitee retrieval.
+
+    python benchmark_retrieval.py                                # invitees.parquet, generated queries
+    python benchmark_retrieval.py guests.parquet --queries q.jsonl --k 1 3 5
+
+The parquet is indexed into a scratch Chroma directory with indexer.py. Without --queries, every
+guest gets a name query ("Tell me about Ada Lovelace") and a rare-token query built from the two
+description words that fewest guests share. A --queries file has one JSON object per line:
+{"query": "...", "expected": ["<guest name or email>", ...]}.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from hybrid_retriever import tokenize
+from indexer import PARQUET_PATH, build_index, iter_rows, row_id
+from retriever import build_retriever
+
+MODES = ("dense", "hybrid")
+
+
+def generated_queries(parquet_path: str) -> list[dict]:
+    rows = list(iter_rows(parquet_path))
+    doc_freq = Counter(term for row in rows for term in set(tokenize(str(row.get("description", "")))))
+    queries = []
+    for row in rows:
+        if row.get("name"):
+            queries.append({"kind": "name", "query": f"Tell me about {row['name']}", "expected": [row_id(row)]})
+        name_terms = set(tokenize(str(row.get("name", ""))))
+        rare = sorted((t for t in set(tokenize(str(row.get("description", "")))) if t not in name_terms),
+                      key=lambda t: (doc_freq[t], t))[:2]
+        if rare:
+            queries.append({"kind": "rare", "query": f"Which guest is connected to {' and '.join(rare)}?",
+                            "expected": [row_id(row)]})
+    return queries
+
+
+def load_queries(path: str, parquet_path: str) -> list[dict]:
+    """Maps the guest names/emails in `expected` to indexer ids."""
+    ids = {}
+    for row in iter_rows(parquet_path):
+        for column in ("name", "email"):
+            if row.get(column):
+                ids[str(row[column]).strip().lower()] = row_id(row)
+    with open(path, "r", encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    for query in queries:
+        query.setdefault("kind", "file")
+        query["expected"] = [ids.get(str(e).strip().lower(), e) for e in query["expected"]]
+    return queries
+
+
+def evaluate(retriever, queries: list[dict], ks: list[int]) -> dict:
+    """Recall@k per query kind and overall, plus retrieval latency in ms."""
+    latencies, hits = [], {k: [] for k in ks}
+    for query in queries:
+        start = time.perf_counter()
+        results = asyncio.run(retriever.aretrieve(query["query"]))
+        latencies.append(1000 * (time.perf_counter() - start))
+        ranked = [hit.node.node_id for hit in results]
+        for k in ks:
+            hits[k].append(len(set(ranked[:k]) & set(query["expected"])) / len(query["expected"]))
+    kinds = sorted({q["kind"] for q in queries})
+    recall = {k: {kind: float(np.mean([h for h, q in zip(hits[k], queries) if q["kind"] == kind])) for kind in kinds}
+              for k in ks}
+    for k in ks:
+        recall[k]["all"] = float(np.mean(hits[k]))
+    return {"recall": recall, "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95))}
+
+
+def run_benchmark(parquet_path: str = PARQUET_PATH, queries: list[dict] | None = None, ks=(1, 3, 5),
+                  embed_model=None) -> dict:
+    ks = sorted(ks)
+    queries = queries if queries is not None else generated_queries(parquet_path)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="invitees-bench-") as chroma_path:
+        build_index(parquet_path, chroma_path, embed_model)
+        for mode in MODES:
+            retriever = build_retriever(similarity_top_k=ks[-1], mode=mode, embed_model=embed_model,
+                                        chroma_path=chroma_path)
+            evaluate(retriever, queries[:1], ks)  # warm-up: model load, first Chroma query
+            results[mode] = evaluate(retriever, queries, ks)
+    return results
+
+
+def print_report(results: dict, queries: list[dict]):
+    kinds = sorted({q["kind"] for q in queries}) + ["all"]
+    print(f"{len(queries)} queries ({', '.join(f'{n} {kind}' for kind, n in Counter(q['kind'] for q in queries).items())})")
+    print(f"{'mode':>7} {'k':>3} " + " ".join(f"{'recall ' + kind:>14}" for kind in kinds) + f" {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, result in results.items():
+        for k, recall in result["recall"].items():
+            print(f"{mode:>7} {k:>3} " + " ".join(f"{recall[kind]:>14.3f}" for kind in kinds)
+                  + f" {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("parquet_path", nargs="?", default=PARQUET_PATH)
+    parser.add_argument("--queries", help="JSONL file of {query, expected} objects")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries, args.parquet_path) if args.queries else generated_queries(args.parquet_path)
+    print_report(run_benchmark(args.parquet_path, queries, args.k), queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DB_PATH = os.getenv(
+    "TOOL_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tool_cache", "tool_cache.sqlite")
+)
+MEMORY_ITEMS = 1024
+PURGE_EVERY_WRITES = 500  # expired rows are deleted on open and then every this many writes
+
+
+def make_key(*parts) -> str:
+    return json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+##### Persistent TTL cache (SQLite on disk, LRU dict in front) #####
+
+class PersistentCache:
+    """
+    Small key/value cache for tool results that survives restarts.
+
+    Entries live in a SQLite table per `namespace` with an absolute expiry time; hot
+    entries are also kept in an in-process LRU so repeated hits never touch the disk.
+    Values must be JSON-serializable. Expired rows are deleted when the cache is opened and
+    every PURGE_EVERY_WRITES writes, so the file does not keep growing.
+    """
+
+    def __init__(self, namespace: str, path: str = CACHE_DB_PATH, memory_items: int = MEMORY_ITEMS):
+        self.namespace = namespace
+        self.memory_items = memory_items
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key TEXT, value TEXT, expires_at REAL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._db.commit()
+        self.purge_expired()
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                ).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return default
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value, ttl: float):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at),
+            )
+            self._db.commit()
+            self._remember(key, (value, expires_at))
+            self._writes += 1
+            if self._writes % PURGE_EVERY_WRITES == 0:
+                self._purge_expired_locked()
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+            self._db.commit()
+            self._memory.clear()
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired_locked()
+
+    def _purge_expired_locked(self):
+        now = time.time()
+        self._db.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        self._db.commit()
+        for key in [key for key, (_, expires_at) in self._memory.items() if expires_at <= now]:
+            del self._memory[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
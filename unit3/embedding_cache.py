@@ -0,0 +1,208 @@
+"""
+Embedding cache around a llama_index embed model.
+
+Vectors are keyed by (model name, kind, text hash). Query vectors stay in an in-process LRU so a
+repeated guest question never reaches the model; every vector is also written to SQLite as
+float16 (EMBEDDING_CACHE_DTYPE) so documents and queries survive restarts and re-indexing.
+Query and document embeddings are cached separately because bge prefixes queries with an
+instruction, so the same text embeds differently in the two roles.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tool_cache", "embeddings.sqlite"),
+)
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+MEMORY_QUERIES = 4096
+SQL_BATCH = 500  # keys per IN (...) lookup, below SQLite's variable limit
+
+
+def text_key(kind: str, text: str) -> str:
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+##### Disk store #####
+
+class EmbeddingStore:
+    """SQLite table of (model, key) -> vector blob, stored as EMBEDDING_CACHE_DTYPE."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, dtype: str = EMBEDDING_CACHE_DTYPE):
+        self.dtype = np.dtype(dtype)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT, key TEXT, dtype TEXT, vector BLOB, "
+            "PRIMARY KEY (model, key))"
+        )
+        self._db.commit()
+
+    def get_many(self, model: str, keys: list[str]) -> dict:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), SQL_BATCH):
+                chunk = keys[i:i + SQL_BATCH]
+                rows = self._db.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(chunk))})",
+                    (model, *chunk),
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+        return found
+
+    def set_many(self, model: str, items: dict):
+        rows = [(model, key, self.dtype.name, np.asarray(vector, dtype=self.dtype).tobytes())
+                for key, vector in items.items()]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def clear(self, model: str | None = None):
+        with self._lock:
+            if model is None:
+                self._db.execute("DELETE FROM embeddings")
+            else:
+                self._db.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            self._db.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> EmbeddingStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+    return _store
+
+
+##### Cached embed model #####
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps another embed model; only texts missing from both cache tiers are embedded.
+
+        embed_model = CachedEmbedding(HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5"))
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _store: EmbeddingStore = PrivateAttr()
+    _queries: OrderedDict = PrivateAttr()
+    _stats: Counter = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, store: EmbeddingStore | None = None, **kwargs):
+        kwargs.setdefault("model_name", inner.model_name)
+        kwargs.setdefault("embed_batch_size", inner.embed_batch_size)
+        super().__init__(**kwargs)
+        self._inner = inner
+        self._store = store or get_embedding_store()
+        self._queries = OrderedDict()
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _lookup(self, kind: str, texts: list[str]) -> tuple[list[str], dict]:
+        """Returns the keys of `texts` and whatever either tier already holds for them."""
+        keys = [text_key(kind, text) for text in texts]
+        found = {}
+        if kind == "query":
+            with self._lock:
+                for key in keys:
+                    if key in self._queries:
+                        self._queries.move_to_end(key)
+                        found[key] = self._queries[key]
+            self._count(kind, "memory", len(found))
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        from_disk = self._store.get_many(self.model_name, missing) if missing else {}
+        self._count(kind, "disk", len(from_disk))
+        found.update(from_disk)
+        if kind == "query":
+            self._remember_queries(from_disk)
+        return keys, found
+
+    def _save(self, kind: str, computed: dict):
+        self._count(kind, "computed", len(computed))
+        if computed:
+            self._store.set_many(self.model_name, computed)
+        if kind == "query":
+            self._remember_queries(computed)
+
+    def _remember_queries(self, vectors: dict):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._queries[key] = vector
+                self._queries.move_to_end(key)
+            while len(self._queries) > MEMORY_QUERIES:
+                self._queries.popitem(last=False)
+
+    def _count(self, kind: str, tier: str, n: int):
+        with self._lock:
+            self._stats[(kind, tier)] += n
+
+    def stats(self) -> dict:
+        """Hits per tier, computed embeddings and hit rate, for queries and documents."""
+        with self._lock:
+            counts = dict(self._stats)
+        result = {}
+        for kind in ("query", "text"):
+            memory, disk, computed = (counts.get((kind, tier), 0) for tier in ("memory", "disk", "computed"))
+            total = memory + disk + computed
+            result[kind] = {"memory_hits": memory, "disk_hits": disk, "computed": computed,
+                            "hit_rate": (memory + disk) / total if total else 0.0}
+        return result
+
+    ### BaseEmbedding interface
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        (key,), found = self._lookup("query", [query])
+        if key not in found:
+            found[key] = self._inner.get_query_embedding(query)
+            self._save("query", {key: found[key]})
+        return found[key]
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        (key,), found = self._lookup("query", [query])
+        if key not in found:
+            found[key] = await self._inner.aget_query_embedding(query)
+            self._save("query", {key: found[key]})
+        return found[key]
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        keys, found = self._lookup("text", texts)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(zip(missing, self._inner.get_text_embedding_batch(list(missing.values()))))
+            self._save("text", computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        keys, found = self._lookup("text", texts)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(zip(missing, await self._inner.aget_text_embedding_batch(list(missing.values()))))
+            self._save("text", computed)
+            found.update(computed)
+        return [found[key] for key in keys]
@@ -0,0 +1,169 @@
+"""
+Hybrid invitee retrieval: BM25 over an in-memory inverted index plus the dense Chroma retriever,
+queried concurrently and merged with reciprocal rank fusion (RRF).
+
+Dense similarity misses exact names and rare tokens ("Lady Ada Lovelace", "gluten"); BM25 finds
+them directly, and RRF only needs the two rank orders, so their scores never have to be calibrated.
+"""
+import asyncio
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+CANDIDATES_PER_LEG = 10   # each leg contributes at least this many ranks to the fusion
+COLLECTION_PAGE = 10_000
+
+TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has he her his i in is it its me my of on or our she so that the "
+    "their them they this to was we were what which who whom with you your about tell does do did any".split()
+)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-retriever")
+
+
+def candidate_count(similarity_top_k: int) -> int:
+    """How many hits each leg should return before fusion."""
+    return max(CANDIDATES_PER_LEG, 3 * similarity_top_k)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+##### BM25 over array-backed postings #####
+
+class BM25Index:
+    """
+    Inverted index in CSR form: the postings of term t are doc_ids/tfs[offsets[t]:offsets[t + 1]].
+    A handful of numpy arrays instead of per-term Python lists keeps it small and fast to score.
+    """
+
+    def __init__(self, nodes: list[TextNode], k1: float = BM25_K1, b: float = BM25_B):
+        self.nodes = nodes
+        vocabulary, term_ids, doc_ids, tfs = {}, [], [], []
+        doc_len = np.zeros(len(nodes), dtype=np.float32)
+        for doc, node in enumerate(nodes):
+            tokens = tokenize(node.get_content())
+            doc_len[doc] = len(tokens)
+            terms, counts = np.unique(np.array([vocabulary.setdefault(t, len(vocabulary)) for t in tokens], dtype=np.int64),
+                                      return_counts=True)
+            term_ids.append(terms)
+            doc_ids.append(np.full(len(terms), doc, dtype=np.int32))
+            tfs.append(counts)
+
+        term_ids = np.concatenate(term_ids) if term_ids else np.zeros(0, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        self.vocabulary = vocabulary
+        self.doc_ids = np.concatenate(doc_ids)[order] if doc_ids else np.zeros(0, dtype=np.int32)
+        self.tfs = np.concatenate(tfs)[order].astype(np.float32) if tfs else np.zeros(0, dtype=np.float32)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)))])
+
+        doc_freq = np.diff(self.offsets)
+        self.idf = np.log1p((len(nodes) - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        average = doc_len.mean() if len(nodes) else 1.0
+        self.k1 = k1
+        self.norm = (k1 * (1 - b + b * doc_len / max(average, 1e-9))).astype(np.float32)  # per-document tf damping
+
+    @classmethod
+    def from_collection(cls, collection, **kwargs) -> "BM25Index":
+        """Builds the index from the nodes stored in a Chroma collection (written by indexer.py)."""
+        nodes, offset = [], 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=COLLECTION_PAGE, offset=offset)
+            for node_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                try:
+                    node = metadata_dict_to_node(metadata, text=text)
+                except Exception:
+                    node = TextNode(id_=node_id, text=text or "", metadata=metadata or {})
+                nodes.append(node)
+            if len(page["ids"]) < COLLECTION_PAGE:
+                return cls(nodes, **kwargs)
+            offset += COLLECTION_PAGE
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.nodes), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocabulary.get(term)
+            if t is None:
+                continue
+            lo, hi = self.offsets[t], self.offsets[t + 1]
+            docs, tf = self.doc_ids[lo:hi], self.tfs[lo:hi]
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + self.norm[docs])  # docs are unique per term
+        return scores
+
+    def search(self, query: str, top_k: int) -> list[NodeWithScore]:
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores)
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [NodeWithScore(node=self.nodes[i], score=float(scores[i])) for i in hits]
+
+
+##### Rank fusion #####
+
+def reciprocal_rank_fusion(rankings: list[list[NodeWithScore]], top_k: int, k: int = RRF_K) -> list[NodeWithScore]:
+    """score(d) = sum over rankings of 1 / (k + rank of d), ranks starting at 1."""
+    fused, nodes = {}, {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            node_id = hit.node.node_id
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank)
+            nodes.setdefault(node_id, hit.node)
+    best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [NodeWithScore(node=nodes[node_id], score=fused[node_id]) for node_id in best]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs the dense retriever and BM25 side by side and fuses their rankings.
+
+    With `version_fn` and `bm25_loader`, the BM25 index is rebuilt by `bm25_loader()` whenever
+    `version_fn()` (the indexer's index_version) changes, so it follows guests added, changed or deleted.
+    """
+
+    def __init__(self, vector_retriever: BaseRetriever, bm25: BM25Index, similarity_top_k: int = 3,
+                 rrf_k: int = RRF_K, version_fn=None, bm25_loader=None, **kwargs):
+        super().__init__(**kwargs)
+        self.vector_retriever = vector_retriever
+        self.bm25 = bm25
+        self.similarity_top_k = similarity_top_k
+        self.rrf_k = rrf_k
+        self.candidates = candidate_count(similarity_top_k)
+        self.version_fn = version_fn
+        self.bm25_loader = bm25_loader
+        self._version = version_fn() if version_fn else None
+        self._bm25_lock = threading.Lock()
+
+    def _current_bm25(self) -> BM25Index:
+        if self.version_fn is not None:
+            version = self.version_fn()
+            with self._bm25_lock:
+                if version != self._version:
+                    self.bm25 = self.bm25_loader()
+                    self._version = version
+        return self.bm25
+
+    def _search_bm25(self, query: str) -> list[NodeWithScore]:
+        return self._current_bm25().search(query, self.candidates)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        lexical = _executor.submit(self._search_bm25, query_bundle.query_str)
+        dense = self.vector_retriever.retrieve(query_bundle)
+        return reciprocal_rank_fusion([dense, lexical.result()], self.similarity_top_k, self.rrf_k)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        dense, lexical = await asyncio.gather(
+            self.vector_retriever.aretrieve(query_bundle),
+            asyncio.get_running_loop().run_in_executor(_executor, self._search_bm25, query_bundle.query_str),
+        )
+        return reciprocal_rank_fusion([dense, lexical], self.similarity_top_k, self.rrf_k)
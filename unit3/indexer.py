@@ -0,0 +1,182 @@
+"""
+Builds and incrementally updates the invitees vector index from invitees.parquet.
+
+Every row gets a stable id and a content hash. Rows whose hash is already stored in the
+Chroma collection are skipped, so only new or changed guests are embedded; guests that
+disappeared from the parquet are deleted. Re-running on unchanged data embeds nothing.
+
+    python indexer.py [path/to/invitees.parquet]
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+import pyarrow.parquet as pq
+
+PARQUET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "invitees.parquet")
+CHROMA_PATH = "./invitees_chroma_db"
+COLLECTION_NAME = "alfred"
+EMBED_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+ID_COLUMNS = ("email", "name")     # first non-empty one identifies a guest across updates
+READ_BATCH_ROWS = 10_000
+EMBED_BATCH_SIZE = 256
+WRITE_BATCH_SIZE = 4096
+STORED_IDS_PAGE = 10_000
+INDEX_VERSION_FILE = "index_version"  # inside the Chroma directory; rewritten whenever a build changes rows
+
+
+def row_id(row: dict) -> str:
+    key = next((str(row[c]).strip().lower() for c in ID_COLUMNS if row.get(c)), None)
+    if key is None:
+        key = json.dumps(row, sort_keys=True, default=str)
+    return "guest-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(row: dict) -> str:
+    return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def row_text(row: dict) -> str:
+    return "\n".join(f"{column.capitalize()}: {value}" for column, value in row.items() if value is not None)
+
+
+def iter_rows(parquet_path: str = PARQUET_PATH, batch_rows: int = READ_BATCH_ROWS):
+    """Streams the parquet file in record batches instead of loading it whole."""
+    parquet_file = pq.ParquetFile(parquet_path)
+    # a DataFrame index saved by pandas is not guest data and must not change the hashes
+    pandas_index = (parquet_file.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+    columns = [name for name in parquet_file.schema_arrow.names if name not in pandas_index]
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+        yield from batch.to_pylist()
+
+
+def get_collection(path: str = CHROMA_PATH, name: str = COLLECTION_NAME):
+    import chromadb
+
+    return chromadb.PersistentClient(path=path).get_or_create_collection(name=name)
+
+
+def index_version(chroma_path: str = CHROMA_PATH) -> str:
+    """Changes every time build_index adds, updates or deletes guests; caches of answers key on it."""
+    try:
+        with open(os.path.join(chroma_path, INDEX_VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def _bump_index_version(chroma_path: str):
+    path = os.path.join(chroma_path, INDEX_VERSION_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(f"{time.time():.6f}-{uuid.uuid4().hex[:8]}")
+    os.replace(path + ".tmp", path)
+
+
+def stored_metadata(collection) -> dict:
+    """id -> metadata of everything already in the collection, read page by page."""
+    metadata_by_id = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=STORED_IDS_PAGE, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            metadata_by_id[doc_id] = metadata or {}
+        if len(page["ids"]) < STORED_IDS_PAGE:
+            return metadata_by_id
+        offset += STORED_IDS_PAGE
+
+
+def stored_hashes(collection) -> dict:
+    """id -> content_hash of everything already in the collection."""
+    return {doc_id: metadata.get("content_hash") for doc_id, metadata in stored_metadata(collection).items()}
+
+
+def stored_guest_names(chroma_path: str = CHROMA_PATH) -> list[str]:
+    return [m["name"] for m in stored_metadata(get_collection(chroma_path)).values() if m.get("name")]
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _write(vector_store, collection, embed_model, pending: list):
+    """Embeds `pending` (id, hash, row) in large batches and replaces their entries in the store."""
+    from llama_index.core.schema import TextNode
+
+    texts = [row_text(row) for _, _, row in pending]
+    embeddings = []
+    for chunk in _chunks(texts, EMBED_BATCH_SIZE):
+        embeddings.extend(embed_model.get_text_embedding_batch(chunk))
+    nodes = [
+        TextNode(id_=doc_id, text=text, embedding=embedding,
+                 metadata={"name": str(row.get("name", "")), "content_hash": digest},
+                 excluded_embed_metadata_keys=["content_hash"], excluded_llm_metadata_keys=["content_hash"])
+        for (doc_id, digest, row), text, embedding in zip(pending, texts, embeddings)
+    ]
+    collection.delete(ids=[doc_id for doc_id, _, _ in pending])  # Chroma `add` does not overwrite
+    for chunk in _chunks(nodes, WRITE_BATCH_SIZE):
+        vector_store.add(chunk)
+
+
+def build_index(parquet_path: str = PARQUET_PATH, chroma_path: str = CHROMA_PATH, embed_model=None) -> dict:
+    """Brings the Chroma collection in line with the parquet file; returns counts of what changed."""
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    start = time.time()
+    collection = get_collection(chroma_path)
+    vector_store = ChromaVectorStore(chroma_collection=collection)
+    existing = stored_hashes(collection)
+
+    stats = {"rows": 0, "new": 0, "changed": 0, "unchanged": 0, "deleted": 0}
+    seen, pending = set(), []
+    for row in iter_rows(parquet_path):
+        stats["rows"] += 1
+        doc_id, digest = row_id(row), content_hash(row)
+        if doc_id in seen:
+            continue  # duplicate guest in the file: the first row wins
+        seen.add(doc_id)
+        if existing.get(doc_id) == digest:
+            stats["unchanged"] += 1
+            continue
+        stats["changed" if doc_id in existing else "new"] += 1
+        pending.append((doc_id, digest, row))
+        if len(pending) >= WRITE_BATCH_SIZE:
+            embed_model = embed_model or get_embed_model()
+            _write(vector_store, collection, embed_model, pending)
+            pending = []
+    if pending:
+        embed_model = embed_model or get_embed_model()
+        _write(vector_store, collection, embed_model, pending)
+
+    removed = [doc_id for doc_id in existing if doc_id not in seen]
+    for chunk in _chunks(removed, WRITE_BATCH_SIZE):
+        collection.delete(ids=chunk)
+    stats["deleted"] = len(removed)
+    if stats["new"] or stats["changed"] or stats["deleted"] or not index_version(chroma_path):
+        _bump_index_version(chroma_path)
+    stats["seconds"] = round(time.time() - start, 2)
+    return stats
+
+
+_embed_model = None
+_embed_model_lock = threading.Lock()
+
+
+def get_embed_model():
+    """bge-small behind the embedding cache, loaded once and shared by indexing and query-time retrieval."""
+    global _embed_model
+    with _embed_model_lock:
+        if _embed_model is None:
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+            from embedding_cache import CachedEmbedding
+
+            _embed_model = CachedEmbedding(HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME))
+    return _embed_model
+
+
+if __name__ == "__main__":
+    print(build_index(sys.argv[1] if len(sys.argv) > 1 else PARQUET_PATH))
@@ -1,23 +1,27 @@
+import os
 from llama_index.core import VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core.tools import QueryEngineTool, FunctionTool
 import chromadb
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
 from llama_index.core.agent.workflow import AgentWorkflow
+from llama_index.core.query_engine import RetrieverQueryEngine
 from dotenv import load_dotenv
+from indexer import CHROMA_PATH, COLLECTION_NAME, get_embed_model, index_version
+from hybrid_retriever import BM25Index, HybridRetriever, candidate_count
+from semantic_cache import SEMANTIC_CACHE_ENABLED, GuestEntities, SemanticCache
 
 load_dotenv()
 
 
-def build_retriever_agent(llm=None, similarity_top_k=3) -> AgentWorkflow:
-    if llm is None:
-        llm = HuggingFaceInferenceAPI(model_name="Qwen/Qwen2.5-Coder-32B-Instruct")
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+def build_retriever(similarity_top_k=3, mode="hybrid", embed_model=None, chroma_path=CHROMA_PATH):
+    """Dense-only ("dense") or BM25 + dense with rank fusion ("hybrid") retriever over the invitees collection."""
+    if embed_model is None:
+        embed_model = get_embed_model()  # repeated questions skip the bge forward pass
 
-    # Load the existing ChromaDB database
-    db = chromadb.PersistentClient(path="./invitees_chroma_db")
-    collection = db.get_or_create_collection(name="alfred")
+    # Load the ChromaDB database built by indexer.py
+    db = chromadb.PersistentClient(path=chroma_path)
+    collection = db.get_or_create_collection(name=COLLECTION_NAME)
     vector_store = ChromaVectorStore(chroma_collection=collection)
 
     # Create index from the vector store
@@ -25,11 +29,26 @@ def build_retriever_agent(llm=None, similarity_top_k=3) -> AgentWorkflow:
         vector_store=vector_store, 
         embed_model=embed_model
     )
+    if mode == "dense":
+        return index.as_retriever(similarity_top_k=similarity_top_k)
+
+    bm25 = BM25Index.from_collection(collection)
+    vector_retriever = index.as_retriever(similarity_top_k=candidate_count(similarity_top_k))
+    # BM25 lives in memory, so it is rebuilt whenever indexer.build_index changes the guests
+    return HybridRetriever(vector_retriever, bm25, similarity_top_k=similarity_top_k,
+                           version_fn=lambda: index_version(chroma_path),
+                           bm25_loader=lambda: BM25Index.from_collection(collection))
+
+
+def build_retriever_agent(llm=None, similarity_top_k=3) -> AgentWorkflow:
+    if llm is None:
+        llm = HuggingFaceInferenceAPI(model_name="Qwen/Qwen2.5-Coder-32B-Instruct")
+    retriever = build_retriever(similarity_top_k=similarity_top_k)
 
     # Create query engine
-    query_engine = index.as_query_engine(
+    query_engine = RetrieverQueryEngine.from_args(
+        retriever,
         llm=llm,
-        similarity_top_k=similarity_top_k,
         response_mode="tree_summarize",
     )
     
@@ -54,10 +73,68 @@ def build_retriever_agent(llm=None, similarity_top_k=3) -> AgentWorkflow:
     return query_engine_agent
 
 
-def get_retriever_agent_as_tool(llm=None):
-    """Wraps the retriever agent as a FunctionTool so it can be used by another agent"""
-    retriever_agent = build_retriever_agent(llm=llm)
-    
+TOOL_MODES = ("direct", "synthesize", "agent")
+DEFAULT_TOOL_MODE = os.getenv("INVITEES_TOOL_MODE", "direct")
+
+
+def format_guest_records(results) -> str:
+    """Retrieved guests as one compact numbered record each, for the calling agent to reason over."""
+    lines = []
+    for i, hit in enumerate(results, start=1):
+        fields = [line.strip() for line in hit.node.get_content().split("\n") if line.strip()]
+        lines.append(f"[{i}] " + " | ".join(fields))
+    return "\n".join(lines)
+
+
+def _records_answer(query: str, records: str) -> str:
+    """Header for the records; added per call so a cached answer names the current question."""
+    if not records:
+        return f"No guest records match '{query}'."
+    return f"Top {records.count(chr(10)) + 1} guest records for '{query}':\n{records}"
+
+
+def get_retriever_agent_as_tool(llm=None, mode=None, similarity_top_k=3, semantic_cache=None):
+    """
+    Wraps invitee retrieval as a FunctionTool so it can be used by another agent.
+
+    mode="direct" (default) returns the top-k guest records without any LLM call, "synthesize"
+    answers with a single LLM call over them, and "agent" runs the nested retriever agent.
+    semantic_cache=True lets paraphrases of an already answered question about the same guests
+    reuse its answer. It is off by default; None follows INVITEES_SEMANTIC_CACHE (opt-in with "1").
+    """
+    mode = mode or DEFAULT_TOOL_MODE
+    if mode not in TOOL_MODES:
+        raise ValueError(f"Unknown invitees tool mode '{mode}', expected one of {TOOL_MODES}")
+
+    if mode == "agent":
+        retriever_agent = build_retriever_agent(llm=llm, similarity_top_k=similarity_top_k)
+
+        async def run(query: str) -> str:
+            response = await retriever_agent.run(query)
+            return str(response)
+
+    elif mode == "synthesize":
+        if llm is None:
+            llm = HuggingFaceInferenceAPI(model_name="Qwen/Qwen2.5-Coder-32B-Instruct")
+        # "compact" packs all retrieved records into one prompt: a single LLM call for a few guests
+        query_engine = RetrieverQueryEngine.from_args(
+            build_retriever(similarity_top_k=similarity_top_k), llm=llm, response_mode="compact"
+        )
+
+        async def run(query: str) -> str:
+            response = await query_engine.aquery(query)
+            return str(response)
+
+    else:
+        retriever = build_retriever(similarity_top_k=similarity_top_k)
+
+        async def run(query: str) -> str:
+            return format_guest_records(await retriever.aretrieve(query))
+
+    if semantic_cache is None:
+        semantic_cache = SEMANTIC_CACHE_ENABLED
+    cache = SemanticCache(get_embed_model(), entities_fn=GuestEntities()) if semantic_cache else None
+
     async def query_invitees(query: str) -> str:
         """
         Query information about party invitees.
@@ -68,18 +145,28 @@ def get_retriever_agent_as_tool(llm=None):
         Returns:
             Information about the invitees based on the query
         """
-        response = await retriever_agent.run(query)  # Add await here
-        return str(response)
-    
-    # Wrap the async function as a tool
-    retriever_tool = FunctionTool.from_defaults(
-        fn=query_invitees,  # FunctionTool handles async functions automatically
-        name="invitees_specialist",
-        description=(
+        answer = await run(query) if cache is None else await cache.aget_or_compute(query, run)
+        return _records_answer(query, answer) if mode == "direct" else answer
+
+    if mode == "direct":
+        description = (
+            "Looks up party invitees and returns the best matching guest records (name, relation, "
+            "description, email). Use this tool when you need information about guests, their preferences, "
+            "dietary restrictions, backgrounds, or any other invitee-specific details, "
+            "then answer from the returned records."
+        )
+    else:
+        description = (
             "A specialist agent that can answer detailed questions about party invitees. "
             "Use this tool when you need information about guests, their preferences, "
             "dietary restrictions, backgrounds, or any other invitee-specific details."
         )
+
+    # Wrap the async function as a tool
+    retriever_tool = FunctionTool.from_defaults(
+        fn=query_invitees,  # FunctionTool handles async functions automatically
+        name="invitees_specialist",
+        description=description,
     )
     
-    return retriever_tool
\ No newline at end of file
+    return retriever_tool
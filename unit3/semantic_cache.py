@@ -0,0 +1,241 @@
+"""
+Semantic answer cache for invitee questions (opt-in: INVITEES_SEMANTIC_CACHE=1).
+
+A question is embedded and compared (cosine) with previously answered ones. The stored answer is
+only reused when the similarity reaches SEMANTIC_CACHE_THRESHOLD *and* both questions name exactly
+the same entities (guests, other capitalized names, numbers): bge-small scores "what does X eat"
+and "what does Y eat" almost as high as a true paraphrase, so similarity alone would hand out
+another guest's answer. Entries expire after SEMANTIC_CACHE_TTL, the least recently used one is
+evicted when the cache is full, and everything is dropped as soon as the indexer reports a new
+index version (guest records added, changed or deleted).
+
+The default threshold is deliberately strict; calibrate it for the embedding model in use with
+
+    python semantic_cache.py calibrate
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from indexer import CHROMA_PATH, index_version, stored_guest_names
+
+SEMANTIC_CACHE_ENABLED = os.getenv("INVITEES_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+CALIBRATION_MARGIN = 0.01
+
+WORD = re.compile(r"[\w'-]+")
+NAME_TITLES = frozenset({"dr", "mr", "mrs", "ms", "miss", "lady", "lord", "sir", "prof", "the", "van", "von", "de"})
+# capitalized only because they start the question
+SENTENCE_STARTERS = frozenset(
+    "what who whom whose where when why how which is are was were does do did can could should would will "
+    "tell give list show find please i my a an".split()
+)
+
+# (question, paraphrase) pairs that should hit, and (question, other question) pairs that must not
+PARAPHRASES = [
+    ("What does Bruce Wayne eat?", "Bruce Wayne dietary needs"),
+    ("What are Ada Lovelace's hobbies?", "What does Ada Lovelace like to do for fun?"),
+    ("Tell me about Nikola Tesla", "Who is Nikola Tesla?"),
+    ("What is Marie Curie famous for?", "Why is Marie Curie well known?"),
+    ("How do I know Nikola Tesla?", "What is my relation to Nikola Tesla?"),
+    ("What is Ada Lovelace's email?", "Ada Lovelace email address"),
+]
+DISTINCT = [
+    ("What does Bruce Wayne eat?", "What does Ada Lovelace eat?"),
+    ("Tell me about Nikola Tesla", "Tell me about Marie Curie"),
+    ("What is Ada Lovelace's email?", "What is Marie Curie's email?"),
+    ("What does Bruce Wayne eat?", "What does Bruce Wayne drink?"),
+    ("Who is Nikola Tesla?", "Who is Nikola Tesla's best friend?"),
+    ("What is Marie Curie famous for?", "What is Marie Curie allergic to?"),
+]
+
+
+##### Entities that must match exactly #####
+
+def entity_extractor(guest_names: list[str] = ()):
+    """
+    Returns fn(question) -> frozenset of entities. A token of a guest's name maps to that guest, so
+    "Bruce" and "Bruce Wayne" are the same entity; other capitalized words and numbers count as
+    entities of their own.
+    """
+    guests_by_token = {}
+    for name in guest_names:
+        for token in WORD.findall(name.lower()):
+            if len(token) > 2 and token not in NAME_TITLES:
+                guests_by_token.setdefault(token, set()).add(name)
+
+    def entities(question: str) -> frozenset:
+        found = set()
+        for word in WORD.findall(question):
+            token = word.lower().removesuffix("'s")
+            if token in guests_by_token:
+                found |= guests_by_token[token]
+            elif token.isdigit() or (word[0].isupper() and token not in NAME_TITLES | SENTENCE_STARTERS):
+                found.add(token)
+        return frozenset(found)
+
+    return entities
+
+
+class GuestEntities:
+    """entity_extractor over the guests in the Chroma collection, rebuilt when the index version changes."""
+
+    def __init__(self, chroma_path: str = CHROMA_PATH):
+        self.chroma_path = chroma_path
+        self._version = None
+        self._extract = entity_extractor()
+        self._lock = threading.Lock()
+
+    def __call__(self, question: str) -> frozenset:
+        version = index_version(self.chroma_path)
+        with self._lock:
+            if version != self._version:
+                self._extract = entity_extractor(stored_guest_names(self.chroma_path))
+                self._version = version
+            extract = self._extract
+        return extract(question)
+
+
+##### Cache #####
+
+class SemanticCache:
+    """
+    Answers live in fixed slots; their unit-length query vectors are rows of one matrix, so a
+    lookup is a single matrix-vector product. `_order` keeps slots in least-recently-used order.
+    """
+
+    def __init__(self, embed_model, threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: float = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_SIZE, version_fn=lambda: index_version(CHROMA_PATH),
+                 entities_fn=None):
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.entities_fn = entities_fn or entity_extractor()
+        self.stats = Counter()
+
+        self._lock = threading.Lock()
+        self._vectors = None                 # (max_entries, dim), allocated on the first insert
+        self._entries = [None] * max_entries  # slot -> (query, entities, answer, expires_at)
+        self._order = OrderedDict()          # slot -> None, oldest use first
+        self._version = None
+
+    def _check_version(self):
+        """Drops every entry when the guest records changed since they were cached."""
+        version = self.version_fn()
+        if version != self._version:
+            if self._order:
+                self.stats["invalidations"] += 1
+            self._entries = [None] * self.max_entries
+            self._order.clear()
+            self._version = version
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, vector: np.ndarray, entities: frozenset = frozenset()):
+        """The cached answer for the most similar live question naming the same entities, or None."""
+        with self._lock:
+            self._check_version()
+            if not self._order:
+                self.stats["misses"] += 1
+                return None
+            slots = np.fromiter(self._order, dtype=np.int64, count=len(self._order))
+            similarity = self._vectors[slots] @ vector
+            now = time.time()
+            for i in np.argsort(-similarity):
+                if similarity[i] < self.threshold:
+                    break
+                slot = int(slots[i])
+                _, cached_entities, answer, expires_at = self._entries[slot]
+                if expires_at <= now:
+                    continue  # expired; the slot is reused by the next insert
+                if cached_entities != entities:
+                    self.stats["entity_mismatches"] += 1
+                    continue
+                self._order.move_to_end(slot)
+                self.stats["hits"] += 1
+                return answer
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, query: str, vector: np.ndarray, answer: str, entities: frozenset = frozenset()):
+        with self._lock:
+            self._check_version()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            now = time.time()
+            expired = next((s for s in self._order if self._entries[s][3] <= now), None)
+            if expired is not None:
+                slot = expired
+            elif len(self._order) < self.max_entries:
+                slot = next(s for s in range(self.max_entries) if self._entries[s] is None)
+            else:
+                slot = next(iter(self._order))
+                self.stats["evictions"] += 1
+            self._order.pop(slot, None)
+            self._vectors[slot] = vector
+            self._entries[slot] = (query, entities, answer, now + self.ttl)
+            self._order[slot] = None
+
+    async def aget_or_compute(self, query: str, compute) -> str:
+        """Returns a cached answer for a similar question, else awaits compute(query) and caches it."""
+        vector = self._normalize(await self.embed_model.aget_query_embedding(query))
+        entities = self.entities_fn(query)
+        answer = self.lookup(vector, entities)
+        if answer is None:
+            answer = await compute(query)
+            self.store(query, vector, answer, entities)
+        return answer
+
+    def summary(self) -> dict:
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "entries": len(self._order), "hit_rate": self.stats["hits"] / total if total else 0.0}
+
+
+##### Threshold calibration #####
+
+def calibrate_threshold(embed_model, paraphrases=PARAPHRASES, distinct=DISTINCT) -> dict:
+    """
+    Cosine similarities of both pair sets under `embed_model`. The suggested threshold sits just
+    above the most similar distinct pair, so on these pairs a hit is never a wrong answer even
+    before the entity check; `paraphrase_recall` is the share of paraphrases it still catches.
+    """
+    def similarity(a, b):
+        va = SemanticCache._normalize(embed_model.get_query_embedding(a))
+        vb = SemanticCache._normalize(embed_model.get_query_embedding(b))
+        return float(va @ vb)
+
+    same = np.array([similarity(a, b) for a, b in paraphrases])
+    different = np.array([similarity(a, b) for a, b in distinct])
+    threshold = min(1.0, float(different.max()) + CALIBRATION_MARGIN)
+    return {
+        "threshold": threshold,
+        "paraphrase_recall": float((same >= threshold).mean()),
+        "paraphrase_similarity": (float(same.min()), float(same.mean())),
+        "distinct_similarity": (float(different.mean()), float(different.max())),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["calibrate"]:
+        sys.exit("usage: python semantic_cache.py calibrate")
+    from indexer import get_embed_model
+
+    report = calibrate_threshold(get_embed_model())
+    print(f"Paraphrase cosine min/mean: {report['paraphrase_similarity'][0]:.3f} / {report['paraphrase_similarity'][1]:.3f}")
+    print(f"Distinct cosine mean/max:   {report['distinct_similarity'][0]:.3f} / {report['distinct_similarity'][1]:.3f}")
+    print(f"Suggested SEMANTIC_CACHE_THRESHOLD={report['threshold']:.3f} "
+          f"(catches {report['paraphrase_recall']:.0%} of the paraphrases)")
@@ -0,0 +1,59 @@
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from embedding_cache import CachedEmbedding, EmbeddingStore
+
+CALLS = []
+
+
+class CountingEmbedding(BaseEmbedding):
+    """Offline embed model; every computed embedding is logged in CALLS as (kind, text)."""
+
+    def _vector(self, kind, text):
+        CALLS.append((kind, text))
+        return [float(len(text)), 0.5, 0.25 if kind == "query" else 0.75]
+
+    def _get_query_embedding(self, query):
+        return self._vector("query", query)
+
+    async def _aget_query_embedding(self, query):
+        return self._vector("query", query)
+
+    def _get_text_embedding(self, text):
+        return self._vector("text", text)
+
+
+def make_cached(tmp_path):
+    inner = CountingEmbedding(model_name="counting")
+    return CachedEmbedding(inner, store=EmbeddingStore(str(tmp_path / "embeddings.sqlite")))
+
+
+def test_repeated_query_is_served_from_memory(tmp_path):
+    CALLS.clear()
+    embed_model = make_cached(tmp_path)
+    first = embed_model.get_query_embedding("What does Ada eat?")
+    assert embed_model.get_query_embedding("What does Ada eat?") == first
+    assert CALLS == [("query", "What does Ada eat?")]
+    assert embed_model.stats()["query"]["memory_hits"] == 1
+
+
+def test_vectors_survive_a_restart_on_disk(tmp_path):
+    CALLS.clear()
+    make_cached(tmp_path).get_text_embedding_batch(["Ada Lovelace", "Nikola Tesla"])
+    make_cached(tmp_path).get_query_embedding("Who is Ada?")
+
+    restarted = make_cached(tmp_path)  # empty memory tier, same SQLite file
+    vectors = restarted.get_text_embedding_batch(["Ada Lovelace", "Marie Curie", "Nikola Tesla"])
+    assert restarted.get_query_embedding("Who is Ada?") == [11.0, 0.5, 0.25]
+    assert CALLS[-1] == ("text", "Marie Curie")  # only the new guest was embedded
+    assert len(CALLS) == 4
+    assert vectors[0] == [12.0, 0.5, 0.75]  # float16 round-trips these exactly
+    stats = restarted.stats()
+    assert (stats["text"]["disk_hits"], stats["text"]["computed"], stats["query"]["disk_hits"]) == (2, 1, 1)
+
+
+def test_query_and_document_vectors_are_cached_apart(tmp_path):
+    CALLS.clear()
+    embed_model = make_cached(tmp_path)
+    embed_model.get_text_embedding("Ada Lovelace")
+    embed_model.get_query_embedding("Ada Lovelace")
+    assert CALLS == [("text", "Ada Lovelace"), ("query", "Ada Lovelace")]
@@ -0,0 +1,73 @@
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from hybrid_retriever import BM25Index, HybridRetriever, reciprocal_rank_fusion
+
+
+class NoDenseHits(BaseRetriever):
+    def _retrieve(self, query_bundle):
+        return []
+
+
+class FixedDenseHits(BaseRetriever):
+    def __init__(self, nodes):
+        super().__init__()
+        self.nodes = nodes
+
+    def _retrieve(self, query_bundle):
+        return [NodeWithScore(node=node, score=1.0 - i / 10) for i, node in enumerate(self.nodes)]
+
+
+def guest(node_id: str, text: str) -> TextNode:
+    return TextNode(id_=node_id, text=text)
+
+
+CORPUS = [
+    guest("ada", "Ada Lovelace, mathematician. Loves gluten-free cake and tea."),
+    guest("tesla", "Nikola Tesla, inventor. Drinks tea, tea and more tea."),
+    guest("curie", "Marie Curie, chemist. Allergic to gluten."),
+    guest("wayne", "Bruce Wayne, philanthropist. Eats anything."),
+]
+
+
+def ids(hits) -> list[str]:
+    return [hit.node.node_id for hit in hits]
+
+
+def test_bm25_ranks_rare_terms_and_repeated_terms_higher():
+    bm25 = BM25Index(CORPUS)
+    assert ids(bm25.search("Who is Lovelace?", 3)) == ["ada"]           # exact name, stopwords ignored
+    assert ids(bm25.search("tea", 3)) == ["tesla", "ada"]               # higher term frequency first
+    assert ids(bm25.search("gluten tea", 4))[:2] == ["ada", "tesla"]    # matching both terms beats one
+    assert bm25.search("what is the", 3) == []                          # only stopwords: no hits
+
+    scores = bm25.scores("chemist inventor")
+    assert scores[2] > 0 and scores[1] > 0 and scores[0] == scores[3] == 0
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    ada, tesla, curie, wayne = (NodeWithScore(node=node, score=0.0) for node in CORPUS)
+    fused = reciprocal_rank_fusion([[ada, tesla, curie], [curie, ada]], top_k=3, k=60)
+    # ada: 1/61 + 1/62, curie: 1/63 + 1/61, tesla: 1/62
+    assert ids(fused) == ["ada", "curie", "tesla"]
+    assert fused[0].score == 1 / 61 + 1 / 62
+    assert ids(reciprocal_rank_fusion([[wayne], [tesla]], top_k=1)) == ["wayne"]  # ties keep first-seen order
+
+
+def test_hybrid_finds_names_the_dense_leg_missed():
+    dense = FixedDenseHits([CORPUS[3], CORPUS[1]])  # semantically close but wrong guests
+    retriever = HybridRetriever(dense, BM25Index(CORPUS), similarity_top_k=2)
+    # Curie ties with the dense leg's top hit and displaces its second one
+    assert ids(retriever.retrieve("Marie Curie")) == ["wayne", "curie"]
+
+
+def test_bm25_is_rebuilt_when_the_index_version_changes():
+    state = {"version": "v1", "nodes": [guest("ada", "Ada Lovelace, mathematician, loves gluten-free cake")]}
+    retriever = HybridRetriever(NoDenseHits(), BM25Index(state["nodes"]), similarity_top_k=2,
+                                version_fn=lambda: state["version"], bm25_loader=lambda: BM25Index(state["nodes"]))
+    assert [hit.node.node_id for hit in retriever.retrieve("gluten")] == ["ada"]
+
+    state["nodes"] = [guest("tesla", "Nikola Tesla, inventor, avoids gluten")]  # Ada removed, Tesla added
+    assert [hit.node.node_id for hit in retriever.retrieve("gluten")] == ["ada"]  # same version: no rebuild
+    state["version"] = "v2"
+    assert [hit.node.node_id for hit in retriever.retrieve("gluten")] == ["tesla"]
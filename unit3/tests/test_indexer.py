@@ -0,0 +1,52 @@
+import pandas as pd
+
+import indexer
+
+GUESTS = [
+    {"name": "Ada Lovelace", "email": "ada@example.com", "relation": "old friend", "description": "Loves gluten-free cake."},
+    {"name": "Nikola Tesla", "email": "tesla@example.com", "relation": "colleague", "description": "Talks about wireless power."},
+    {"name": "Marie Curie", "email": "marie@example.com", "relation": "neighbour", "description": "Brings glowing gifts."},
+]
+
+
+class CountingEmbedding:
+    """Offline embed model that records every text it is asked to embed."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def get_text_embedding_batch(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+
+def write_guests(path, guests):
+    pd.DataFrame(guests).to_parquet(path)
+
+
+def test_rebuilds_embed_only_what_changed(tmp_path):
+    parquet_path, chroma_path = tmp_path / "invitees.parquet", str(tmp_path / "chroma")
+    embed_model = CountingEmbedding()
+
+    write_guests(parquet_path, GUESTS)
+    stats = indexer.build_index(str(parquet_path), chroma_path, embed_model)
+    assert (stats["new"], len(embed_model.embedded)) == (3, 3)
+    first_version = indexer.index_version(chroma_path)
+
+    embed_model.embedded.clear()
+    stats = indexer.build_index(str(parquet_path), chroma_path, embed_model)
+    assert (stats["unchanged"], stats["new"], stats["changed"], stats["deleted"]) == (3, 0, 0, 0)
+    assert embed_model.embedded == []  # unchanged data embeds nothing
+    assert indexer.index_version(chroma_path) == first_version
+
+    changed = dict(GUESTS[1], description="Now prefers alternating current.")
+    write_guests(parquet_path, [GUESTS[0], changed])  # Tesla changed, Curie removed
+    stats = indexer.build_index(str(parquet_path), chroma_path, embed_model)
+    assert (stats["unchanged"], stats["changed"], stats["deleted"]) == (1, 1, 1)
+    assert len(embed_model.embedded) == 1 and "alternating current" in embed_model.embedded[0]
+    assert sorted(indexer.stored_guest_names(chroma_path)) == ["Ada Lovelace", "Nikola Tesla"]
+    assert indexer.index_version(chroma_path) != first_version
+
+    collection = indexer.get_collection(chroma_path)
+    stored = collection.get(ids=[indexer.row_id(changed)], include=["metadatas"])
+    assert stored["metadatas"][0]["content_hash"] == indexer.content_hash(changed)
@@ -0,0 +1,42 @@
+import asyncio
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import TextNode
+
+import retriever
+from hybrid_retriever import BM25Index, HybridRetriever
+from retriever import _records_answer, format_guest_records
+
+GUESTS = [
+    TextNode(id_="ada", text="Name: Ada Lovelace\nRelation: old friend\n\nDescription: Loves gluten-free cake.\n"),
+    TextNode(id_="tesla", text="Name: Nikola Tesla\nRelation: colleague\nDescription: Avoids gluten since 1890."),
+    TextNode(id_="wayne", text="Name: Bruce Wayne\nRelation: benefactor\nDescription: Eats anything."),
+]
+
+
+class NoDenseHits(BaseRetriever):
+    def _retrieve(self, query_bundle):
+        return []
+
+
+def test_direct_mode_returns_one_line_per_guest(monkeypatch):
+    monkeypatch.setattr(retriever, "build_retriever",
+                        lambda **kwargs: HybridRetriever(NoDenseHits(), BM25Index(GUESTS), similarity_top_k=3))
+    tool = retriever.get_retriever_agent_as_tool(mode="direct", semantic_cache=False)
+
+    answer = asyncio.run(tool.acall(query="Who avoids gluten?")).content
+    header, *records = answer.splitlines()
+    assert header == "Top 2 guest records for 'Who avoids gluten?':"
+    assert records == [
+        "[1] Name: Nikola Tesla | Relation: colleague | Description: Avoids gluten since 1890.",
+        "[2] Name: Ada Lovelace | Relation: old friend | Description: Loves gluten-free cake.",
+    ]
+    assert asyncio.run(tool.acall(query="Who plays the violin?")).content == \
+        "No guest records match 'Who plays the violin?'."
+
+
+def test_records_are_numbered_in_rank_order():
+    hits = HybridRetriever(NoDenseHits(), BM25Index(GUESTS), similarity_top_k=1).retrieve("Bruce Wayne")
+    records = format_guest_records(hits)
+    assert records == "[1] Name: Bruce Wayne | Relation: benefactor | Description: Eats anything."
+    assert _records_answer("Bruce?", records).startswith("Top 1 guest records for 'Bruce?':\n[1] ")
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import re
+
+import numpy as np
+import pytest
+
+import retriever
+import semantic_cache
+from semantic_cache import SemanticCache, calibrate_threshold, entity_extractor
+
+GUESTS = ["Bruce Wayne", "Ada Lovelace", "Dr. Nikola Tesla", "Marie Curie"]
+NAME_TOKENS = {token for name in GUESTS for token in re.findall(r"\w+", name.lower())}
+
+
+class TemplateEmbedding:
+    """
+    Stand-in for bge-small's narrow similarity band: guest names barely move the vector, so "What does Bruce Wayne eat?" and "What does Ada Lovelace eat?" are near-identical.
+    """
+
+    def get_query_embedding(self, text):
+        vector = np.zeros(64)
+        for word in re.findall(r"[\w']+", text):
+            weight = 0.01 if word.lower().removesuffix("'s") in NAME_TOKENS else 1.0
+            vector[int(hashlib.md5(word.lower().encode()).hexdigest(), 16) % 64] += weight
+        return vector.tolist()
+
+    async def aget_query_embedding(self, text):
+        return self.get_query_embedding(text)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("threshold", 0.95)
+    return SemanticCache(TemplateEmbedding(), version_fn=lambda: "v1",
+                         entities_fn=entity_extractor(GUESTS), **kwargs)
+
+
+def test_same_question_about_another_guest_is_not_a_hit():
+    cache = make_cache()
+    calls = []
+
+    async def compute(query):
+        calls.append(query)
+        return f"answer for {query}"
+
+    assert run(cache.aget_or_compute("What does Bruce Wayne eat?", compute)) == "answer for What does Bruce Wayne eat?"
+    assert run(cache.aget_or_compute("What does Ada Lovelace eat?", compute)) == "answer for What does Ada Lovelace eat?"
+    assert len(calls) == 2
+    assert cache.stats["entity_mismatches"] == 1
+
+
+def test_paraphrase_about_the_same_guest_is_a_hit():
+    cache = make_cache()
+    calls = []
+
+    async def compute(query):
+        calls.append(query)
+        return "vegetarian"
+
+    run(cache.aget_or_compute("What does Bruce Wayne eat?", compute))
+    assert run(cache.aget_or_compute("what does bruce eat", compute)) == "vegetarian"
+    assert len(calls) == 1
+
+
+def test_entities_map_partial_names_to_the_guest():
+    entities = entity_extractor(GUESTS)
+    assert entities("What does Bruce eat?") == entities("Bruce Wayne dietary needs") == {"Bruce Wayne"}
+    assert entities("Tell me about Tesla") == {"Dr. Nikola Tesla"}
+    assert entities("Who sits at table 4?") != entities("Who sits at table 5?")
+    assert entities("Who is Alfred?") == {"alfred"}
+
+
+def test_calibration_threshold_separates_the_pairs():
+    report = calibrate_threshold(TemplateEmbedding())
+    model = TemplateEmbedding()
+
+    def cosine(a, b):
+        va, vb = np.array(model.get_query_embedding(a)), np.array(model.get_query_embedding(b))
+        return va @ vb / np.linalg.norm(va) / np.linalg.norm(vb)
+
+    assert all(cosine(a, b) < report["threshold"] for a, b in semantic_cache.DISTINCT)
+    expected_recall = np.mean([cosine(a, b) >= report["threshold"] for a, b in semantic_cache.PARAPHRASES])
+    assert report["paraphrase_recall"] == pytest.approx(expected_recall)
+
+
+class FakeNode:
+    def __init__(self, text):
+        self.text = text
+
+    def get_content(self):
+        return self.text
+
+
+class FakeHit:
+    def __init__(self, text):
+        self.node = FakeNode(text)
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = 0
+
+    async def aretrieve(self, query):
+        self.calls += 1
+        return [FakeHit("Name: Bruce Wayne\nDescription: Eats anything")]
+
+
+@pytest.fixture
+def direct_tool(monkeypatch):
+    fake = FakeRetriever()
+    monkeypatch.setattr(retriever, "build_retriever", lambda **kwargs: fake)
+    monkeypatch.setattr(retriever, "get_embed_model", TemplateEmbedding)
+    monkeypatch.setattr(retriever, "GuestEntities", lambda: entity_extractor(GUESTS))
+    monkeypatch.setattr(semantic_cache, "index_version", lambda path: "v1")
+    return fake
+
+
+def test_semantic_cache_is_off_by_default(direct_tool):
+    tool = retriever.get_retriever_agent_as_tool()
+    run(tool.acall(query="What does Bruce Wayne eat?"))
+    run(tool.acall(query="What does Bruce Wayne eat?"))
+    assert direct_tool.calls == 2
+
+
+def test_cached_records_are_headed_by_the_current_question(direct_tool):
+    tool = retriever.get_retriever_agent_as_tool(semantic_cache=True)
+    first = run(tool.acall(query="What does Bruce Wayne eat?")).content
+    second = run(tool.acall(query="what does bruce eat")).content
+    assert direct_tool.calls == 1
+    assert first.startswith("Top 1 guest records for 'What does Bruce Wayne eat?':")
+    assert second.startswith("Top 1 guest records for 'what does bruce eat':")
+    assert "[1] Name: Bruce Wayne | Description: Eats anything" in second
@@ -1,20 +1,50 @@
-import requests
+import asyncio
+import functools
+import http_client
 import os
 from dotenv import load_dotenv
 from llama_index.core.tools import FunctionTool
-from datetime import date
 from huggingface_hub import list_models
 import random
+from cache import PersistentCache, make_key
+from output_budget import budgeted, get_full_output
 
 load_dotenv()
 
 
+def run_in_thread(fn):
+    """Async twin of a blocking tool function: runs it in a worker thread so the event loop stays free."""
+    @functools.wraps(fn)
+    async def async_fn(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return async_fn
+
+
 ##### Web search tool using LangSearch API #####
 
-def langsearch_web_search(query: str, fresh="noLimit", summary=True, count=5):
-    api_key = os.getenv("LANGSEARCH_API_KEY")
-    url = "https://api.langsearch.com/v1/web-search"
+SEARCH_CACHE = PersistentCache("langsearch")
+SEARCH_CACHE_ENABLED = os.getenv("LANGSEARCH_CACHE", "1") != "0"
+# how long a cached result stays valid, by LangSearch freshness window
+SEARCH_CACHE_TTL = {
+    "day": 30 * 60,
+    "oneDay": 30 * 60,
+    "oneWeek": 6 * 3600,
+    "oneMonth": 24 * 3600,
+    "oneYear": 7 * 24 * 3600,
+    "noLimit": 30 * 24 * 3600,
+}
+DEFAULT_SEARCH_CACHE_TTL = 3600
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).strip(" ?!.")
+
 
+LANGSEARCH_URL = "https://api.langsearch.com/v1/web-search"
+
+
+def _langsearch_request(query: str, fresh: str, summary: bool, count: int) -> dict:
+    api_key = os.getenv("LANGSEARCH_API_KEY")
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -25,35 +55,74 @@ def langsearch_web_search(query: str, fresh="noLimit", summary=True, count=5):
         "summary": summary,
         "count": count,
     }
+    return {"headers": headers, "json": payload}
 
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()  # Raises an error if the request failed
 
+def _parse_langsearch_response(data: dict) -> list:
     result = []
-    for item in response.json()["data"]["webPages"]["value"]:
+    for item in data["data"]["webPages"]["value"]:
         result.append({"url": item["url"], "title": item["name"], "snippet": item["snippet"], "summary": item["summary"]})
+    return result
 
+
+def langsearch_web_search(query: str, fresh="noLimit", summary=True, count=5, use_cache=True):
+    cache_key = make_key(normalize_query(query), fresh, bool(summary), int(count))
+    use_cache = use_cache and SEARCH_CACHE_ENABLED
+    if use_cache:
+        cached = SEARCH_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    response = http_client.post(LANGSEARCH_URL, retry_unprocessed=True, **_langsearch_request(query, fresh, summary, count))
+    response.raise_for_status()  # Raises an error if the request failed
+    result = _parse_langsearch_response(response.json())
+
+    if use_cache:
+        SEARCH_CACHE.set(cache_key, result, SEARCH_CACHE_TTL.get(fresh, DEFAULT_SEARCH_CACHE_TTL))
     return result
 
 
-def langsearch_tool_fn(query: str, verbose: bool=False) -> str:
-    results = langsearch_web_search(query, count=5)
+async def alangsearch_web_search(query: str, fresh="noLimit", summary=True, count=5, use_cache=True):
+    cache_key = make_key(normalize_query(query), fresh, bool(summary), int(count))
+    use_cache = use_cache and SEARCH_CACHE_ENABLED
+    if use_cache:
+        cached = SEARCH_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
 
+    response = await http_client.apost(LANGSEARCH_URL, retry_unprocessed=True, **_langsearch_request(query, fresh, summary, count))
+    response.raise_for_status()
+    result = _parse_langsearch_response(response.json())
+
+    if use_cache:
+        SEARCH_CACHE.set(cache_key, result, SEARCH_CACHE_TTL.get(fresh, DEFAULT_SEARCH_CACHE_TTL))
+    return result
 
+
+def _format_search_results(results: list, verbose: bool) -> str:
     if verbose:
-        text_results = "\n".join([
+        return "\n".join([
             f"{r['title']} ({r['url']}): \nSummary: {r['summary']}" for r in results]
             )
-        return text_results
-    
-    text_results = "\n".join([
+    return "\n".join([
         f"{r['title']} ({r['url']}): \nSnippet: {r['snippet']}" for r in results]
         )
 
-    return text_results
+
+@budgeted("search")
+def langsearch_tool_fn(query: str, verbose: bool=False) -> str:
+    results = langsearch_web_search(query, count=5)
+    return _format_search_results(results, verbose)
+
+
+@budgeted("search")
+async def alangsearch_tool_fn(query: str, verbose: bool=False) -> str:
+    results = await alangsearch_web_search(query, count=5)
+    return _format_search_results(results, verbose)
 
 websearch_tool = FunctionTool.from_defaults(
     fn=langsearch_tool_fn,
+    async_fn=alangsearch_tool_fn,
     name="langsearch_websearch",
     description="Uses the LangSearch API to search the web and return titles and urls, and snippets or summaries. " \
     "Set verbose to True to return summaries instead of snippets." \
@@ -63,111 +132,237 @@ websearch_tool = FunctionTool.from_defaults(
 
 ##### Get latest news about a topic using LangSearch API #####
 
+@budgeted("search")
 def get_latest_news(topic: str, count=5) -> str:
     query = f"latest news about {topic}"
     results = langsearch_web_search(query, fresh="day", summary=True, count=count)
+    return _format_search_results(results, verbose=True)
 
-    text_results = "\n".join([
-        f"{r['title']} ({r['url']}): \nSummary: {r['summary']}" for r in results]
-        )
-    return text_results
+
+@budgeted("search")
+async def aget_latest_news(topic: str, count=5) -> str:
+    query = f"latest news about {topic}"
+    results = await alangsearch_web_search(query, fresh="day", summary=True, count=count)
+    return _format_search_results(results, verbose=True)
 
 
 get_latest_news_tool = FunctionTool.from_defaults(
     fn=get_latest_news,
+    async_fn=aget_latest_news,
     name="get_latest_news",
     description="Uses the LangSearch API to get the latest news about a specific topic. " \
     "Returns the title, url and summary of the latest news articles about the topic." \
     "count specifies how many news articles to return."
 )
 
-##### Get Coordinates tool using Open-Meteo API #####
+##### Get Coordinates tool (offline gazetteer, then cached Open-Meteo geocoding) #####
+
+import geocoding
+
 
 def get_coordinates_fn(location: str) -> dict:
-    url = "https://geocoding-api.open-meteo.com/v1/search"
-    params = {"name": location, "count": 1}
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    return geocoding.resolve(location)
+
+
+async def aget_coordinates_fn(location: str) -> dict:
+    return await geocoding.aresolve(location)
 
-    data = response.json()
-    if "results" in data and len(data["results"]) > 0:
-        result = data["results"][0]
-        return {
-            "latitude": result.get("latitude"),
-            "longitude": result.get("longitude"),
-            "name": result.get("name"),
-            "country": result.get("country"),
-        }
-    else:
-        return {"error": f"No coordinates found for location: {location}"}
-    
 get_coordinates_tool = FunctionTool.from_defaults(
     fn=get_coordinates_fn,
+    async_fn=aget_coordinates_fn,
     name="get_coordinates",
     description="Uses the Open-Meteo Geocoding API to get the coordinates of a location. " \
     "Returns the latitude and longitude of the location, as well as the name and country if available."
 )
 
+
+def get_coordinates_batch_fn(locations: list[str]) -> dict:
+    return geocoding.resolve_many(locations)
+
+
+async def aget_coordinates_batch_fn(locations: list[str]) -> dict:
+    return await geocoding.aresolve_many(locations)
+
+get_coordinates_batch_tool = FunctionTool.from_defaults(
+    fn=get_coordinates_batch_fn,
+    async_fn=aget_coordinates_batch_fn,
+    name="get_coordinates_batch",
+    description="Gets the coordinates of several locations in one call. " \
+    "Returns a mapping from each location to its latitude, longitude, name and country (or an error)."
+)
+
 ##### Weather forecast API tool using Open-Meteo API (both current weather and weather forecast for the next 7 days) #####
 
-### weather forecast tool for next 7 days
+import time
+import numpy as np
 
-def get_weather_forecast(latitude: float, longitude: float) -> dict:
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+WEATHER_CACHE = PersistentCache("weather")
+WEATHER_GRID_DEGREES = 0.1          # ~11 km cells; nearby lookups share one fetch
+MODEL_UPDATE_SECONDS = 3600         # Open-Meteo refreshes its forecasts hourly
+HOURLY_VARIABLES = ["temperature_2m", "precipitation"]
+CURRENT_VARIABLES = ["temperature_2m", "precipitation", "weather_code", "wind_speed_10m", "cloud_cover"]
+
+
+def _grid_cell(latitude: float, longitude: float) -> tuple[float, float]:
+    step = WEATHER_GRID_DEGREES
+    return round(round(float(latitude) / step) * step, 4), round(round(float(longitude) / step) * step, 4)
+
+
+def _weather_params(latitude: float, longitude: float) -> dict:
+    """One request per cell fetches both the hourly forecast and the current conditions."""
+    return {
         "latitude": latitude,
         "longitude": longitude,
-        "hourly": ["temperature_2m", "precipitation"],
-        "current_weather": False,
+        "hourly": HOURLY_VARIABLES,
+        "current": CURRENT_VARIABLES,
+        "timezone": "auto",
     }
-    response = requests.get(url, params=params)
+
+
+def _seconds_until_model_update() -> int:
+    return int(MODEL_UPDATE_SECONDS - time.time() % MODEL_UPDATE_SECONDS) + 1
+
+
+def get_weather(latitude: float, longitude: float) -> dict:
+    cell = _grid_cell(latitude, longitude)
+    cache_key = make_key(*cell)
+    cached = WEATHER_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = http_client.get(WEATHER_URL, params=_weather_params(*cell))
     response.raise_for_status()
+    weather = response.json()
+    WEATHER_CACHE.set(cache_key, weather, _seconds_until_model_update())
+    return weather
 
-    return response.json()
 
+async def aget_weather(latitude: float, longitude: float) -> dict:
+    cell = _grid_cell(latitude, longitude)
+    cache_key = make_key(*cell)
+    cached = WEATHER_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await http_client.aget(WEATHER_URL, params=_weather_params(*cell))
+    response.raise_for_status()
+    weather = response.json()
+    WEATHER_CACHE.set(cache_key, weather, _seconds_until_model_update())
+    return weather
 
-def get_weather_forecast_tool_fn(latitude: float, longitude: float) -> str:
-    forecast = get_weather_forecast(latitude, longitude)
-    hourly_data = forecast.get("hourly", {})
-    times = hourly_data.get("time", [])
-    temperatures = hourly_data.get("temperature_2m", [])
-    precipitations = hourly_data.get("precipitation", [])
 
-    if not times or not temperatures or not precipitations:
+### weather forecast tool for next 7 days
+
+def _hourly_arrays(forecast: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    hourly_data = forecast.get("hourly", {})
+    times = np.array(hourly_data.get("time", []), dtype="datetime64[m]")
+    temperatures = np.array(hourly_data.get("temperature_2m", []), dtype=float)  # None -> nan
+    precipitations = np.array(hourly_data.get("precipitation", []), dtype=float)
+    return times, temperatures, precipitations
+
+
+FORECAST_AGGREGATIONS = ("hourly", "daily")
+
+
+def _forecast_args_error(start_date: str | None, end_date: str | None, aggregation: str) -> str | None:
+    """An error message for the agent if the window or aggregation is invalid, checked before any fetch."""
+    if aggregation not in FORECAST_AGGREGATIONS:
+        return f"Unknown aggregation '{aggregation}', expected one of {FORECAST_AGGREGATIONS}."
+    dates = {}
+    for name, value in (("start_date", start_date), ("end_date", end_date)):
+        if value:
+            try:
+                dates[name] = np.datetime64(str(value).strip(), "D")
+            except ValueError:
+                return f"Invalid {name} '{value}', expected YYYY-MM-DD."
+    if len(dates) == 2 and dates["start_date"] > dates["end_date"]:
+        return f"start_date {start_date} is after end_date {end_date}."
+    return None
+
+
+def _format_forecast(forecast: dict, start_date: str | None = None, end_date: str | None = None,
+                     aggregation: str = "hourly") -> str:
+    times, temperatures, precipitations = _hourly_arrays(forecast)
+    if not len(times) or len(temperatures) != len(times) or len(precipitations) != len(times):
         return "No weather forecast data available."
 
-    result = f"Hourly Weather Forecast for next 7 days (from today {date.today()}):\n"
-    for time, temp, precip in zip(times, temperatures, precipitations):
-        result += f"Time: {time}, Temperature: {temp}°C, Precipitation: {precip}mm\n"
+    days = times.astype("datetime64[D]")
+    window = np.ones(len(times), dtype=bool)
+    if start_date:
+        window &= days >= np.datetime64(str(start_date).strip(), "D")
+    if end_date:
+        window &= days <= np.datetime64(str(end_date).strip(), "D")
+    if not window.any():
+        return f"No forecast data for the requested dates; the forecast covers {days[0]} to {days[-1]}."
+    times, days, temperatures, precipitations = times[window], days[window], temperatures[window], precipitations[window]
+    zone = forecast.get("timezone_abbreviation") or forecast.get("timezone") or "GMT"
+
+    if aggregation == "hourly":
+        lines = [f"Hourly Weather Forecast ({zone}) from {days[0]} to {days[-1]}:"]
+        lines += [f"Time: {t}, Temperature: {temp}°C, Precipitation: {precip}mm"
+                  for t, temp, precip in zip(times, temperatures, precipitations)]
+        return "\n".join(lines)
+
+    # hours are sorted, so every day is one contiguous run starting at `starts`
+    day_values, starts = np.unique(days, return_index=True)
+    t_min = np.fmin.reduceat(temperatures, starts)
+    t_max = np.fmax.reduceat(temperatures, starts)
+    rain = np.add.reduceat(np.nan_to_num(precipitations), starts)
+    lines = [f"Daily Weather Forecast ({zone}) from {day_values[0]} to {day_values[-1]}:"]
+    lines += [f"Date: {day}, Min: {lo:.1f}°C, Max: {hi:.1f}°C, Total precipitation: {total:.1f}mm"
+              for day, lo, hi, total in zip(day_values, t_min, t_max, rain)]
+    return "\n".join(lines)
 
-    return result
+
+def get_weather_forecast(latitude: float, longitude: float) -> dict:
+    return get_weather(latitude, longitude)
+
+
+async def aget_weather_forecast(latitude: float, longitude: float) -> dict:
+    return await aget_weather(latitude, longitude)
+
+
+@budgeted("table")
+def get_weather_forecast_tool_fn(latitude: float, longitude: float, start_date: str | None = None,
+                                 end_date: str | None = None, aggregation: str = "hourly") -> str:
+    error = _forecast_args_error(start_date, end_date, aggregation)
+    if error:
+        return error
+    return _format_forecast(get_weather_forecast(latitude, longitude), start_date, end_date, aggregation)
+
+
+@budgeted("table")
+async def aget_weather_forecast_tool_fn(latitude: float, longitude: float, start_date: str | None = None,
+                                        end_date: str | None = None, aggregation: str = "hourly") -> str:
+    error = _forecast_args_error(start_date, end_date, aggregation)
+    if error:
+        return error
+    return _format_forecast(await aget_weather_forecast(latitude, longitude), start_date, end_date, aggregation)
 
 
 get_weather_forecast_tool = FunctionTool.from_defaults(
     fn=get_weather_forecast_tool_fn,
+    async_fn=aget_weather_forecast_tool_fn,
     name="get_weather_forecast",
     description="Uses the Open-Meteo Weather Forecast API to get the weather at a location for the next 7 days. " \
-    "Returns time (hourly), temperature (Celsius) and precipitation (mm)." \
+    "By default returns hourly temperature (Celsius) and precipitation (mm); set aggregation='daily' for one " \
+    "line per day with min/max temperature and total precipitation. Pass start_date and/or end_date (YYYY-MM-DD, local time) " \
+    "to only get those days." \
     "\nBest use get_coordinates before to get the latitude and longitude of the location you want the weather forecast for."
 )
 
 ### current weather tool
 
 def get_current_weather(latitude: float, longitude: float) -> dict:
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "current": ["temperature_2m", "precipitation", "weather_code", "wind_speed_10m", "cloud_cover"],
-        "timezone": "auto"
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    return get_weather(latitude, longitude)
 
-    return response.json()
 
-def get_current_weather_tool_fn(latitude: float, longitude: float) -> str:
-    weather = get_current_weather(latitude, longitude)
+async def aget_current_weather(latitude: float, longitude: float) -> dict:
+    return await aget_weather(latitude, longitude)
+
+
+def _format_current_weather(weather: dict) -> str:
     current_weather = weather["current"]
     temperature = current_weather["temperature_2m"]
     precipitation = current_weather["precipitation"]
@@ -178,8 +373,17 @@ def get_current_weather_tool_fn(latitude: float, longitude: float) -> str:
     result = f"Current Weather:\nTemperature: {temperature}°C\nPrecipitation: {precipitation}mm\nWind Speed: {wind_speed}km/h\nCloud Cover: {cloudcover}%"
     return result
 
+
+def get_current_weather_tool_fn(latitude: float, longitude: float) -> str:
+    return _format_current_weather(get_current_weather(latitude, longitude))
+
+
+async def aget_current_weather_tool_fn(latitude: float, longitude: float) -> str:
+    return _format_current_weather(await aget_current_weather(latitude, longitude))
+
 get_current_weather_tool = FunctionTool.from_defaults(
     fn=get_current_weather_tool_fn,
+    async_fn=aget_current_weather_tool_fn,
     name="get_current_weather",
     description="Uses the Open-Meteo Weather Forecast API to get the current weather at a location." \
     "Returns time (hourly), temperature (Celsius), precipitation (mm), wind speed (km/h) and cloud coverage (%)." \
@@ -203,6 +407,18 @@ def get_hub_stats(author: str) -> str:
     
 get_most_downloaded_model_by_creator_tool = FunctionTool.from_defaults(
     fn=get_hub_stats,
+    async_fn=run_in_thread(get_hub_stats),
     name="get_hub_stats",
     description="Returns the most downloaded model from a specified author."
-)
\ No newline at end of file
+)
+
+
+##### Full text of compacted tool outputs #####
+
+get_full_output_tool = FunctionTool.from_defaults(
+    fn=get_full_output,
+    name="get_full_output",
+    description="Long tool outputs are compacted to fit the context and end with a note giving a handle. "
+    "Pass that handle to read the full output, a page at a time: offset is the character to start at "
+    "and length the number of characters to return.",
+)
@@ -2,10 +2,23 @@ from llama_index.core.agent.workflow import AgentWorkflow
 from llama_index.llms.anthropic import Anthropic
 import tools as toolbox
 from llama_index.core.workflow import Context
+from python_pool import get_python_pool
+import cassette
+import output_budget
+import rate_limiter
+import tracing
 
 def create_agent():
 
-    llm = Anthropic(model="claude-haiku-4-5-20251001", temperature=0.1, max_tokens=1024)
+    get_python_pool()  # start warming up the execute_python workers in the background
+
+    cassette.install()  # no-op unless GAIA_CASSETTE_MODE is record or replay
+    llm = Anthropic(model="claude-haiku-4-5-20251001", temperature=0.1, max_tokens=1024,
+                    api_key=cassette.api_key("ANTHROPIC_API_KEY"))
+    # llama_index's Anthropic takes no http_client, so its SDK clients are re-created with ours:
+    # every LLM call waits for a token of the shared limiter, and goes through the cassette if enabled
+    llm._client = llm._client.copy(**cassette.anthropic_client_kwargs(False, rate_limiter.event_hooks(False)))
+    llm._aclient = llm._aclient.copy(**cassette.anthropic_client_kwargs(True, rate_limiter.event_hooks(True)))
 
     tool_list = [toolbox.websearch_tool,
                  toolbox.analyze_image_tool,
@@ -14,7 +27,11 @@ def create_agent():
                  toolbox.read_spreadsheet_tool,
                  toolbox.transcribe_audio_tool,
                  toolbox.execute_python_tool,
-                 toolbox.youtube_transcript_tool]
+                 toolbox.youtube_transcript_tool,
+                 toolbox.get_full_output_tool]
+    tool_list = [tracing.instrument_tool(tool) for tool in tool_list]
+    tracing.install_llm_instrumentation()
+    output_budget.set_step_key(tracing.current_step)  # tool calls of one LLM step share a token budget
 
     agent = AgentWorkflow.from_tools_or_functions(
         tools_or_functions=tool_list,
@@ -37,6 +54,7 @@ def create_agent():
             "   - .csv / .xlsx / .xls -> read_spreadsheet\n"
             "3. If a web search returns insufficient results, try a more specific or differently worded query.\n"
             "4. For math, prefer wolfram_alpha. For complex logic or counting, use execute_python.\n"
+            "5. Long tool outputs are compacted. If the part you need is missing, call get_full_output with the handle it gives.\n"
         )
     )
     ctx = Context(agent)
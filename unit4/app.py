@@ -1,53 +1,23 @@
 import os
-import time
 import gradio as gr
 import requests
 import pandas as pd
-from agent import create_agent
-import asyncio
-from llama_index.core.workflow import Context
+from run_journal import MAX_TASK_ATTEMPTS, RunJournal
+from runner import BasicAgent, DEFAULT_CONCURRENCY, run_questions
 
 # --- Constants ---
-DEFAULT_API_URL = "https://agents-course-unit4-scoring.hf.space"
-
-# ==============================================================================
-# YOUR AGENT — THIS IS WHERE YOU BUILD
-# ==============================================================================
-# Requirements:
-#   - __init__: set up your LLM, tools, memory, etc.
-#   - __call__(question: str) -> str: run the agent and return a plain string answer
-#
-# The agent will be called once per GAIA question. Each question is independent.
-# Answers must be short and exact (GAIA uses exact-match scoring).
-#
-# Example tools to add for GAIA: web search, calculator, file reader, code exec.
-# ==============================================================================
-
-class BasicAgent:
-    def __init__(self):
-        self.agent, self.ctx = create_agent()
-        print("Agent initialized.")
-
-    def __call__(self, question: str) -> str:
-        ctx = Context(self.agent)  # fresh context per question
-
-        async def _run():
-            return await self.agent.run(question, ctx=ctx)
-
-        response = str(asyncio.run(_run()))
-
-        if "FINAL ANSWER:" in response:
-            return response.split("FINAL ANSWER:")[-1].strip()
-        return response
-
-# ==============================================================================
-# END OF AGENT — do not modify below unless you know what you're doing
-# ==============================================================================
-
-def run_and_submit_all(profile: gr.OAuthProfile | None):
+DEFAULT_API_URL = os.getenv("GAIA_API_URL", "https://agents-course-unit4-scoring.hf.space")
+
+# The agent (BasicAgent) and the question runner live in runner.py.
+
+
+def run_and_submit_all(profile: gr.OAuthProfile | None, max_concurrency: int = DEFAULT_CONCURRENCY,
+                       submit_partial: bool = False):
     """
-    Fetches all questions, runs the BasicAgent on them, submits all answers,
-    and displays the results.
+    Fetches all questions, runs the BasicAgent on them (several questions in flight),
+    submits all answers, and displays the results.
+    Failed questions block submission unless `submit_partial` is set or each of them
+    has already failed in MAX_TASK_ATTEMPTS runs.
     """
     space_id = os.getenv("SPACE_ID")
 
@@ -90,32 +60,31 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         return f"An unexpected error occurred fetching questions: {e}", None
 
     # 3. Run Agent
-    results_log = []
-    answers_payload = []
-    print(f"Running agent on {len(questions_data)} questions...")
-    for item in questions_data:
-        task_id = item.get("task_id")
-        question_text = item.get("question")
-        if not task_id or question_text is None:
-            print(f"Skipping item with missing task_id or question: {item}")
-            continue
-        try:
-            file_name = item.get("file_name")
-            if file_name:
-                file_url = f"{api_url}/files/{task_id}"
-                question_text = f"{question_text}\n\nAttached file: {file_name}\nFile URL: {file_url}"
-            submitted_answer = agent(question_text)
-            answers_payload.append({"task_id": task_id, "submitted_answer": submitted_answer})
-            results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer})
-            time.sleep(3)  # avoid hitting Anthropic rate limits
-        except Exception as e:
-            print(f"Error running agent on task {task_id}: {e}")
-            results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"})
+    print(f"Running agent on {len(questions_data)} questions ({max_concurrency} in flight)...")
+    journal = RunJournal()
+    answers_payload, results_log = run_questions(
+        agent, questions_data, api_url, max_concurrency=max_concurrency, journal=journal
+    )
 
     if not answers_payload:
         print("Agent did not produce any answers to submit.")
         return "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
 
+    answered = {answer["task_id"] for answer in answers_payload}
+    failed = [entry["Task ID"] for entry in results_log if entry["Task ID"] not in answered]
+    permanent = journal.permanently_failed(failed)
+    if failed and not submit_partial and len(permanent) < len(failed):
+        status_message = (
+            f"{len(failed)} question(s) failed, so nothing was submitted yet. "
+            f"{len(answers_payload)} answers are saved in {journal.path}; "
+            f"run again to retry only the missing questions, or tick 'Submit even if some questions failed'. "
+            f"A question that fails in {MAX_TASK_ATTEMPTS} runs no longer blocks submission."
+        )
+        print(status_message)
+        return status_message, pd.DataFrame(results_log)
+    if failed:
+        print(f"Submitting without {len(failed)} failed question(s): {', '.join(failed)}")
+
     # 4. Submit
     submission_data = {"username": username.strip(), "agent_code": agent_code, "answers": answers_payload}
     print(f"Submitting {len(answers_payload)} answers to: {submit_url}")
@@ -131,6 +100,7 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
             f"Message: {result_data.get('message', 'No message received.')}"
         )
         print("Submission successful.")
+        journal.archive()
         return final_status, pd.DataFrame(results_log)
     except requests.exceptions.HTTPError as e:
         error_detail = f"Server responded with status {e.response.status_code}."
@@ -164,12 +134,16 @@ with gr.Blocks() as demo:
 
     gr.LoginButton()
 
+    concurrency_slider = gr.Slider(minimum=1, maximum=8, step=1, value=DEFAULT_CONCURRENCY,
+                                   label="Questions in flight")
+    submit_partial_checkbox = gr.Checkbox(value=False, label="Submit even if some questions failed")
     run_button = gr.Button("Run Evaluation & Submit All Answers")
     status_output = gr.Textbox(label="Run Status / Submission Result", lines=5, interactive=False)
     results_table = gr.DataFrame(label="Questions and Agent Answers", wrap=True)
 
     run_button.click(
         fn=run_and_submit_all,
+        inputs=[concurrency_slider, submit_partial_checkbox],
         outputs=[status_output, results_table]
     )
 
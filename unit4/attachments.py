@@ -0,0 +1,198 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import http_client
+
+ATTACHMENT_CACHE_DIR = os.getenv(
+    "ATTACHMENT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".attachment_cache")
+)
+ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv("ATTACHMENT_CACHE_MAX_BYTES", str(2 * 1024**3)))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+ACCESS_TIME_RESOLUTION = 300  # a cache hit rewrites index.json only if the stored access time is older
+
+
+@dataclass
+class Attachment:
+    url: str
+    path: str
+    sha256: str
+    size: int
+    content_type: str
+
+
+##### Content-addressed, size-bounded attachment store #####
+
+class AttachmentStore:
+    """
+    On-disk cache for task attachments shared by all file tools.
+
+    Downloads are streamed to disk and stored under their SHA-256, so the same file
+    reached through several URLs is kept once. `index.json` maps URLs to blobs and
+    records the last access time used for LRU eviction once `max_bytes` is exceeded.
+    Blobs that are leased (being read) are never evicted.
+    """
+
+    def __init__(self, cache_dir: str = ATTACHMENT_CACHE_DIR, max_bytes: int = ATTACHMENT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._url_locks: dict[str, threading.Lock] = {}
+        self._leases = Counter()  # sha -> readers currently holding the blob
+        self._index = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"urls": {}, "blobs": {}}
+        # drop entries whose blob vanished from disk
+        index["blobs"] = {
+            sha: meta for sha, meta in index.get("blobs", {}).items() if os.path.exists(self._blob_path(sha))
+        }
+        index["urls"] = {url: sha for url, sha in index.get("urls", {}).items() if sha in index["blobs"]}
+        return index
+
+    def _save_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.blob_dir, sha)
+
+    def _lookup(self, url: str) -> Attachment | None:
+        with self._lock:
+            sha = self._index["urls"].get(url)
+            if sha is None:
+                return None
+            meta = self._index["blobs"][sha]
+            now = time.time()
+            if now - meta["last_access"] > ACCESS_TIME_RESOLUTION:  # LRU order only needs coarse times
+                meta["last_access"] = now
+                self._save_index()
+            return Attachment(url, self._blob_path(sha), sha, meta["size"], meta["content_type"])
+
+    def fetch(self, url: str) -> Attachment:
+        """Returns the cached attachment for `url`, downloading it on the first request only."""
+        attachment = self._lookup(url)
+        if attachment is not None:
+            return attachment
+
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:  # concurrent callers for the same URL wait for a single download
+            attachment = self._lookup(url)
+            if attachment is None:
+                attachment = self._download(url)
+            return attachment
+
+    def _download(self, url: str) -> Attachment:
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with http_client.get(url, stream=True, timeout=(http_client.CONNECT_TIMEOUT, 60)) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "application/octet-stream").split(";")[0]
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        hasher.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+            sha = hasher.hexdigest()
+            os.replace(tmp_path, self._blob_path(sha))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._index["blobs"][sha] = {"size": size, "content_type": content_type, "last_access": time.time()}
+            self._index["urls"][url] = sha
+            self._evict(keep=sha)
+            self._save_index()
+        return Attachment(url, self._blob_path(sha), sha, size, content_type)
+
+    def _evict(self, keep: str):
+        blobs = self._index["blobs"]
+        total = sum(meta["size"] for meta in blobs.values())
+        for sha in sorted(blobs, key=lambda s: blobs[s]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if sha == keep or self._leases[sha]:
+                continue
+            total -= blobs.pop(sha)["size"]
+            self._index["urls"] = {url: s for url, s in self._index["urls"].items() if s != sha}
+            try:
+                os.remove(self._blob_path(sha))
+            except FileNotFoundError:
+                pass
+
+    def _resolve(self, attachment: Attachment | str) -> Attachment:
+        """Callers that already fetched pass the Attachment; a URL is fetched here."""
+        return attachment if isinstance(attachment, Attachment) else self.fetch(attachment)
+
+    @contextmanager
+    def lease(self, attachment: Attachment | str):
+        """Yields the attachment; its blob cannot be evicted until the block exits."""
+        url = attachment.url if isinstance(attachment, Attachment) else attachment
+        while True:
+            current = self._resolve(attachment)
+            with self._lock:
+                if current.sha256 in self._index["blobs"]:
+                    self._leases[current.sha256] += 1
+                    break
+            attachment = url  # evicted between fetch and lease: fetch it again
+        try:
+            yield current
+        finally:
+            with self._lock:
+                self._leases[current.sha256] -= 1
+                if not self._leases[current.sha256]:
+                    del self._leases[current.sha256]
+
+    def path(self, attachment: Attachment | str) -> str:
+        """Path of the blob; it may be evicted afterwards, so readers should prefer lease()."""
+        return self._resolve(attachment).path
+
+    def read_bytes(self, attachment: Attachment | str) -> bytes:
+        with self.lease(attachment) as leased, open(leased.path, "rb") as f:
+            return f.read()
+
+    @contextmanager
+    def open_mmap(self, attachment: Attachment | str):
+        """Memory-maps the cached file read-only; falls back to a bytes buffer for empty files."""
+        with self.lease(attachment) as leased:
+            if leased.size == 0:
+                yield memoryview(b"")
+                return
+            with open(leased.path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield mapped
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_attachment_store() -> AttachmentStore:
+    """Returns the process-wide attachment store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AttachmentStore()
+    return _store
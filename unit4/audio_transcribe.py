@@ -0,0 +1,177 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import cassette
+from attachments import get_attachment_store
+from cache import PersistentCache, make_key
+from http_client import backoff_delay
+from rate_limiter import AdaptiveTokenBucket, error_status_code, retry_after_seconds
+
+ASR_MODEL = "openai/whisper-large-v3"
+MAX_CHUNK_SECONDS = 30          # Whisper's native window
+MIN_CHUNK_SECONDS = 15          # never cut earlier than this when looking for a pause
+ASR_SAMPLE_RATE = 16000         # Whisper resamples to 16 kHz mono anyway
+FRAME_MS = 10
+SMOOTHING_FRAMES = 20           # look for pauses of ~200 ms
+ENERGY_BLOCK_FRAMES = 6000      # frames converted to float32 at a time (one minute of audio)
+ASR_MAX_WORKERS = int(os.getenv("ASR_MAX_WORKERS", "8"))  # chunk requests in flight at once
+ASR_MAX_RETRIES = 4
+ASR_RETRY_STATUSES = {429, 503}  # rate limited, or the model is still loading
+TRANSCRIPT_CACHE = PersistentCache("transcripts")
+TRANSCRIPT_CACHE_TTL = 365 * 24 * 3600
+
+# paces chunk requests to the ASR provider across all transcriptions; separate from the LLM limiter
+ASR_LIMITER = AdaptiveTokenBucket(rate=4.0, burst=ASR_MAX_WORKERS, max_rate=10.0)
+
+
+##### ASR backend (swap in a local stand-in for tests) #####
+
+_hf_client = None
+_hf_client_lock = threading.Lock()
+
+
+@cassette.replayable("hf_whisper")
+def hf_whisper_backend(audio_bytes: bytes) -> str:
+    global _hf_client
+    from huggingface_hub import InferenceClient
+
+    with _hf_client_lock:
+        if _hf_client is None:
+            _hf_client = InferenceClient(provider="hf-inference", api_key=os.getenv("HF_TOKEN"))
+    return _hf_client.automatic_speech_recognition(audio_bytes, model=ASR_MODEL).text
+
+
+_asr_backend = hf_whisper_backend
+
+
+def set_asr_backend(backend):
+    """Replaces the function used to transcribe one chunk of encoded audio, e.g. with a local model."""
+    global _asr_backend
+    _asr_backend = backend
+
+
+def _backend_name() -> str:
+    return ASR_MODEL if _asr_backend is hf_whisper_backend else getattr(_asr_backend, "__name__", "custom")
+
+
+def _transcribe_chunk(audio_bytes: bytes) -> str:
+    """One ASR request through ASR_LIMITER, retried with backoff while the provider answers 429/503."""
+    for attempt in range(ASR_MAX_RETRIES + 1):
+        ASR_LIMITER.acquire()
+        try:
+            text = _asr_backend(audio_bytes)
+        except Exception as e:
+            if error_status_code(e) not in ASR_RETRY_STATUSES or attempt == ASR_MAX_RETRIES:
+                raise
+            ASR_LIMITER.on_throttle(retry_after_seconds(e))
+            time.sleep(backoff_delay(attempt))
+            continue
+        ASR_LIMITER.on_success()
+        return text
+
+
+##### Splitting at pauses #####
+
+def find_cut_points(samples: np.ndarray, sample_rate: int, max_chunk_s: float = MAX_CHUNK_SECONDS,
+                    min_chunk_s: float = MIN_CHUNK_SECONDS) -> list[tuple[int, int]]:
+    """
+    Returns (start_ms, end_ms) spans no longer than `max_chunk_s`, cut at the quietest
+    ~200 ms stretch between `min_chunk_s` and `max_chunk_s` into each chunk.
+    """
+    frame_len = sample_rate * FRAME_MS // 1000
+    n_frames = len(samples) // frame_len
+    total_ms = len(samples) * 1000 // sample_rate
+    if n_frames == 0:
+        return [(0, total_ms)]
+
+    # RMS per frame, a block at a time so at most ENERGY_BLOCK_FRAMES frames exist as float32
+    energy = np.empty(n_frames, dtype=np.float32)
+    for first in range(0, n_frames, ENERGY_BLOCK_FRAMES):
+        last = min(first + ENERGY_BLOCK_FRAMES, n_frames)
+        block = samples[first * frame_len:last * frame_len].astype(np.float32).reshape(last - first, frame_len)
+        energy[first:last] = np.sqrt(np.einsum("ij,ij->i", block, block) / frame_len)
+    energy = np.convolve(energy, np.ones(SMOOTHING_FRAMES) / SMOOTHING_FRAMES, mode="same")
+
+    max_frames = int(max_chunk_s * 1000 / FRAME_MS)
+    min_frames = int(min_chunk_s * 1000 / FRAME_MS)
+    spans = []
+    start = 0
+    while n_frames - start > max_frames:
+        window = energy[start + min_frames:start + max_frames]
+        cut = start + min_frames + int(np.argmin(window))
+        spans.append((start * FRAME_MS, cut * FRAME_MS))
+        start = cut
+    spans.append((start * FRAME_MS, total_ms))
+    return spans
+
+
+def split_audio(audio_bytes: bytes) -> list[tuple[int, bytes]]:
+    """Decodes audio (any format ffmpeg reads) and returns [(start_ms, flac_bytes), ...] of 16 kHz mono."""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(audio_bytes)).set_channels(1).set_frame_rate(ASR_SAMPLE_RATE)
+    array = audio.get_array_of_samples()
+    samples = np.frombuffer(array, dtype=array.typecode)  # a view, not a copy
+    chunks = []
+    for start_ms, end_ms in find_cut_points(samples, audio.frame_rate):
+        buffer = io.BytesIO()
+        audio[start_ms:end_ms].export(buffer, format="flac")
+        chunks.append((start_ms, buffer.getvalue()))
+    return chunks
+
+
+def _timestamp(ms: int) -> str:
+    seconds = ms // 1000
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}" if seconds >= 3600 \
+        else f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+##### Full pipeline #####
+
+def transcribe_audio_bytes(audio_bytes: bytes, cache_key: str | None = None) -> str:
+    """
+    Transcribes chunks concurrently and stitches them back together with start timestamps.
+    With `cache_key`, every finished chunk is cached on its own, so after a failed chunk a
+    retry only transcribes the chunks that are still missing.
+    """
+    try:
+        chunks = split_audio(audio_bytes)
+    except Exception as e:
+        print(f"Could not split audio ({e}); transcribing it in one request.")
+        return _transcribe_chunk(audio_bytes).strip()
+
+    if len(chunks) == 1:
+        return _transcribe_chunk(chunks[0][1]).strip()
+
+    def one(index: int) -> str:
+        chunk_key = make_key(cache_key, "chunk", index) if cache_key else None
+        text = TRANSCRIPT_CACHE.get(chunk_key) if chunk_key else None
+        if text is None:
+            text = _transcribe_chunk(chunks[index][1])
+            if chunk_key:
+                TRANSCRIPT_CACHE.set(chunk_key, text, TRANSCRIPT_CACHE_TTL)
+        return text
+
+    with ThreadPoolExecutor(max_workers=min(len(chunks), ASR_MAX_WORKERS)) as pool:
+        futures = [pool.submit(one, i) for i in range(len(chunks))]
+    texts = [future.result() for future in futures]  # raises the first failure once every chunk has finished
+    return "\n".join(f"[{_timestamp(start_ms)}] {text.strip()}" for (start_ms, _), text in zip(chunks, texts))
+
+
+def transcribe_attachment(file_url: str) -> str:
+    """Transcribes a cached attachment, reusing earlier transcripts of the same audio content."""
+    store = get_attachment_store()
+    attachment = store.fetch(file_url)
+    cache_key = make_key(attachment.sha256, _backend_name(), MAX_CHUNK_SECONDS)
+    cached = TRANSCRIPT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    transcript = transcribe_audio_bytes(store.read_bytes(attachment), cache_key)
+    TRANSCRIPT_CACHE.set(cache_key, transcript, TRANSCRIPT_CACHE_TTL)
+    return transcript
@@ -0,0 +1,114 @@
+"""
+Offline benchmark of the GAIA runner: replays recorded cassettes against the local scoring
+stand-in at several concurrency levels and reports throughput and per-step overhead.
+
+    python benchmark.py fixtures/ --record              # one live run, saving cassettes
+    python benchmark.py fixtures/ --levels 1 2 4 8      # replays, no network or API keys needed
+    python benchmark.py fixtures/ --latency-scale 1     # replay with the recorded service latency
+
+Each level runs in a fresh process with empty tool caches, so every run sees the same calls.
+Per-step overhead is the question latency not spent inside the LLM or a tool, per LLM call.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_scoring_api import MOCK_API_PORT, start_mock_server
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+
+def run_level(concurrency: int) -> dict:
+    """Child process body: runs all questions once and returns timing numbers."""
+    import requests
+
+    from rate_limiter import AdaptiveTokenBucket
+    from runner import BasicAgent, run_questions
+
+    api_url = os.environ["GAIA_API_URL"]
+    questions = requests.get(f"{api_url}/questions", timeout=15).json()
+    agent = BasicAgent()
+
+    unlimited = AdaptiveTokenBucket(rate=1e6, burst=1e6, max_rate=1e6)  # measure the runner, not the pacing
+    start = time.perf_counter()
+    answers, log = run_questions(agent, questions, api_url, max_concurrency=concurrency, limiter=unlimited)
+    wall = time.perf_counter() - start
+
+    with open(os.environ["GAIA_TRACE_PATH"], "r", encoding="utf-8") as f:
+        summaries = [span for span in map(json.loads, f) if span["kind"] == "question"]
+    overheads = [max(0.0, s["latency"] - s["llm_seconds"] - s["tool_seconds"]) / max(1, s["llm_calls"])
+                 for s in summaries]
+    return {
+        "concurrency": concurrency,
+        "questions": len(questions),
+        "answered": len(answers),
+        "wall_seconds": wall,
+        "questions_per_minute": 60 * len(questions) / wall if wall else 0.0,
+        "mean_latency": sum(s["latency"] for s in summaries) / len(summaries) if summaries else 0.0,
+        "step_overhead_ms": 1000 * sum(overheads) / len(overheads) if overheads else 0.0,
+        "llm_calls": sum(s["llm_calls"] for s in summaries),
+        "tool_calls": sum(s["tool_calls"] for s in summaries),
+    }
+
+
+def spawn_level(concurrency: int, mode: str, cassette_dir: str, latency_scale: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="gaia-bench-") as scratch:
+        env = {
+            **os.environ,
+            "GAIA_API_URL": f"http://127.0.0.1:{MOCK_API_PORT}",
+            "GAIA_CASSETTE_MODE": mode,
+            "GAIA_CASSETTE_DIR": cassette_dir,
+            "GAIA_REPLAY_LATENCY": str(latency_scale),
+            "TOOL_CACHE_PATH": os.path.join(scratch, "tool_cache.sqlite"),
+            "ATTACHMENT_CACHE_DIR": os.path.join(scratch, "attachments"),
+            "GAIA_TRACE_PATH": os.path.join(scratch, "trace.jsonl"),
+        }
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(concurrency)],
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+        )
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Benchmark run at concurrency {concurrency} failed:\n{process.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures_dir", nargs="?", help="directory written by `mock_scoring_api.py snapshot`")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--cassette-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes"))
+    parser.add_argument("--record", action="store_true", help="run once live and record cassettes")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="replay recorded latency x this factor")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(RESULT_PREFIX + json.dumps(run_level(args.child)), flush=True)
+        return
+    if not args.fixtures_dir:
+        parser.error("fixtures_dir is required")
+
+    server = start_mock_server(args.fixtures_dir)
+    try:
+        if args.record:
+            result = spawn_level(1, "record", args.cassette_dir, 0.0)
+            print(f"Recorded {result['questions']} questions into {args.cassette_dir} "
+                  f"({result['llm_calls']} LLM calls, {result['tool_calls']} tool calls).")
+            return
+
+        print(f"{'in flight':>9} {'wall (s)':>9} {'q/min':>8} {'latency (s)':>12} {'step overhead (ms)':>19} {'answered':>9}")
+        for level in args.levels:
+            r = spawn_level(level, "replay", args.cassette_dir, args.latency_scale)
+            print(f"{r['concurrency']:>9} {r['wall_seconds']:>9.2f} {r['questions_per_minute']:>8.1f} "
+                  f"{r['mean_latency']:>12.2f} {r['step_overhead_ms']:>19.1f} {r['answered']:>6}/{r['questions']}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
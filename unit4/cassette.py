@@ -0,0 +1,267 @@
+"""
+Record/replay of every LLM and tool call made during a GAIA run.
+
+GAIA_CASSETTE_MODE=record  passes requests through and appends each request/response to
+                           GAIA_CASSETTE_DIR/<task_id>.jsonl
+GAIA_CASSETTE_MODE=replay  serves the recorded responses without touching the network
+                           (GAIA_REPLAY_LATENCY scales the recorded latency, 0 = instant)
+
+HTTP is intercepted under http_client (requests adapter + httpx transport) and under the
+Anthropic clients; SDK calls that bypass both are wrapped with @replayable.
+"""
+import asyncio
+import base64
+import functools
+import glob
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CASSETTE_MODE = os.getenv("GAIA_CASSETTE_MODE", "off")
+CASSETTE_DIR = os.getenv("GAIA_CASSETTE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes"))
+REPLAY_LATENCY = float(os.getenv("GAIA_REPLAY_LATENCY", "0"))
+SECRET_PARAMS = {"appid", "api_key", "apikey", "key", "token"}
+PASSTHROUGH_HOSTS = {"localhost", "127.0.0.1"}   # the local scoring stand-in is served live in every mode
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CassetteMissError(requests.ConnectionError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+def enabled() -> bool:
+    return CASSETTE_MODE in ("record", "replay")
+
+
+##### Fingerprints and storage #####
+
+def _strip_secrets(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in SECRET_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ""))
+
+
+def _canonical_body(body: bytes | None) -> str:
+    if not body:
+        return ""
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except (ValueError, UnicodeDecodeError):
+        return hashlib.sha256(body).hexdigest()
+
+
+def fingerprint(method: str, url: str, body: bytes | None) -> str:
+    key = f"{method.upper()} {_strip_secrets(url)}\n{_canonical_body(body)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _cassette_name() -> str:
+    import tracing
+
+    trace = tracing.current_trace()
+    return str(trace.task_id) if trace is not None and trace.task_id else "shared"
+
+
+class CassetteStore:
+    def __init__(self, directory: str = CASSETTE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._recordings = None
+        self._served = defaultdict(int)
+
+    def _load(self):
+        recordings = defaultdict(list)
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.jsonl"))):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    recordings[entry["fingerprint"]].append(entry)
+        return recordings
+
+    def lookup(self, key: str) -> dict:
+        """Returns the next recording for `key`; repeated identical requests replay in recorded order."""
+        with self._lock:
+            if self._recordings is None:
+                self._recordings = self._load()
+            entries = self._recordings.get(key)
+            if not entries:
+                raise CassetteMissError(f"No recording for request {key[:12]} in {self.directory}")
+            index = min(self._served[key], len(entries) - 1)
+            self._served[key] += 1
+            return entries[index]
+
+    def record(self, entry: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, open(os.path.join(self.directory, f"{_cassette_name()}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+_store = CassetteStore()
+
+
+def _entry(key: str, label: str, status: int, headers: dict, body: bytes, elapsed: float) -> dict:
+    headers = {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}
+    return {"fingerprint": key, "request": label, "status": status, "headers": headers,
+            "body": base64.b64encode(body).decode("ascii"), "elapsed": elapsed, "task": _cassette_name()}
+
+
+def _replay_delay(entry: dict) -> float:
+    return entry.get("elapsed", 0.0) * REPLAY_LATENCY
+
+
+##### requests (sync http_client) #####
+
+class CassetteAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        if urlsplit(request.url).hostname in PASSTHROUGH_HOSTS:
+            return super().send(request, **kwargs)
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        key = fingerprint(request.method, request.url, body)
+
+        if CASSETTE_MODE == "replay":
+            entry = _store.lookup(key)
+            time.sleep(_replay_delay(entry))
+            response = requests.Response()
+            response.status_code = entry["status"]
+            response.headers.update(entry["headers"])
+            response._content = base64.b64decode(entry["body"])
+            response.url = request.url
+            response.request = request
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+            return response
+
+        start = time.time()
+        response = super().send(request, **kwargs)
+        content = response.content
+        _store.record(_entry(key, f"{request.method} {_strip_secrets(request.url)}", response.status_code,
+                             dict(response.headers), content, time.time() - start))
+        return response
+
+
+##### httpx (async http_client and the Anthropic SDK) #####
+
+def _httpx_transports(httpx_module: str = "httpx"):
+    """Cassette transports for `httpx_module` (the Anthropic SDK may ship its own httpx fork)."""
+    httpx = importlib.import_module(httpx_module)
+
+    class CassetteAsyncTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self._inner = httpx.AsyncHTTPTransport()
+
+        async def handle_async_request(self, request):
+            body = await request.aread()
+            if request.url.host in PASSTHROUGH_HOSTS:
+                return await self._inner.handle_async_request(request)
+            key = fingerprint(request.method, str(request.url), body)
+            if CASSETTE_MODE == "replay":
+                entry = _store.lookup(key)
+                await asyncio.sleep(_replay_delay(entry))
+                return httpx.Response(entry["status"], headers=entry["headers"], content=base64.b64decode(entry["body"]))
+
+            start = time.time()
+            response = await self._inner.handle_async_request(request)
+            content = await response.aread()
+            await response.aclose()
+            entry = _entry(key, f"{request.method} {_strip_secrets(str(request.url))}", response.status_code,
+                           dict(response.headers), content, time.time() - start)
+            _store.record(entry)
+            return httpx.Response(response.status_code, headers=entry["headers"], content=content)
+
+    class CassetteTransport(httpx.BaseTransport):
+        def __init__(self):
+            self._inner = httpx.HTTPTransport()
+
+        def handle_request(self, request):
+            body = request.read()
+            if request.url.host in PASSTHROUGH_HOSTS:
+                return self._inner.handle_request(request)
+            key = fingerprint(request.method, str(request.url), body)
+            if CASSETTE_MODE == "replay":
+                entry = _store.lookup(key)
+                time.sleep(_replay_delay(entry))
+                return httpx.Response(entry["status"], headers=entry["headers"], content=base64.b64decode(entry["body"]))
+
+            start = time.time()
+            response = self._inner.handle_request(request)
+            content = response.read()
+            response.close()
+            entry = _entry(key, f"{request.method} {_strip_secrets(str(request.url))}", response.status_code,
+                           dict(response.headers), content, time.time() - start)
+            _store.record(entry)
+            return httpx.Response(response.status_code, headers=entry["headers"], content=content)
+
+    return CassetteTransport, CassetteAsyncTransport
+
+
+def api_key(env_var: str) -> str | None:
+    """The key from `env_var`; replays need none, so a placeholder stands in when it is unset."""
+    value = os.getenv(env_var)
+    return value if value or CASSETTE_MODE != "replay" else "replay"
+
+
+def anthropic_client_kwargs(is_async: bool, event_hooks: dict | None = None) -> dict:
+    """
+    Extra kwargs for anthropic.Anthropic/AsyncAnthropic: an httpx client that carries `event_hooks`
+    (e.g. rate_limiter.event_hooks) and sends its HTTP through the cassette when it is enabled.
+    """
+    if not enabled() and not event_hooks:
+        return {}
+    import anthropic
+
+    client_class = anthropic.DefaultAsyncHttpxClient if is_async else anthropic.DefaultHttpxClient
+    client_kwargs = {"event_hooks": event_hooks} if event_hooks else {}
+    kwargs = {}
+    if enabled():
+        sync_transport, async_transport = _httpx_transports(client_class.__mro__[1].__module__.split(".")[0])
+        client_kwargs["transport"] = async_transport() if is_async else sync_transport()
+        kwargs["api_key"] = api_key("ANTHROPIC_API_KEY")
+    return {**kwargs, "http_client": client_class(**client_kwargs)}
+
+
+def install():
+    """Routes http_client through the cassette when GAIA_CASSETTE_MODE is record or replay."""
+    if not enabled():
+        return
+    import http_client
+
+    _, async_transport = _httpx_transports()
+    http_client.set_transports(adapter_class=CassetteAdapter, async_transport_factory=async_transport)
+    print(f"Cassette {CASSETTE_MODE} mode: {CASSETTE_DIR}")
+
+
+##### SDK calls that bypass both HTTP clients #####
+
+def _argument_digest(args, kwargs) -> str:
+    hasher = hashlib.sha256()
+    for value in [*args, *sorted(kwargs.items())]:
+        hasher.update(value if isinstance(value, bytes) else repr(value).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def replayable(name: str):
+    """Records/replays the JSON-serializable return value of a function keyed by its arguments."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            key = fingerprint("CALL", f"sdk://{name}", _argument_digest(args, kwargs).encode("ascii"))
+            if CASSETTE_MODE == "replay":
+                entry = _store.lookup(key)
+                time.sleep(_replay_delay(entry))
+                return json.loads(base64.b64decode(entry["body"]))
+            start = time.time()
+            result = fn(*args, **kwargs)
+            _store.record(_entry(key, f"CALL {name}", 200, {}, json.dumps(result).encode("utf-8"), time.time() - start))
+            return result
+        return wrapper
+    return decorator
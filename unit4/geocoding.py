@@ -0,0 +1,261 @@
+"""
+Two-tier geocoder for get_coordinates.
+
+1. An offline gazetteer (GeoNames cities500 by default) stored as memory-mapped numpy arrays:
+   a sorted array of normalized-name hashes pointing into a table of places.
+   Build it once with:
+       python geocoding.py build cities500.txt --country-info countryInfo.txt
+   (both files from https://download.geonames.org/export/dump/)
+   The directory is generated and git-ignored; until it is built (or if it cannot be loaded)
+   lookups simply skip this tier.
+2. A persistent cache of Open-Meteo geocoding answers, including "not found".
+
+The API is only called when both tiers miss.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import http_client
+from cache import PersistentCache, make_key
+
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+GAZETTEER_DIR = os.getenv("GAZETTEER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer"))
+GEOCODE_CACHE = PersistentCache("geocoding")
+FOUND_TTL = 90 * 24 * 3600
+NOT_FOUND_TTL = 24 * 3600
+BATCH_WORKERS = 8
+
+PLACE_DTYPE = np.dtype([("latitude", "f4"), ("longitude", "f4"), ("population", "i8"),
+                        ("country", "S2"), ("name", "S64")])
+
+# gazetteer / cached / remote split of lookups
+GEOCODE_STATS = Counter()
+_stats_lock = threading.Lock()
+
+
+def normalize_place(name: str) -> str:
+    """Lowercase, accents and punctuation stripped: "São  Paulo!" -> "sao paulo"."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def _name_hash(normalized: str) -> np.uint64:
+    return np.uint64(int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little"))
+
+
+def _record(kind: str):
+    with _stats_lock:
+        GEOCODE_STATS[kind] += 1
+
+
+def geocode_stats() -> dict:
+    with _stats_lock:
+        return dict(GEOCODE_STATS)
+
+
+##### Tier 1: memory-mapped gazetteer #####
+
+class Gazetteer:
+    def __init__(self, directory: str = GAZETTEER_DIR):
+        self.keys = np.load(os.path.join(directory, "keys.npy"), mmap_mode="r")
+        self.rows = np.load(os.path.join(directory, "rows.npy"), mmap_mode="r")
+        self.places = np.load(os.path.join(directory, "places.npy"), mmap_mode="r")
+        countries_path = os.path.join(directory, "countries.json")
+        self.countries = {}
+        if os.path.exists(countries_path):
+            with open(countries_path, "r", encoding="utf-8") as f:
+                self.countries = json.load(f)
+        self.country_codes = {normalize_place(name): code for code, name in self.countries.items()}
+
+    def _candidates(self, normalized: str) -> np.ndarray:
+        key = _name_hash(normalized)
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key, side="right")
+        return np.asarray(self.rows[lo:hi])
+
+    def lookup(self, location: str) -> dict | None:
+        """The most populous place called `location`; "Name, Country" narrows by country name or code."""
+        name, _, qualifier = location.partition(",")
+        candidates = self._candidates(normalize_place(name))
+        if not len(candidates):
+            return None
+        places = self.places[candidates]
+        if qualifier.strip():
+            wanted = normalize_place(qualifier)
+            code = self.country_codes.get(wanted, wanted.upper() if len(wanted) == 2 else None)
+            places = places[places["country"] == (code or "").encode("ascii", "ignore")]
+            if not len(places):
+                return None  # e.g. "Paris, Texas": leave regions to the API
+        place = places[np.argmax(places["population"])]
+        country = place["country"].decode("ascii")
+        return {
+            "latitude": round(float(place["latitude"]), 5),
+            "longitude": round(float(place["longitude"]), 5),
+            "name": place["name"].decode("utf-8", "ignore"),
+            "country": self.countries.get(country, country),
+        }
+
+
+_gazetteer = None
+_gazetteer_failed = False
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer | None:
+    """The process-wide gazetteer, or None when it has not been built or cannot be loaded."""
+    global _gazetteer, _gazetteer_failed
+    with _gazetteer_lock:
+        if _gazetteer is None and not _gazetteer_failed and os.path.exists(os.path.join(GAZETTEER_DIR, "keys.npy")):
+            try:
+                _gazetteer = Gazetteer(GAZETTEER_DIR)
+            except (OSError, ValueError) as e:  # half-written build, or arrays from another numpy version
+                _gazetteer_failed = True
+                print(f"Gazetteer in {GAZETTEER_DIR} could not be loaded, using the geocoding API only: {e}")
+    return _gazetteer
+
+
+def build_gazetteer(cities_path: str, out_dir: str = GAZETTEER_DIR, country_info_path: str | None = None,
+                    alternate_names: bool = False):
+    """Converts a GeoNames dump (tab-separated, e.g. cities500.txt) into the memory-mapped arrays."""
+    places, keys, rows = [], [], []
+    with open(cities_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 15:
+                continue
+            row = len(places)
+            places.append((float(fields[4]), float(fields[5]), int(fields[14] or 0), fields[8].encode("ascii", "ignore"),
+                           fields[1].encode("utf-8")[:64]))
+            names = {fields[1], fields[2], *(fields[3].split(",") if alternate_names and fields[3] else [])}
+            for name in {normalize_place(n) for n in names if n}:
+                if name:
+                    keys.append(_name_hash(name))
+                    rows.append(row)
+
+    keys = np.array(keys, dtype=np.uint64)
+    order = np.argsort(keys, kind="stable")
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "keys.npy"), keys[order])
+    np.save(os.path.join(out_dir, "rows.npy"), np.array(rows, dtype=np.int32)[order])
+    np.save(os.path.join(out_dir, "places.npy"), np.array(places, dtype=PLACE_DTYPE))
+
+    if country_info_path:
+        countries = {}
+        with open(country_info_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) > 4:
+                    countries[fields[0]] = fields[4]
+        with open(os.path.join(out_dir, "countries.json"), "w", encoding="utf-8") as f:
+            json.dump(countries, f, ensure_ascii=False)
+    print(f"Gazetteer: {len(places)} places, {len(keys)} names in {out_dir}")
+
+
+##### Tier 2: persistent cache of API answers #####
+
+def _parse_coordinates(data: dict, location: str) -> dict:
+    if "results" in data and len(data["results"]) > 0:
+        result = data["results"][0]
+        return {
+            "latitude": result.get("latitude"),
+            "longitude": result.get("longitude"),
+            "name": result.get("name"),
+            "country": result.get("country"),
+        }
+    else:
+        return {"error": f"No coordinates found for location: {location}"}
+
+
+def _resolve_locally(location: str) -> tuple[dict | None, str]:
+    """Returns (coordinates, cache_key); coordinates is None when the API has to be asked."""
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        found = gazetteer.lookup(location)
+        if found is not None:
+            _record("gazetteer")
+            return found, ""
+    cache_key = make_key(normalize_place(location))
+    cached = GEOCODE_CACHE.get(cache_key)
+    if cached is not None:
+        _record("cached")
+    return cached, cache_key
+
+
+def _remember(cache_key: str, coordinates: dict):
+    GEOCODE_CACHE.set(cache_key, coordinates, NOT_FOUND_TTL if "error" in coordinates else FOUND_TTL)
+
+
+def resolve(location: str) -> dict:
+    coordinates, cache_key = _resolve_locally(location)
+    if coordinates is not None:
+        return coordinates
+
+    _record("remote")
+    response = http_client.get(GEOCODING_URL, params={"name": location, "count": 1})
+    response.raise_for_status()
+    coordinates = _parse_coordinates(response.json(), location)
+    _remember(cache_key, coordinates)
+    return coordinates
+
+
+async def aresolve(location: str) -> dict:
+    coordinates, cache_key = _resolve_locally(location)
+    if coordinates is not None:
+        return coordinates
+
+    _record("remote")
+    response = await http_client.aget(GEOCODING_URL, params={"name": location, "count": 1})
+    response.raise_for_status()
+    coordinates = _parse_coordinates(response.json(), location)
+    _remember(cache_key, coordinates)
+    return coordinates
+
+
+def resolve_many(locations: list[str]) -> dict:
+    """Resolves every location, calling the API concurrently only for names both local tiers miss."""
+    unique = list(dict.fromkeys(locations))
+
+    def one(location):
+        try:
+            return resolve(location)
+        except Exception as e:
+            return {"error": f"Geocoding failed for {location}: {e}"}
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, max(1, len(unique)))) as pool:
+        return dict(zip(unique, pool.map(one, unique)))
+
+
+async def aresolve_many(locations: list[str]) -> dict:
+    unique = list(dict.fromkeys(locations))
+
+    async def one(location):
+        try:
+            return await aresolve(location)
+        except Exception as e:
+            return {"error": f"Geocoding failed for {location}: {e}"}
+
+    return dict(zip(unique, await asyncio.gather(*(one(location) for location in unique))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer from a GeoNames dump.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("cities_path", help="e.g. cities500.txt")
+    parser.add_argument("--country-info", help="countryInfo.txt, to return country names instead of codes")
+    parser.add_argument("--alternate-names", action="store_true", help="also index alternate/localized names")
+    parser.add_argument("--out", default=GAZETTEER_DIR)
+    args = parser.parse_args()
+    build_gazetteer(args.cities_path, args.out, args.country_info, args.alternate_names)
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+POOL_SIZE_PER_HOST = 16
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, BACKOFF_BASE * 2 ** attempt)
+
+
+##### Sync client: one requests.Session with keep-alive pools per host #####
+
+_session = None
+_session_lock = threading.Lock()
+_adapter_class = HTTPAdapter
+_async_transport_factory = None
+
+
+def set_transports(adapter_class=HTTPAdapter, async_transport_factory=None):
+    """
+    Swaps the transport layer under both clients, e.g. for a record/replay harness.
+    `adapter_class` must accept HTTPAdapter's arguments; `async_transport_factory()` returns an httpx transport.
+    """
+    global _session, _adapter_class, _async_transport_factory
+    with _session_lock:
+        _adapter_class = adapter_class
+        _async_transport_factory = async_transport_factory
+        _session = None
+    _async_clients.clear()
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide session; urllib3 keeps a keep-alive pool for every host it talks to."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_BASE,
+                backoff_jitter=BACKOFF_BASE,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=IDEMPOTENT_METHODS,
+                raise_on_status=False,
+                respect_retry_after_header=True,
+            )
+            adapter = _adapter_class(pool_connections=POOL_SIZE_PER_HOST, pool_maxsize=POOL_SIZE_PER_HOST, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def _retry_after(response) -> float | None:
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(response, attempt: int) -> float:
+    """The server's Retry-After when it sent one, otherwise exponential backoff."""
+    retry_after = _retry_after(response)
+    return retry_after if retry_after is not None else backoff_delay(attempt)
+
+
+def post(url: str, idempotent: bool = False, retry_unprocessed: bool = False, **kwargs) -> requests.Response:
+    """
+    POSTs are not retried unless the caller marks the request as safe to repeat. `retry_unprocessed`
+    is for paid APIs: only a 429 carrying Retry-After is retried, after that delay (connection
+    failures are already retried by the adapter, since nothing reached the server).
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    attempt = 0
+    while True:
+        try:
+            response = get_session().post(url, **kwargs)
+            if attempt >= MAX_RETRIES:
+                return response
+            if idempotent and response.status_code in RETRY_STATUSES:
+                delay = _retry_delay(response, attempt)
+            elif retry_unprocessed and response.status_code == 429 and _retry_after(response) is not None:
+                delay = _retry_after(response)
+            else:
+                return response
+        except (requests.ConnectionError, requests.Timeout):
+            if not idempotent or attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        time.sleep(delay)
+        attempt += 1
+
+
+##### Async client: one httpx.AsyncClient per event loop #####
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Returns the httpx client bound to the running event loop (connections cannot be shared across loops)."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_SIZE_PER_HOST * 4, max_keepalive_connections=POOL_SIZE_PER_HOST),
+            follow_redirects=True,
+            transport=_async_transport_factory() if _async_transport_factory else None,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def _arequest(method: str, url: str, retry: bool, retry_unprocessed: bool = False, **kwargs):
+    """`retry_unprocessed` retries only a refused connection and a 429 carrying Retry-After."""
+    import httpx
+
+    attempt = 0
+    while True:
+        try:
+            response = await get_async_client().request(method, url, **kwargs)
+            if attempt >= MAX_RETRIES:
+                return response
+            if retry and response.status_code in RETRY_STATUSES:
+                delay = _retry_delay(response, attempt)
+            elif retry_unprocessed and response.status_code == 429 and _retry_after(response) is not None:
+                delay = _retry_after(response)
+            else:
+                return response
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if not (retry or retry_unprocessed) or attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        except (httpx.TimeoutException, httpx.RemoteProtocolError):
+            if not retry or attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def aget(url: str, **kwargs):
+    return await _arequest("GET", url, retry=True, **kwargs)
+
+
+async def apost(url: str, idempotent: bool = False, retry_unprocessed: bool = False, **kwargs):
+    return await _arequest("POST", url, retry=idempotent, retry_unprocessed=retry_unprocessed, **kwargs)
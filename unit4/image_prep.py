@@ -0,0 +1,34 @@
+import io
+
+from PIL import Image
+
+# Claude downsizes anything larger than this before the model sees it, so sending more is wasted upload and tokens
+MAX_LONG_EDGE = 1568
+MAX_PIXELS = 1_150_000
+JPEG_QUALITY = 85
+SUPPORTED_MEDIA_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+
+
+def prepare_image(data: bytes, media_type: str) -> tuple[bytes, str]:
+    """
+    Downsizes an image to the resolution the vision model actually uses and re-encodes it.
+    Returns (bytes, media_type); small images in a supported format are passed through unchanged.
+    """
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    scale = min(1.0, MAX_LONG_EDGE / max(width, height), (MAX_PIXELS / (width * height)) ** 0.5)
+
+    if scale >= 1.0 and media_type in SUPPORTED_MEDIA_TYPES:
+        return data, media_type
+
+    if scale < 1.0:
+        image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha or media_type == "image/png":
+        # keep PNG for transparency and for line art / screenshots where JPEG artifacts hurt legibility
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "image/png"
+    image.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), "image/jpeg"
@@ -0,0 +1,281 @@
+import ast
+import json
+import math
+import operator
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+# local / cached / remote split of wolfram_alpha queries
+MATH_STATS = Counter()
+_stats_lock = threading.Lock()
+
+MAX_EXPONENT = 10000
+MAX_RESULT_BITS = 100_000        # bound on |base ** exponent|, whatever produced the exponent
+MAX_FACTORIAL = 10000
+SYMBOLIC_TIMEOUT_SECONDS = float(os.getenv("LOCAL_MATH_TIMEOUT_SECONDS", "5"))
+SYMBOLIC_QUEUE_SECONDS = 1.0  # longest wait for a free Python worker before asking Wolfram Alpha instead
+WORKER_RESULT_MARKER = "LOCAL_MATH_RESULT "
+
+FUNCTIONS = {
+    "sqrt": math.sqrt, "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x), "exp": math.exp,
+    "ln": math.log, "log": math.log, "log10": math.log10, "log2": math.log2,  # Wolfram Alpha reads log as ln
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "sinh": math.sinh, "cosh": math.cosh, "tanh": math.tanh,
+    "abs": abs, "floor": math.floor, "ceil": math.ceil, "round": round, "factorial": lambda n: _factorial(n),
+    "gcd": math.gcd, "lcm": math.lcm, "min": min, "max": max,
+}
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# linear units, expressed in a base unit per dimension
+UNITS = {
+    "length": {"m": 1, "meter": 1, "metre": 1, "km": 1000, "kilometer": 1000, "kilometre": 1000, "cm": 0.01,
+               "centimeter": 0.01, "mm": 0.001, "millimeter": 0.001, "mi": 1609.344, "mile": 1609.344,
+               "yd": 0.9144, "yard": 0.9144, "ft": 0.3048, "foot": 0.3048, "feet": 0.3048, "in": 0.0254,
+               "inch": 0.0254, "inches": 0.0254, "nmi": 1852, "nautical mile": 1852},
+    "mass": {"kg": 1, "kilogram": 1, "g": 0.001, "gram": 0.001, "mg": 1e-6, "milligram": 1e-6, "t": 1000,
+             "tonne": 1000, "lb": 0.45359237, "lbs": 0.45359237, "pound": 0.45359237, "oz": 0.028349523125,
+             "ounce": 0.028349523125, "stone": 6.35029318},
+    "volume": {"l": 1, "liter": 1, "litre": 1, "ml": 0.001, "milliliter": 0.001, "gal": 3.785411784,
+               "gallon": 3.785411784, "qt": 0.946352946, "quart": 0.946352946, "pt": 0.473176473,
+               "pint": 0.473176473, "cup": 0.2365882365, "fl oz": 0.0295735295625, "m3": 1000},
+    "time": {"s": 1, "sec": 1, "second": 1, "min": 60, "minute": 60, "h": 3600, "hr": 3600, "hour": 3600,
+             "day": 86400, "week": 604800, "year": 31557600},
+    "speed": {"m/s": 1, "km/h": 1 / 3.6, "kph": 1 / 3.6, "mph": 0.44704, "knot": 0.514444},
+    "area": {"m2": 1, "km2": 1e6, "hectare": 1e4, "ha": 1e4, "acre": 4046.8564224, "ft2": 0.09290304},
+}
+TEMPERATURES = {"c": "C", "celsius": "C", "f": "F", "fahrenheit": "F", "k": "K", "kelvin": "K"}
+
+NUMBER = r"[-+]?\d[\d,]*(?:\.\d+)?(?:e[-+]?\d+)?"
+PERCENT_OF = re.compile(rf"^({NUMBER})\s*(?:%|percent)\s+of\s+(.+)$")
+CONVERSION = re.compile(rf"^(?:convert\s+)?({NUMBER})\s*(?:degrees?\s+)?([a-z/ 0-9]+?)\s+(?:to|in|into)\s+(?:degrees?\s+)?([a-z/ 0-9]+)$")
+SYMPY_COMMAND = re.compile(
+    r"^(integrate|integral of|derivative of|differentiate|solve|simplify|factor|expand|limit of)\s+(.+)$"
+)
+LEADING_FILLER = re.compile(r"^(?:what is|what's|calculate|compute|evaluate)\s+")
+
+
+def _format_number(value) -> str:
+    if isinstance(value, bool):
+        raise ValueError("not a number")
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.10g}"
+
+
+##### Safe arithmetic (no eval) #####
+
+def _factorial(n):
+    if n > MAX_FACTORIAL:
+        raise ValueError("factorial argument too large")
+    return math.factorial(n)
+
+
+def _power(base, exponent):
+    """base ** exponent, refused when the exponent or the size of the result is out of bounds."""
+    if abs(exponent) > MAX_EXPONENT:
+        raise ValueError("exponent too large")
+    if abs(base) > 1 and exponent > 0 and exponent * math.log2(abs(base)) > MAX_RESULT_BITS:
+        raise ValueError("result too large")
+    return operator.pow(base, exponent)
+
+
+def _eval_node(node):
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in CONSTANTS:
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+        left, right = _eval_node(node.left), _eval_node(node.right)
+        if isinstance(node.op, ast.Pow):
+            return _power(left, right)  # checked on evaluated operands, so 9**9**9 is caught too
+        return BINARY_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+        return UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+        return FUNCTIONS[node.func.id](*[_eval_node(arg) for arg in node.args])
+    raise ValueError(f"unsupported expression: {ast.dump(node)[:60]}")
+
+
+def evaluate_arithmetic(expression: str):
+    expression = expression.replace("^", "**").replace("×", "*").replace("÷", "/").replace(",", "")
+    expression = re.sub(r"(\d+(?:\.\d+)?)\s*%", r"(\1/100)", expression)
+    expression = re.sub(r"(\d+)!", r"factorial(\1)", expression)
+    return _eval_node(ast.parse(expression, mode="eval"))
+
+
+##### Unit conversions #####
+
+def _find_unit(name: str):
+    name = name.strip().rstrip("s") if name.strip() not in ("s", "lbs", "ms") else name.strip()
+    for dimension, units in UNITS.items():
+        for candidate in (name, name + "s"):
+            if candidate in units:
+                return dimension, units[candidate]
+    return None
+
+
+def convert_units(value: float, source: str, target: str) -> float | None:
+    source, target = source.strip(), target.strip()
+    if source in TEMPERATURES and target in TEMPERATURES:
+        celsius = {"C": lambda v: v, "F": lambda v: (v - 32) * 5 / 9, "K": lambda v: v - 273.15}[TEMPERATURES[source]](value)
+        return {"C": lambda c: c, "F": lambda c: c * 9 / 5 + 32, "K": lambda c: c + 273.15}[TEMPERATURES[target]](celsius)
+    src, dst = _find_unit(source), _find_unit(target)
+    if src is None or dst is None or src[0] != dst[0]:
+        return None
+    return value * src[1] / dst[1]
+
+
+##### Symbolic queries (SymPy, optional) #####
+
+# the only names a symbolic query may use; any other word is rejected before SymPy sees it
+SYMPY_FUNCTIONS = ("sin", "cos", "tan", "cot", "sec", "csc", "asin", "acos", "atan", "sinh", "cosh", "tanh",
+                   "exp", "log", "ln", "sqrt", "abs", "factorial", "pi", "oo")
+IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+def _sympy_namespace(sympy) -> dict:
+    """global_dict for parse_expr: whitelisted SymPy objects and no builtins, so eval() inside it can do no harm."""
+    namespace = {name: getattr(sympy, name) for name in SYMPY_FUNCTIONS if hasattr(sympy, name)}
+    namespace.update({"ln": sympy.log, "abs": sympy.Abs, "__builtins__": {}})
+    # names the standard transformations emit
+    namespace.update({name: getattr(sympy, name) for name in ("Integer", "Float", "Rational", "Symbol", "Function")})
+    return namespace
+
+
+def _check_names(text: str):
+    for name in IDENTIFIER.findall(text):
+        if name not in SYMPY_FUNCTIONS and not (len(name) == 1 and name.isalpha()):
+            raise ValueError(f"name not allowed in a symbolic query: {name}")
+
+
+def evaluate_symbolic(command: str, body: str) -> str | None:
+    try:
+        import sympy
+        from sympy.parsing.sympy_parser import parse_expr, standard_transformations, \
+            implicit_multiplication_application, convert_xor
+    except ImportError:
+        return None
+    if not re.fullmatch(r"[a-z0-9+\-*/^()., =>!]+", body):
+        return None  # only plain math text is handed to the SymPy parser
+    transformations = standard_transformations + (implicit_multiplication_application, convert_xor)
+    namespace = _sympy_namespace(sympy)
+
+    def parse(text):
+        _check_names(text)
+        return parse_expr(text, local_dict={}, global_dict=dict(namespace), transformations=transformations)
+
+    x = sympy.Symbol("x")
+    if command in ("integrate", "integral of"):
+        match = re.fullmatch(r"(.+?)(?:\s+d([a-z]))?(?:\s+from\s+(.+?)\s+to\s+(.+))?", body)
+        expr, var = parse(match.group(1)), sympy.Symbol(match.group(2) or "x")
+        if match.group(3) is not None:
+            result = sympy.integrate(expr, (var, parse(match.group(3)), parse(match.group(4))))
+            return _format_sympy(result)
+        antiderivative = sympy.integrate(expr, var)
+        if antiderivative.has(sympy.Integral):
+            return None  # no closed form found
+        return f"{antiderivative} + constant"
+    if command in ("derivative of", "differentiate"):
+        return str(sympy.diff(parse(body), x))
+    if command == "solve":
+        left, _, right = body.partition("=")
+        expr = parse(left) - (parse(right) if right else 0)
+        variable = x if x in expr.free_symbols else next(iter(expr.free_symbols), x)
+        return ", ".join(f"{variable} = {s}" for s in sympy.solve(expr, variable)) or "no solution"
+    if command == "limit of":
+        match = re.fullmatch(r"(.+?)\s+as\s+([a-z])\s*(?:->|approaches|to)\s*(.+)", body)
+        if not match:
+            return None
+        target = sympy.oo if match.group(3).strip() in ("infinity", "inf", "oo") else parse(match.group(3))
+        return _format_sympy(sympy.limit(parse(match.group(1)), sympy.Symbol(match.group(2)), target))
+    return str({"simplify": sympy.simplify, "factor": sympy.factor, "expand": sympy.expand}[command](parse(body)))
+
+
+def _format_sympy(result) -> str:
+    import sympy
+
+    if result.has(sympy.Integral, sympy.Limit):
+        raise ValueError("SymPy left the result unevaluated")
+    if result.is_number and not result.is_Integer and result.is_real:
+        return f"{result} ≈ {_format_number(float(result))}"
+    return str(result)
+
+
+##### Entry point #####
+
+def _normalize_query(query: str) -> str:
+    return LEADING_FILLER.sub("", " ".join(query.lower().split())).rstrip("?. ")
+
+
+def is_symbolic(query: str) -> bool:
+    return SYMPY_COMMAND.match(_normalize_query(query)) is not None
+
+
+@lru_cache(maxsize=4096)
+def evaluate_locally(query: str, symbolic: bool = True) -> str | None:
+    """
+    Answers common math query shapes in-process; returns None when the query needs Wolfram Alpha.
+    With symbolic=False, SymPy queries (which can run for minutes) are left to evaluate_in_worker.
+    """
+    text = _normalize_query(query)
+    try:
+        match = PERCENT_OF.match(text)
+        if match:
+            return _format_number(float(match.group(1).replace(",", "")) / 100 * evaluate_arithmetic(match.group(2)))
+
+        match = CONVERSION.match(text)
+        if match:
+            converted = convert_units(float(match.group(1).replace(",", "")), match.group(2), match.group(3))
+            if converted is not None:
+                return f"{_format_number(converted)} {match.group(3).strip()}"
+
+        match = SYMPY_COMMAND.match(text)
+        if match:
+            return evaluate_symbolic(match.group(1), match.group(2)) if symbolic else None
+
+        return _format_number(evaluate_arithmetic(text))
+    except Exception:
+        return None  # anything we cannot parse or evaluate falls back to Wolfram Alpha
+
+
+def evaluate_in_worker(query: str, timeout: float = SYMBOLIC_TIMEOUT_SECONDS) -> str | None:
+    """
+    evaluate_locally in a pooled Python worker that is killed after `timeout` seconds, so a hard
+    integral can neither block the caller nor run forever. None on timeout, or when no worker is
+    free within SYMBOLIC_QUEUE_SECONDS because execute_python holds them all (ask Wolfram Alpha).
+    """
+    from python_pool import get_python_pool
+
+    code = f"import json, local_math\nprint({WORKER_RESULT_MARKER!r} + json.dumps(local_math.evaluate_locally({query!r})))"
+    output = get_python_pool().run(code, timeout=timeout, wait=SYMBOLIC_QUEUE_SECONDS)
+    _, marker, result = output.rpartition(WORKER_RESULT_MARKER)
+    if not marker:
+        return None
+    try:
+        return json.loads(result.strip().split("\n")[0])
+    except ValueError:
+        return None
+
+
+def record(kind: str):
+    with _stats_lock:
+        MATH_STATS[kind] += 1
+
+
+def math_stats() -> dict:
+    with _stats_lock:
+        local, cached, remote = MATH_STATS["local"], MATH_STATS["cached"], MATH_STATS["remote"]
+    total = local + cached + remote
+    return {"local": local, "cached": cached, "remote": remote, "local_share": local / total if total else 0.0}
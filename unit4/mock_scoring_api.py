@@ -0,0 +1,131 @@
+"""
+Local stand-in for the GAIA scoring API, serving a snapshot of its questions and files.
+
+    python mock_scoring_api.py snapshot fixtures/      # copy questions + files from the live API
+    python mock_scoring_api.py serve fixtures/         # then point the app at it:
+    GAIA_API_URL=http://127.0.0.1:7861 python app.py
+
+If fixtures/answers.json ({task_id: answer}) exists, /submit scores by exact match.
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+
+MOCK_API_PORT = 7861
+QUESTIONS_FILE = "questions.json"
+ANSWERS_FILE = "answers.json"
+FILES_DIR = "files"
+
+
+def _normalize(answer) -> str:
+    return " ".join(str(answer).strip().lower().split())
+
+
+def _make_handler(fixtures_dir: str):
+    with open(os.path.join(fixtures_dir, QUESTIONS_FILE), "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    answers_path = os.path.join(fixtures_dir, ANSWERS_FILE)
+    answers = {}
+    if os.path.exists(answers_path):
+        with open(answers_path, "r", encoding="utf-8") as f:
+            answers = json.load(f)
+    file_names = {q["task_id"]: q.get("file_name") for q in questions}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json", extra_headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, data):
+            self._send(status, json.dumps(data).encode("utf-8"))
+
+        def do_GET(self):
+            path = urlsplit(self.path).path  # query parameters (e.g. keys) are ignored like the live API does
+            if path == "/questions":
+                return self._send_json(200, questions)
+            if path.startswith("/files/"):
+                task_id = path[len("/files/"):]
+                path = os.path.join(fixtures_dir, FILES_DIR, task_id)
+                if not file_names.get(task_id) or not os.path.exists(path):
+                    return self._send_json(404, {"detail": f"No file for task {task_id}"})
+                with open(path, "rb") as f:
+                    data = f.read()
+                disposition = {"Content-Disposition": f'attachment; filename="{file_names[task_id]}"'}
+                return self._send(200, data, "application/octet-stream", disposition)
+            self._send_json(404, {"detail": "Not found"})
+
+        def do_POST(self):
+            if urlsplit(self.path).path != "/submit":
+                return self._send_json(404, {"detail": "Not found"})
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            submitted = payload.get("answers", [])
+            correct = sum(
+                1 for a in submitted
+                if a.get("task_id") in answers and _normalize(a.get("submitted_answer")) == _normalize(answers[a["task_id"]])
+            )
+            total = len(submitted)
+            self._send_json(200, {
+                "username": payload.get("username"),
+                "score": round(100 * correct / total, 1) if total and answers else None,
+                "correct_count": correct if answers else None,
+                "total_attempted": total,
+                "message": "Scored locally." if answers else "No answers.json; submission accepted without scoring.",
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_server(fixtures_dir: str, port: int = MOCK_API_PORT) -> ThreadingHTTPServer:
+    """Serves `fixtures_dir` on 127.0.0.1:`port` from a daemon thread; call .shutdown() to stop."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(fixtures_dir))
+    threading.Thread(target=server.serve_forever, name="mock-scoring-api", daemon=True).start()
+    return server
+
+
+def snapshot_fixtures(api_url: str, fixtures_dir: str):
+    """Copies the live question set and its attachments into `fixtures_dir`."""
+    response = requests.get(f"{api_url}/questions", timeout=15)
+    response.raise_for_status()
+    questions = response.json()
+    os.makedirs(os.path.join(fixtures_dir, FILES_DIR), exist_ok=True)
+    for item in questions:
+        if not item.get("file_name"):
+            continue
+        response = requests.get(f"{api_url}/files/{item['task_id']}", timeout=60)
+        response.raise_for_status()
+        with open(os.path.join(fixtures_dir, FILES_DIR, item["task_id"]), "wb") as f:
+            f.write(response.content)
+    with open(os.path.join(fixtures_dir, QUESTIONS_FILE), "w", encoding="utf-8") as f:
+        json.dump(questions, f, indent=2, ensure_ascii=False)
+    print(f"Saved {len(questions)} questions to {fixtures_dir}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["snapshot", "serve"])
+    parser.add_argument("fixtures_dir")
+    parser.add_argument("--api-url", default="https://agents-course-unit4-scoring.hf.space")
+    parser.add_argument("--port", type=int, default=MOCK_API_PORT)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        snapshot_fixtures(args.api_url, args.fixtures_dir)
+    else:
+        server = start_mock_server(args.fixtures_dir, args.port)
+        print(f"Mock scoring API on http://127.0.0.1:{args.port}")
+        threading.Event().wait()
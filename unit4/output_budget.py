@@ -0,0 +1,310 @@
+"""
+Keeps tool outputs inside a per-step token budget.
+
+All tool calls answering the same LLM step share STEP_TOKEN_BUDGET. An output that does not fit
+is compacted by its kind (table, document, search, text) and the full text is kept under a
+handle the agent can page through with get_full_output.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import re
+import statistics
+import threading
+from collections import Counter, OrderedDict
+
+STEP_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_STEP_TOKENS", "2000"))
+MIN_OUTPUT_TOKENS = 250       # floor for a late call in a step that has spent its budget
+CHARS_PER_TOKEN = 4
+MAX_STORED_OUTPUTS = 256
+FULL_OUTPUT_PAGE_CHARS = 8000
+TRACKED_STEPS = 1024
+
+PAGE_MARKER = re.compile(r"^--- Page \d+ ---$", re.MULTILINE)
+SEARCH_RESULT_HEADER = re.compile(r"^(.*) \((https?://\S+)\):\s*$")
+NUMERIC_FIELD = re.compile(r"^[-+]?\d[\d,]*(?:\.\d+)?(?:e[-+]?\d+)?\s*(?:[a-zA-Z°%/]{0,4})$")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+_outputs = OrderedDict()
+_step_usage = OrderedDict()
+_lock = threading.Lock()
+_step_key_fn = lambda: None
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def set_step_key(fn):
+    """
+    Sets the function that identifies the current agent step, e.g. (trace, LLM call count).
+    Calls with the same key share one budget; a None key gives every call the full budget.
+    """
+    global _step_key_fn
+    _step_key_fn = fn
+
+
+##### Full-output store #####
+
+def _store(text: str) -> str:
+    handle = "out_" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+    with _lock:
+        _outputs[handle] = text
+        _outputs.move_to_end(handle)
+        while len(_outputs) > MAX_STORED_OUTPUTS:
+            _outputs.popitem(last=False)
+    return handle
+
+
+def get_full_output(handle: str, offset: int = 0, length: int = FULL_OUTPUT_PAGE_CHARS) -> str:
+    """Returns `length` characters of a compacted output starting at `offset`."""
+    with _lock:
+        text = _outputs.get(handle)
+    if text is None:
+        return f"Unknown output handle '{handle}'; it may have expired. Call the original tool again."
+    offset = max(0, int(offset))
+    end = min(len(text), offset + max(1, int(length)))
+    page = text[offset:end]
+    if end < len(text):
+        page += f"\n[Characters {offset}-{end} of {len(text)}. Call get_full_output with offset={end} for more.]"
+    _charge(estimate_tokens(page))
+    return page
+
+
+##### Per-step accounting #####
+
+def _add_usage(key, tokens: int):
+    """Caller holds _lock."""
+    _step_usage[key] = _step_usage.get(key, 0) + tokens
+    _step_usage.move_to_end(key)
+    while len(_step_usage) > TRACKED_STEPS:
+        _step_usage.popitem(last=False)
+
+
+def _charge(tokens: int, key=None):
+    key = _step_key_fn() if key is None else key
+    if key is None:
+        return
+    with _lock:
+        _add_usage(key, tokens)
+
+
+def _reserve(tokens: int):
+    """
+    Charges up to `tokens` to the current step and returns (step key, tokens granted). Checking and
+    charging under one lock keeps parallel tool calls of a step from each seeing the full budget.
+    """
+    key = _step_key_fn()
+    if key is None:
+        return None, min(tokens, STEP_TOKEN_BUDGET)
+    with _lock:
+        granted = min(tokens, max(MIN_OUTPUT_TOKENS, STEP_TOKEN_BUDGET - _step_usage.get(key, 0)))
+        _add_usage(key, granted)
+    return key, granted
+
+
+def remaining_chars(margin: int = 300) -> int:
+    """
+    Characters the current step can still return uncompacted, less `margin` for notes. Tools that
+    can stop early (e.g. read_pdf) size their output with this instead of being compacted afterwards.
+    """
+    key = _step_key_fn()
+    with _lock:
+        used = _step_usage.get(key, 0) if key is not None else 0
+    return max(MIN_OUTPUT_TOKENS, STEP_TOKEN_BUDGET - used) * CHARS_PER_TOKEN - margin
+
+
+##### Compactors #####
+
+def _head_tail(lines: list[str], max_chars: int, what: str = "lines") -> list[str]:
+    """Keeps as many leading and trailing lines as fit, with a marker for the gap."""
+    head, tail = [], []
+    used = 0
+    i, j = 0, len(lines) - 1
+    while i <= j:
+        take_head = len(head) <= len(tail)
+        line = lines[i] if take_head else lines[j]
+        if used + len(line) + 1 > max_chars:
+            break
+        used += len(line) + 1
+        if take_head:
+            head.append(line)
+            i += 1
+        else:
+            tail.append(line)
+            j -= 1
+    omitted = j - i + 1
+    if omitted <= 0:
+        return lines
+    return head + [f"... {omitted} {what} omitted ..."] + tail[::-1]
+
+
+def _split_fields(line: str) -> list[str]:
+    if "|" in line:
+        return [f.strip() for f in line.strip("| ").split("|")]
+    if ", " in line:
+        return [f.strip() for f in line.split(", ")]
+    return line.split()
+
+
+def _field_value(field: str) -> tuple[str | None, str]:
+    label, sep, value = field.partition(": ")
+    return (label.strip(), value.strip()) if sep else (None, field.strip())
+
+
+def _column_stats(header: str | None, rows: list[str]) -> list[str]:
+    """min/mean/max of every numeric column, over rows sharing the most common field count."""
+    split_rows = [_split_fields(row) for row in rows]
+    width = Counter(len(fields) for fields in split_rows).most_common(1)[0][0]
+    split_rows = [fields for fields in split_rows if len(fields) == width]
+    names = _split_fields(header) if header else []
+    if len(names) == width - 1:
+        names = ["index"] + names  # pandas prints no header for the index column
+    stats = []
+    for col in range(width):
+        values, label = [], None
+        for fields in split_rows:
+            label, value = _field_value(fields[col])
+            if not NUMERIC_FIELD.match(value):
+                break
+            values.append(float(re.match(r"[-+]?[\d,]*\.?\d+(?:e[-+]?\d+)?", value).group().replace(",", "")))
+        else:
+            name = label or (names[col] if len(names) == width else f"column {col + 1}")
+            if name == "index" or len(values) < 2:
+                continue
+            stats.append(f"{name}: min {min(values):g}, mean {statistics.fmean(values):.4g}, max {max(values):g}")
+    return stats
+
+
+def compact_table(text: str, max_chars: int) -> str:
+    """Leading text, header, first/last rows, and per-column stats over all rows."""
+    lines = text.rstrip("\n").split("\n")
+    counts = [len(_split_fields(line)) for line in lines]
+    # the table body is the longest run of lines with the same number of fields
+    best_start, best_len, start = 0, 0, 0
+    for i in range(1, len(lines) + 1):
+        if i == len(lines) or counts[i] != counts[start]:
+            if i - start > best_len:
+                best_start, best_len = start, i - start
+            start = i
+    if best_len < 4:
+        return compact_text(text, max_chars)
+
+    preamble, rows, trailer = lines[:best_start], lines[best_start:best_start + best_len], lines[best_start + best_len:]
+    width, header = counts[best_start], None
+    if not any(NUMERIC_FIELD.match(_field_value(f)[1]) for f in _split_fields(rows[0])):
+        header, rows = rows[0], rows[1:]
+    elif preamble and counts[best_start - 1] in (width, width - 1):
+        header = preamble.pop()
+
+    stats = _column_stats(header, rows)
+    stats_block = [f"Column stats over all {len(rows)} rows:", *stats] if stats else []
+    fixed = preamble + ([header] if header else []) + trailer + stats_block
+    row_budget = max(max_chars - sum(len(line) + 1 for line in fixed), max_chars // 3)
+    kept = _head_tail(rows, row_budget, "rows")
+    return "\n".join(preamble + ([header] if header else []) + kept + trailer + stats_block)
+
+
+def compact_document(text: str, max_chars: int) -> str:
+    """An outline: the opening of every page, sharing the budget evenly."""
+    starts = [m.start() for m in PAGE_MARKER.finditer(text)]
+    if len(starts) < 2:
+        return compact_text(text, max_chars)
+    preamble = text[:starts[0]].strip()
+    pages = [text[a:b].strip() for a, b in zip(starts, starts[1:] + [len(text)])]
+    per_page = max(80, (max_chars - len(preamble)) // len(pages))
+    outline = [preamble] if preamble else []
+    for page in pages:
+        marker, _, body = page.partition("\n")
+        body = " ".join(body.split())
+        outline.append(f"{marker}\n{body[:per_page]}{' ...' if len(body) > per_page else ''}")
+    result = "\n".join(outline)
+    return result if len(result) <= max_chars else compact_text(result, max_chars)
+
+
+def compact_search(text: str, max_chars: int) -> str:
+    """Drops repeated URLs and sentences already seen in earlier results, then trims each result evenly."""
+    results = []
+    for line in text.split("\n"):
+        match = SEARCH_RESULT_HEADER.match(line)
+        if match:
+            results.append([line, match.group(2), []])
+        elif results:
+            results[-1][2].append(line)
+    if len(results) < 2:
+        return compact_text(text, max_chars)
+
+    seen_urls, seen_sentences, kept = set(), set(), []
+    for header, url, body in results:
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        label, _, content = " ".join(body).partition(": ")
+        sentences = []
+        for sentence in SENTENCE_SPLIT.split(content):
+            key = " ".join(sentence.lower().split())
+            if key and key not in seen_sentences:
+                seen_sentences.add(key)
+                sentences.append(sentence)
+        kept.append((header, label, " ".join(sentences)))
+
+    per_result = max(120, max_chars // len(kept))
+    lines = []
+    for header, label, content in kept:
+        room = max(40, per_result - len(header) - len(label) - 3)
+        lines += [header, f"{label}: {content[:room]}{' ...' if len(content) > room else ''}"]
+    result = "\n".join(lines)
+    return result if len(result) <= max_chars else compact_text(result, max_chars)
+
+
+def compact_text(text: str, max_chars: int) -> str:
+    lines = text.split("\n")
+    if len(lines) > 3:
+        return "\n".join(_head_tail(lines, max_chars))
+    half = max_chars // 2
+    return f"{text[:half]} ... {text[-half:]}"
+
+
+COMPACTORS = {"table": compact_table, "document": compact_document, "search": compact_search, "text": compact_text}
+
+
+##### Entry points #####
+
+def budget_output(text: str, kind: str = "text") -> str:
+    """Returns `text` if it fits the current step's remaining budget, else a compacted view plus a handle."""
+    needed = estimate_tokens(text)
+    key, allowed = _reserve(needed)
+    if needed <= allowed:
+        return text
+
+    handle = _store(text)
+    max_chars = allowed * CHARS_PER_TOKEN - 200  # room for the note below
+    try:
+        compacted = COMPACTORS.get(kind, compact_text)(text, max_chars)
+    except Exception:
+        compacted = compact_text(text, max_chars)  # never fail a tool call because of the budgeter
+    compacted += (
+        f"\n[Compacted from {len(text)} to {len(compacted)} characters to fit the step budget. "
+        f"Call get_full_output(handle='{handle}', offset=0) to read the full output.]"
+    )
+    _charge(estimate_tokens(compacted) - allowed, key)  # settle the reservation at the actual size
+    return compacted
+
+
+def budgeted(kind: str = "text"):
+    """Decorator applying budget_output to the string result of a sync or async tool function."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                result = await fn(*args, **kwargs)
+                return budget_output(result, kind) if isinstance(result, str) else result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            return budget_output(result, kind) if isinstance(result, str) else result
+        return wrapper
+    return decorator
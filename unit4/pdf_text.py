@@ -0,0 +1,122 @@
+import mmap
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from pypdf import PdfReader
+
+DEFAULT_MAX_CHARS = 15000
+PARALLEL_MIN_PAGES = 16
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class PageRangeError(ValueError):
+    """Raised for a page spec that cannot be parsed, such as "a-b" or "5-2"."""
+
+
+def parse_page_range(pages: str, page_count: int) -> list[int]:
+    """Parses a 1-based page spec like "3", "2-5" or "1,4,7-9" into sorted 0-based page indices."""
+    selected = set()
+    for part in pages.replace(" ", "").split(","):
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                first = int(start) if start else 1
+                last = int(end) if end else page_count
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise PageRangeError(f"Invalid page spec '{part}': use page numbers like '3', '2-5' or '1,4,7-9'.") from None
+        if first > last:
+            raise PageRangeError(f"Invalid page spec '{part}': the first page is after the last.")
+        selected.update(range(max(first, 1) - 1, min(last, page_count)))
+    return sorted(selected)
+
+
+def _format_page(index: int, text: str) -> str:
+    return f"--- Page {index + 1} ---\n{text.strip()}\n"
+
+
+##### Parallel extraction of whole documents #####
+
+def _extract_page_span(path: str, start: int, stop: int) -> list[str]:
+    """Process pool worker: extracts pages [start, stop) from the PDF on disk."""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the agent process runs an event loop thread that must not be forked
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def extract_all_pages_parallel(path: str, page_count: int) -> list[str]:
+    span = -(-page_count // PDF_WORKERS)
+    starts = range(0, page_count, span)
+    futures = [_get_pool().submit(_extract_page_span, path, s, min(s + span, page_count)) for s in starts]
+    texts = []
+    for future in futures:
+        texts.extend(future.result())
+    return texts
+
+
+##### Budgeted, streaming extraction #####
+
+def extract_pdf_text(path: str, pages: str | None = None, keyword: str | None = None,
+                     max_chars: int | None = DEFAULT_MAX_CHARS) -> str:
+    """
+    Extracts text page by page and stops as soon as `max_chars` is used up.
+
+    `pages` restricts extraction to a page spec, `keyword` keeps only pages mentioning it.
+    With `max_chars=None` the whole document is needed, so large files are split across
+    a process pool instead.
+    """
+    if os.path.getsize(path) == 0:  # mmap cannot map an empty file
+        return ""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return _extract_from_reader(PdfReader(buffer), path, pages, keyword, max_chars)
+
+
+def _extract_from_reader(reader: PdfReader, path: str, pages: str | None, keyword: str | None,
+                         max_chars: int | None) -> str:
+    page_count = len(reader.pages)
+    indices = parse_page_range(pages, page_count) if pages else list(range(page_count))
+    needle = keyword.lower() if keyword else None
+
+    if max_chars is None and needle is None and not pages and page_count >= PARALLEL_MIN_PAGES:
+        texts = extract_all_pages_parallel(path, page_count)
+        return "".join(_format_page(i, text) for i, text in enumerate(texts))
+
+    parts = []
+    used = 0
+    for i in indices:
+        text = reader.pages[i].extract_text() or ""
+        if needle is not None and needle not in text.lower():
+            continue
+        part = _format_page(i, text)
+        if max_chars is not None and used + len(part) > max_chars:
+            parts.append(part[:max_chars - used])
+            parts.append(
+                f"\n[Truncated after {max_chars} characters at page {i + 1} of {page_count}. "
+                f"Request a later page range to continue.]"
+            )
+            break
+        parts.append(part)
+        used += len(part)
+
+    if not parts:
+        if needle is not None:
+            return f"No pages mention '{keyword}' (searched {len(indices)} of {page_count} pages)."
+        return "No text could be extracted from the requested pages."
+    return "".join(parts)
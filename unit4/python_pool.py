@@ -0,0 +1,156 @@
+import builtins
+import contextlib
+import io
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+
+PYTHON_POOL_SIZE = int(os.getenv("PYTHON_POOL_SIZE", "2"))
+PYTHON_TIMEOUT_SECONDS = float(os.getenv("PYTHON_TIMEOUT_SECONDS", "30"))
+PYTHON_MEMORY_LIMIT_MB = int(os.getenv("PYTHON_MEMORY_LIMIT_MB", "2048"))
+PYTHON_MAX_TASKS_PER_WORKER = int(os.getenv("PYTHON_MAX_TASKS_PER_WORKER", "50"))
+WORKER_WAIT_SECONDS = 120
+WORKER_STARTUP_SECONDS = float(os.getenv("PYTHON_WORKER_STARTUP_SECONDS", "60"))
+RESPAWN_DELAY_SECONDS = (1, 5, 30)  # between failed starts; the last delay repeats
+PREIMPORTED_MODULES = ("math", "statistics", "itertools", "collections", "datetime", "re", "json", "numpy", "pandas")
+
+
+##### Worker process #####
+
+def _worker_main(conn, memory_limit_mb: int):
+    """Runs in the child: pre-imports common libraries, then executes snippets sent over the pipe."""
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    for name in PREIMPORTED_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass  # no rlimit support on this platform
+
+    conn.send("ready")
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            return
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+                exec(code, {"__builtins__": builtins, "__name__": "__main__"})
+            output = buffer.getvalue()
+        except MemoryError:
+            output = buffer.getvalue() + f"\nError: snippet exceeded the {memory_limit_mb} MB memory limit"
+        except Exception as e:
+            tb = traceback.format_exception_only(type(e), e)[-1].strip()
+            output = buffer.getvalue() + f"\nError: {tb}"
+        conn.send(output)
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb: int, startup_timeout: float = WORKER_STARTUP_SECONDS):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+        try:  # wait until the pre-imports are done
+            if not self.conn.poll(startup_timeout):
+                raise TimeoutError(f"not ready after {startup_timeout:.0f} seconds")
+            self.conn.recv()
+        except BaseException:
+            self.kill()
+            raise
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+##### Pool of pre-warmed workers #####
+
+class PythonWorkerPool:
+    """
+    Keeps `size` pre-imported Python processes ready for execute_python.
+
+    Each snippet gets its own process and stdout, a wall-clock timeout and a memory
+    limit. Workers that time out, crash or reach `max_tasks` are replaced in the
+    background, so the next snippet does not pay the interpreter and import startup.
+    """
+
+    def __init__(self, size: int = PYTHON_POOL_SIZE, timeout: float = PYTHON_TIMEOUT_SECONDS,
+                 memory_limit_mb: int = PYTHON_MEMORY_LIMIT_MB, max_tasks: int = PYTHON_MAX_TASKS_PER_WORKER,
+                 startup_timeout: float = WORKER_STARTUP_SECONDS):
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks = max_tasks
+        # spawn, not fork: the agent process runs an event loop thread that must not be forked
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._replace_in_background()
+
+    def _replace_in_background(self, old: _Worker | None = None):
+        """Starts a worker in a thread, retrying failed starts so the pool never shrinks."""
+        def _replace():
+            if old is not None:
+                old.kill()
+            for attempt in itertools.count():
+                try:
+                    self._idle.put(_Worker(self._ctx, self.memory_limit_mb, self.startup_timeout))
+                    return
+                except Exception as e:
+                    delay = RESPAWN_DELAY_SECONDS[min(attempt, len(RESPAWN_DELAY_SECONDS) - 1)]
+                    print(f"Could not start a Python worker ({e}), retrying in {delay} s")
+                    time.sleep(delay)
+        threading.Thread(target=_replace, name="python-worker-starter", daemon=True).start()
+
+    def run(self, code: str, timeout: float | None = None, wait: float = WORKER_WAIT_SECONDS) -> str:
+        """Runs `code` in an idle worker, waiting at most `wait` seconds for one to become free."""
+        timeout = timeout or self.timeout
+        try:
+            worker = self._idle.get(timeout=wait)
+        except queue.Empty:
+            return "Error: no Python worker became available, try again."
+        try:
+            worker.conn.send(code)
+            if not worker.conn.poll(timeout):
+                self._replace_in_background(worker)
+                return f"Error: code did not finish within {timeout:.0f} seconds and was stopped."
+            output = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError):
+            self._replace_in_background(worker)
+            return f"Error: the Python worker crashed (possibly over the {self.memory_limit_mb} MB memory limit)."
+
+        worker.tasks_done += 1
+        if worker.tasks_done >= self.max_tasks:
+            self._replace_in_background(worker)
+        else:
+            self._idle.put(worker)
+        return output
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_python_pool() -> PythonWorkerPool:
+    """Returns the process-wide worker pool, starting its workers on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PythonWorkerPool()
+    return _pool
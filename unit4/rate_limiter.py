@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+
+
+##### Adaptive token bucket shared by all questions in flight #####
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket that paces LLM calls against the model provider.
+
+    The refill rate follows an AIMD scheme: it is cut multiplicatively whenever a
+    429/overload response comes back and grows additively again after successful calls.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 4, min_rate: float = 0.05, max_rate: float = 5.0,
+                 backoff_factor: float = 0.5, recovery_step: float = 0.05):
+        self.rate = rate                      # tokens per second
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def _try_take(self) -> float:
+        """Takes a token and returns 0, or returns how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._blocked_until and self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return min(max(self._blocked_until - now, (1 - self._tokens) / self.rate), 1.0)
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while wait := self._try_take():
+            time.sleep(wait)
+
+    async def aacquire(self):
+        """Waits for a token without blocking the event loop."""
+        while wait := self._try_take():
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    def on_throttle(self, retry_after: float | None = None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+            self._tokens = 0.0
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self._blocked_until = max(self._blocked_until, now + pause)
+
+
+##### Detecting rate-limit / overload errors #####
+
+RATE_LIMIT_STATUS_CODES = {429, 529}
+
+
+def _status_code(exc: Exception) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def error_status_code(exc: Exception) -> int | None:
+    """HTTP status of the exception or of the first error it wraps that carries one."""
+    while exc is not None:
+        status = _status_code(exc)
+        if status is not None:
+            return status
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def _is_sdk_rate_limit(exc: Exception) -> bool:
+    try:
+        import anthropic
+    except ImportError:
+        return False
+    return isinstance(exc, anthropic.RateLimitError) or (
+        isinstance(exc, anthropic.APIStatusError) and exc.status_code in RATE_LIMIT_STATUS_CODES)
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """
+    True if the exception (or one it wraps) is a 429 / 529 response. Only status codes and the
+    SDK's error types count: a tool error that merely mentions "rate limit" must not slow the run.
+    """
+    while exc is not None:
+        if _status_code(exc) in RATE_LIMIT_STATUS_CODES or _is_sdk_rate_limit(exc):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _retry_after_header(headers) -> float | None:
+    try:
+        return float((headers or {}).get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    """Retry-After of the exception or of the provider error it wraps (llama_index re-raises SDK errors)."""
+    while exc is not None:
+        retry_after = _retry_after_header(getattr(getattr(exc, "response", None), "headers", None))
+        if retry_after is not None:
+            return retry_after
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+##### Pacing every LLM request #####
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveTokenBucket:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveTokenBucket()
+    return _limiter
+
+
+def set_limiter(limiter: AdaptiveTokenBucket):
+    """Makes `limiter` the one that event_hooks pace against (e.g. an unlimited one for benchmarks)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
+
+
+def _on_response(status_code: int, headers):
+    if status_code in RATE_LIMIT_STATUS_CODES:
+        get_limiter().on_throttle(_retry_after_header(headers))
+    elif status_code < 400:
+        get_limiter().on_success()
+
+
+def event_hooks(is_async: bool) -> dict:
+    """
+    httpx event hooks that pace every request of an Anthropic SDK client through the shared limiter.
+
+    Passed as the SDK's http_client, they make each agent step take its own token, and a 429 slows
+    everyone down while the SDK retries just that call (honouring Retry-After) instead of the
+    whole question being run again.
+    """
+    if is_async:
+        async def on_request(request):
+            await get_limiter().aacquire()
+
+        async def on_response(response):
+            _on_response(response.status_code, response.headers)
+    else:
+        def on_request(request):
+            get_limiter().acquire()
+
+        def on_response(response):
+            _on_response(response.status_code, response.headers)
+    return {"request": [on_request], "response": [on_response]}
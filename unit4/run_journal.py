@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+RUN_JOURNAL_PATH = os.getenv(
+    "RUN_JOURNAL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_journal.jsonl")
+)
+# a task that failed in this many runs counts as permanently failed and no longer blocks submission
+MAX_TASK_ATTEMPTS = int(os.getenv("GAIA_MAX_TASK_ATTEMPTS", "3"))
+
+
+##### Append-only journal of produced answers #####
+
+class RunJournal:
+    """
+    Records every answer as soon as the agent produces it, one JSON line per task.
+
+    Lines are flushed and fsync'ed on write, so a crash loses at most the question
+    that was in flight. A truncated last line (crash mid-write) is ignored on load and
+    cut off before the next write, so it cannot swallow the following entry.
+    Failed tasks are journaled too, so repeated failures can be told apart from new ones.
+    """
+
+    def __init__(self, path: str = RUN_JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._repaired = False
+
+    def _entries(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def load(self) -> dict:
+        """Returns {task_id: entry} for all answers recorded so far (latest entry wins)."""
+        return {entry["task_id"]: entry for entry in self._entries() if "error" not in entry}
+
+    def load_failures(self) -> Counter:
+        """Number of runs in which each task failed."""
+        return Counter(entry["task_id"] for entry in self._entries() if "error" in entry)
+
+    def permanently_failed(self, task_ids) -> list:
+        failures = self.load_failures()
+        return [task_id for task_id in task_ids if failures[task_id] >= MAX_TASK_ATTEMPTS]
+
+    def _truncate_partial_line(self):
+        """Cuts an unterminated last line (crash mid-write) back to the last newline."""
+        try:
+            with open(self.path, "r+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                position = end
+                while position > 0:
+                    step = min(4096, position)
+                    f.seek(position - step)
+                    chunk = f.read(step)
+                    newline = chunk.rfind(b"\n")
+                    if newline != -1:
+                        position = position - step + newline + 1
+                        break
+                    position -= step
+                if position != end:
+                    f.truncate(position)
+        except FileNotFoundError:
+            pass
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if not self._repaired:
+                self._truncate_partial_line()
+                self._repaired = True
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record(self, task_id: str, question: str, answer: str):
+        self._append({"task_id": task_id, "question": question, "submitted_answer": answer, "recorded_at": time.time()})
+
+    def record_failure(self, task_id: str, error: str):
+        self._append({"task_id": task_id, "error": error, "failed_at": time.time()})
+
+    def archive(self) -> str | None:
+        """Moves the journal aside after a successful submission so the next run starts fresh."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return None
+            archived_path = f"{self.path}.submitted-{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(self.path, archived_path)
+            return archived_path
@@ -0,0 +1,123 @@
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from attachments import get_attachment_store, ATTACHMENT_CACHE_DIR
+
+PARQUET_CACHE_DIR = os.path.join(ATTACHMENT_CACHE_DIR, "parquet")
+EXCEL_CONTENT_TYPES = ("application/vnd.ms-excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+AGGREGATIONS = ("sum", "mean", "median", "min", "max", "count", "nunique", "std")
+MAX_OUTPUT_ROWS = 50
+
+_convert_lock = threading.Lock()
+
+
+##### Parse each attachment once into cached Parquet #####
+
+def _is_excel(file_url: str, content_type: str) -> bool:
+    return ".xls" in file_url.lower() or content_type in EXCEL_CONTENT_TYPES
+
+
+def load_sheet_table(file_url: str, sheet: str | None = None) -> pa.Table:
+    """
+    Returns the spreadsheet as an Arrow table, parsing CSV/Excel only the first time.
+    Parquet files are keyed by the attachment's content hash (and sheet), so identical
+    files reached through different URLs share one conversion.
+    """
+    store = get_attachment_store()
+    attachment = store.fetch(file_url)
+    sheet_key = f"-{sheet}" if sheet else ""
+    parquet_path = os.path.join(PARQUET_CACHE_DIR, f"{attachment.sha256}{sheet_key}.parquet")
+
+    with _convert_lock:
+        if not os.path.exists(parquet_path):
+            os.makedirs(PARQUET_CACHE_DIR, exist_ok=True)
+            with store.lease(attachment) as leased:  # keep the blob from being evicted while it is parsed
+                if _is_excel(file_url, leased.content_type):
+                    df = pd.read_excel(leased.path, sheet_name=sheet or 0)
+                else:
+                    df = pd.read_csv(leased.path)
+            df.columns = [str(c) for c in df.columns]
+            # mixed-type object columns cannot be stored in Parquet, keep them as text
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].astype("string")
+            tmp_path = parquet_path + ".tmp"
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+            os.replace(tmp_path, parquet_path)
+
+    return pq.read_table(parquet_path, memory_map=True)
+
+
+def _to_frame(table: pa.Table, columns: list[str] | None = None) -> pd.DataFrame:
+    if columns:
+        missing = [c for c in columns if c not in table.column_names]
+        if missing:
+            raise KeyError(f"Unknown column(s): {', '.join(missing)}. Available: {', '.join(table.column_names)}")
+        table = table.select(columns)
+    return table.to_pandas()
+
+
+##### Operations exposed to the agent #####
+
+def describe_schema(table: pa.Table) -> str:
+    lines = [f"Rows: {table.num_rows}, Columns: {table.num_columns}"]
+    for field in table.schema:
+        lines.append(f"- {field.name}: {field.type}")
+    return "\n".join(lines)
+
+
+def summary_statistics(table: pa.Table) -> str:
+    df = table.to_pandas()
+    return df.describe(include="all").transpose().to_string()
+
+
+def query_sheet(table: pa.Table, filter: str | None = None, group_by: str | None = None,
+                column: str | None = None, aggregation: str | None = None,
+                columns: list[str] | None = None, limit: int = MAX_OUTPUT_ROWS) -> str:
+    """
+    Filters with a pandas query expression, then optionally groups and aggregates.
+    All work is vectorized over the full table, never over a truncated preview.
+    """
+    if not (filter or group_by or aggregation):
+        # plain preview: only the first rows are converted
+        shown = _to_frame(table.slice(0, limit), columns)
+        suffix = f"\n... {table.num_rows - limit} more rows" if table.num_rows > limit else ""
+        return f"{table.num_rows} rows:\n{shown.to_string()}{suffix}"
+
+    needed = None
+    if not filter:
+        # without a filter expression only the referenced columns need to be materialized
+        needed = [c for c in dict.fromkeys([group_by, column, *(columns or [])]) if c] or None
+    df = _to_frame(table, needed)
+
+    if filter:
+        df = df.query(filter, engine="python" if "str." in filter else None)
+
+    if aggregation:
+        if aggregation not in AGGREGATIONS:
+            return f"Unsupported aggregation '{aggregation}'. Use one of: {', '.join(AGGREGATIONS)}."
+        if column is None:
+            # only counting works without a column, and then it counts rows
+            if aggregation != "count":
+                return f"Pass a column to compute the {aggregation} of."
+            if group_by:
+                counts = df.groupby(group_by, dropna=False).size()
+                return f"Row counts by {group_by} ({len(df)} matching rows):\n{counts.to_string()}"
+            return f"count of rows: {len(df)}"
+        if group_by:
+            result = df.groupby(group_by, dropna=False)[column].agg(aggregation)
+            return f"{aggregation} of {column} by {group_by} ({len(df)} matching rows):\n{result.to_string()}"
+        return f"{aggregation} of {column} over {len(df)} matching rows: {df[column].agg(aggregation)}"
+
+    if group_by:
+        counts = df.groupby(group_by, dropna=False).size()
+        return f"Row counts by {group_by}:\n{counts.to_string()}"
+
+    if columns:
+        df = df[columns]
+    shown = df.head(limit)
+    suffix = f"\n... {len(df) - limit} more matching rows" if len(df) > limit else ""
+    return f"{len(df)} matching rows:\n{shown.to_string()}{suffix}"
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the unit4 modules are flat scripts next to app.py, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
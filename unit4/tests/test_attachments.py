@@ -0,0 +1,58 @@
+import os
+
+import attachments
+from attachments import AttachmentStore
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {"content-type": "text/plain"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+def test_cache_hits_do_not_rewrite_the_index(tmp_path, monkeypatch):
+    downloads = []
+
+    def fake_get(url, **kwargs):
+        downloads.append(url)
+        return FakeResponse(b"hello")
+
+    monkeypatch.setattr(attachments.http_client, "get", fake_get)
+    store = AttachmentStore(str(tmp_path))
+    attachment = store.fetch("http://files/1")
+    index_mtime = os.stat(store.index_path).st_mtime_ns
+
+    for _ in range(5):
+        assert store.read_bytes(store.fetch("http://files/1")) == b"hello"
+    with store.open_mmap(attachment) as mapped:
+        assert bytes(mapped) == b"hello"
+
+    assert downloads == ["http://files/1"]
+    assert os.stat(store.index_path).st_mtime_ns == index_mtime
+
+
+def test_leased_blobs_are_not_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachments.http_client, "get", lambda url, **kwargs: FakeResponse(url.encode() * 10))
+    store = AttachmentStore(str(tmp_path), max_bytes=30)
+
+    with store.open_mmap("http://files/a") as mapped:
+        store.fetch("http://files/b")  # over the limit: "a" is the least recently used blob
+        assert bytes(mapped[:14]) == b"http://files/a"
+        a_sha = store.fetch("http://files/a").sha256
+        assert a_sha in store._index["blobs"]
+
+    store.fetch("http://files/c")  # the lease is gone, so "a" can go now
+    assert a_sha not in store._index["blobs"]
+    assert not store._leases
@@ -0,0 +1,106 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import audio_transcribe
+from cache import PersistentCache
+from rate_limiter import AdaptiveTokenBucket
+
+CHUNK_SECONDS = 0.05
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = SimpleNamespace(status_code=status_code, headers={})
+
+
+@pytest.fixture(autouse=True)
+def no_pacing(monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_transcribe, "ASR_LIMITER", AdaptiveTokenBucket(rate=1e6, burst=1e6, max_rate=1e6))
+    monkeypatch.setattr(audio_transcribe, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(audio_transcribe, "TRANSCRIPT_CACHE", PersistentCache("transcripts", path=str(tmp_path / "c.sqlite")))
+
+
+@pytest.fixture
+def fake_backend():
+    """Records how many chunks are transcribed at the same time and which chunks were sent."""
+    state = {"active": 0, "peak": 0, "sent": [], "fail": {}}
+    lock = threading.Lock()
+
+    def backend(audio_bytes: bytes) -> str:
+        name = audio_bytes.decode()
+        with lock:
+            state["sent"].append(name)
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(CHUNK_SECONDS)
+        with lock:
+            state["active"] -= 1
+            failures = state["fail"].get(name)
+            if failures:
+                state["fail"][name] = failures[1:]
+                raise ProviderError(failures[0])
+        return f" text of {name} "
+
+    previous = audio_transcribe._asr_backend
+    audio_transcribe.set_asr_backend(backend)
+    yield state
+    audio_transcribe.set_asr_backend(previous)
+
+
+def fake_chunks(monkeypatch, n):
+    # 30-minute clip: ~60 chunks of up to 30 s (splitting itself needs ffmpeg)
+    chunks = [(i * 30_000, f"chunk{i}".encode()) for i in range(n)]
+    monkeypatch.setattr(audio_transcribe, "split_audio", lambda audio_bytes: chunks)
+
+
+def test_chunks_run_concurrently_up_to_the_cap(monkeypatch, fake_backend):
+    fake_chunks(monkeypatch, 60)
+    transcript = audio_transcribe.transcribe_audio_bytes(b"audio")
+
+    assert fake_backend["peak"] == audio_transcribe.ASR_MAX_WORKERS == 8
+    lines = transcript.split("\n")
+    assert lines[0] == "[00:00] text of chunk0"
+    assert lines[-1] == "[29:30] text of chunk59"
+
+
+def test_throttled_chunks_are_retried(monkeypatch, fake_backend):
+    fake_chunks(monkeypatch, 3)
+    fake_backend["fail"] = {"chunk1": [429, 503]}
+    transcript = audio_transcribe.transcribe_audio_bytes(b"audio")
+    assert "[00:30] text of chunk1" in transcript
+    assert fake_backend["sent"].count("chunk1") == 3
+
+
+def test_only_failed_chunks_are_redone(monkeypatch, fake_backend):
+    fake_chunks(monkeypatch, 4)
+    fake_backend["fail"] = {"chunk2": [400]}
+    with pytest.raises(ProviderError):
+        audio_transcribe.transcribe_audio_bytes(b"audio", cache_key="sha")
+    fake_backend["sent"].clear()
+
+    transcript = audio_transcribe.transcribe_audio_bytes(b"audio", cache_key="sha")
+    assert fake_backend["sent"] == ["chunk2"]
+    assert transcript.count("text of") == 4
+
+
+def test_unsplittable_audio_is_sent_whole(monkeypatch, fake_backend):
+    def fail(audio_bytes):
+        raise RuntimeError("no ffmpeg")
+
+    monkeypatch.setattr(audio_transcribe, "split_audio", fail)
+    assert audio_transcribe.transcribe_audio_bytes(b"whole") == "text of whole"
+
+
+def test_cuts_at_the_quiet_stretch():
+    rate = audio_transcribe.ASR_SAMPLE_RATE
+    samples = (np.random.default_rng(0).normal(0, 3000, 50 * rate)).astype(np.int16)
+    samples[22 * rate:int(22.5 * rate)] = 0  # half a second of silence at 22 s
+    spans = audio_transcribe.find_cut_points(samples, rate)
+    assert len(spans) == 2
+    assert 22_000 <= spans[0][1] <= 22_500
+    assert spans[1] == (spans[0][1], 50_000)
@@ -0,0 +1,69 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+import tools
+from cache import PersistentCache
+
+
+def stored_rows(path) -> int:
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def test_entries_expire_and_are_purged(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    clock = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: clock[0])
+    store = PersistentCache("test", path=path)
+    store.set("short", "a", ttl=10)
+    store.set("long", "b", ttl=1000)
+    assert store.get("short") == "a"
+
+    clock[0] += 11
+    assert store.get("short") is None
+    assert store.get("long") == "b"
+    assert stored_rows(path) == 2
+
+    PersistentCache("test", path=path)  # opening purges
+    assert stored_rows(path) == 1
+
+
+def test_expired_rows_are_purged_every_n_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(cache, "PURGE_EVERY_WRITES", 5)
+    store = PersistentCache("test", path=path)
+    for i in range(4):
+        store.set(f"gone{i}", i, ttl=-1)
+    assert stored_rows(path) == 4
+    store.set("kept", 1, ttl=100)
+    assert stored_rows(path) == 1
+
+
+@pytest.fixture
+def search_api(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_post(url, **kwargs):
+        calls.append(kwargs["json"]["query"])
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {"data": {"webPages": {"value": [
+            {"url": "https://example.org", "name": "Example", "snippet": "s", "summary": "x"}]}}})
+
+    monkeypatch.setattr(tools.http_client, "post", fake_post)
+    monkeypatch.setattr(tools, "SEARCH_CACHE", PersistentCache("langsearch", path=str(tmp_path / "cache.sqlite")))
+    return calls
+
+
+def test_search_results_are_cached_unless_bypassed(monkeypatch, search_api):
+    tools.langsearch_web_search("Mercedes Sosa albums")
+    tools.langsearch_web_search("  mercedes sosa ALBUMS ")
+    assert len(search_api) == 1
+
+    tools.langsearch_web_search("Mercedes Sosa albums", use_cache=False)
+    assert len(search_api) == 2
+
+    monkeypatch.setattr(tools, "SEARCH_CACHE_ENABLED", False)  # LANGSEARCH_CACHE=0
+    tools.langsearch_web_search("Mercedes Sosa albums")
+    assert len(search_api) == 3
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+import cassette
+import http_client
+from mock_scoring_api import start_mock_server
+
+QUESTIONS = [{"task_id": "task-1", "question": "What is in the file?", "file_name": "notes.txt"}]
+
+
+@pytest.fixture
+def scoring_api(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    (fixtures / "files").mkdir(parents=True)
+    (fixtures / "questions.json").write_text(json.dumps(QUESTIONS), encoding="utf-8")
+    (fixtures / "files" / "task-1").write_bytes(b"attached notes")
+    server = start_mock_server(str(fixtures), port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_recorded_calls_replay_offline_without_secrets(monkeypatch, tmp_path, scoring_api):
+    base = f"http://127.0.0.1:{scoring_api.server_address[1]}"
+    directory = tmp_path / "cassettes"
+    monkeypatch.setattr(cassette, "PASSTHROUGH_HOSTS", set())  # record the local API like a remote one
+    monkeypatch.setattr(cassette, "CASSETTE_MODE", "record")
+    monkeypatch.setattr(cassette, "_store", cassette.CassetteStore(str(directory)))
+    cassette.install()
+    try:
+        recorded_questions = http_client.get(f"{base}/questions?api_key=s3cret").json()   # requests
+        recorded_file = asyncio.run(http_client.aget(f"{base}/files/task-1?token=s3cret"))  # httpx
+        assert recorded_questions == QUESTIONS and recorded_file.content == b"attached notes"
+
+        scoring_api.shutdown()
+        scoring_api.server_close()
+        monkeypatch.setattr(cassette, "CASSETTE_MODE", "replay")
+        monkeypatch.setattr(cassette, "_store", cassette.CassetteStore(str(directory)))
+
+        # the server is gone: these are served from the cassette, and the key does not affect matching
+        assert http_client.get(f"{base}/questions?api_key=other").json() == QUESTIONS
+        replayed_file = asyncio.run(http_client.aget(f"{base}/files/task-1?token=other"))
+        assert replayed_file.status_code == 200 and replayed_file.content == b"attached notes"
+        with pytest.raises(cassette.CassetteMissError):
+            http_client.get(f"{base}/files/task-2")
+    finally:
+        http_client.set_transports()
+
+    stored = "".join(path.read_text(encoding="utf-8") for path in directory.glob("*.jsonl"))
+    entries = [json.loads(line) for line in stored.splitlines()]
+    assert [entry["request"] for entry in entries] == [f"GET {base}/questions", f"GET {base}/files/task-1"]
+    assert "s3cret" not in stored
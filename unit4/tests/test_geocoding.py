@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+import geocoding
+from cache import PersistentCache
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_get(url, params):
+        calls.append(params["name"])
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {
+            "results": [{"latitude": 48.85, "longitude": 2.35, "name": "Paris", "country": "France"}]})
+
+    monkeypatch.setattr(geocoding.http_client, "get", fake_get)
+    monkeypatch.setattr(geocoding, "GEOCODE_CACHE", PersistentCache("geocoding", path=str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(geocoding, "_gazetteer", None)
+    monkeypatch.setattr(geocoding, "_gazetteer_failed", False)
+    return calls
+
+
+def test_missing_gazetteer_falls_back_to_the_api(tmp_path, monkeypatch, api):
+    monkeypatch.setattr(geocoding, "GAZETTEER_DIR", str(tmp_path / "gazetteer"))
+    assert geocoding.resolve("Paris")["country"] == "France"
+    assert geocoding.resolve("paris")["country"] == "France"
+    assert api == ["Paris"]
+
+
+def test_unloadable_gazetteer_falls_back_to_the_api(tmp_path, monkeypatch, api):
+    directory = tmp_path / "gazetteer"
+    directory.mkdir()
+    (directory / "keys.npy").write_bytes(b"half written")
+    monkeypatch.setattr(geocoding, "GAZETTEER_DIR", str(directory))
+    assert geocoding.resolve("Paris")["latitude"] == 48.85
+    assert geocoding.get_gazetteer() is None
+    assert api == ["Paris"]
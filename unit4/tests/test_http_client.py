@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import http_client
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+
+
+def fake_session(monkeypatch, statuses):
+    calls = []
+
+    def post(url, **kwargs):
+        status, headers = statuses[len(calls)]
+        calls.append(url)
+        return SimpleNamespace(status_code=status, headers=headers)
+
+    monkeypatch.setattr(http_client, "get_session", lambda: SimpleNamespace(post=post))
+    return calls
+
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_paid_post_is_not_repeated_on_errors_it_may_have_been_charged_for(monkeypatch, no_sleep, status):
+    calls = fake_session(monkeypatch, [(status, {}), (200, {})])
+    assert http_client.post("http://paid", retry_unprocessed=True).status_code == status
+    assert len(calls) == 1
+
+
+def test_paid_post_waits_out_retry_after(monkeypatch, no_sleep):
+    calls = fake_session(monkeypatch, [(429, {"retry-after": "1"}), (200, {})])
+    assert http_client.post("http://paid", retry_unprocessed=True).status_code == 200
+    assert len(calls) == 2
+
+
+def test_async_paid_post_retries_only_refused_connections(monkeypatch, no_sleep):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("refused")
+        if len(attempts) == 2:
+            return httpx.Response(502)
+        return httpx.Response(200)
+
+    http_client.set_transports(async_transport_factory=lambda: httpx.MockTransport(handler))
+    try:
+        response = asyncio.run(http_client.apost("http://paid", retry_unprocessed=True))
+    finally:
+        http_client.set_transports()
+    assert response.status_code == 502
+    assert len(attempts) == 2
+
+
+def test_async_get_waits_the_servers_retry_after(monkeypatch):
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    responses = iter([httpx.Response(503, headers={"retry-after": "7"}), httpx.Response(429), httpx.Response(200)])
+    monkeypatch.setattr(http_client.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0.25)
+    http_client.set_transports(async_transport_factory=lambda: httpx.MockTransport(lambda request: next(responses)))
+    try:
+        response = asyncio.run(http_client.aget("http://api/search"))
+    finally:
+        http_client.set_transports()
+    assert response.status_code == 200
+    assert delays == [7.0, 0.25]  # Retry-After when sent, backoff otherwise
@@ -0,0 +1,65 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from image_prep import MAX_LONG_EDGE, MAX_PIXELS, prepare_image
+
+
+def encode(size, format, mode="RGB", color="white") -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def opened(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+@pytest.mark.parametrize("size", [(4000, 1000), (1000, 3000)])
+def test_long_edge_is_capped(size):
+    data, _ = prepare_image(encode(size, "JPEG"), "image/jpeg")
+    assert max(opened(data).size) <= MAX_LONG_EDGE
+
+
+def test_pixel_count_is_capped_below_the_long_edge_limit():
+    data, _ = prepare_image(encode((1500, 1500), "JPEG"), "image/jpeg")  # 2.25 MP, both edges under 1568
+    width, height = opened(data).size
+    assert width * height <= MAX_PIXELS
+    assert abs(width - height) <= 1  # aspect ratio kept
+
+
+def test_small_supported_images_pass_through_untouched():
+    original = encode((800, 600), "PNG")
+    assert prepare_image(original, "image/png") == (original, "image/png")
+
+
+def test_png_stays_png_and_photos_become_jpeg():
+    data, media_type = prepare_image(encode((3000, 2000), "PNG"), "image/png")
+    assert media_type == "image/png" and opened(data).format == "PNG"
+
+    data, media_type = prepare_image(encode((3000, 2000), "WEBP", mode="RGBA", color=(255, 255, 255, 0)), "image/webp")
+    assert media_type == "image/png"  # transparency survives
+
+    data, media_type = prepare_image(encode((3000, 2000), "WEBP"), "image/webp")
+    assert media_type == "image/jpeg" and opened(data).format == "JPEG"
+
+    data, media_type = prepare_image(encode((200, 100), "BMP"), "image/bmp")  # unsupported upload format
+    assert media_type == "image/jpeg" and opened(data).size == (200, 100)
+
+
+def test_vision_cache_key_follows_images_not_question_formatting(monkeypatch):
+    import tools
+
+    hashes = {"a.png": "sha-a", "b.png": "sha-b", "copy-of-a.png": "sha-a"}
+    store = SimpleNamespace(fetch=lambda url: SimpleNamespace(sha256=hashes[url]))
+    monkeypatch.setattr(tools, "get_attachment_store", lambda: store)
+    key = tools._vision_cache_key
+
+    base = key(["a.png"], "What colour is the car?")
+    assert key(["a.png"], "  what COLOUR is\tthe car? ") == base
+    assert key(["copy-of-a.png"], "What colour is the car?") == base  # same content under another URL
+    assert key(["a.png", "b.png"], "What colour is the car?") != base  # additional_image_urls
+    assert key(["b.png", "a.png"], "What colour is the car?") != key(["a.png", "b.png"], "What colour is the car?")
+    assert key(["a.png"], "What colour is the bike?") != base
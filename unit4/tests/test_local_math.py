@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+import local_math
+from local_math import evaluate_locally
+
+
+@pytest.mark.parametrize("query", [
+    "simplify eval(chr(49)+chr(43)+chr(49))",
+    "simplify exec(chr(49))",
+    "expand getattr(x, chr(95))",
+    "factor x.func",
+    "solve __import__(os).getpid() = x",
+    "simplify (lambda: 1)()",
+])
+def test_symbolic_rejects_code_payloads(query):
+    assert evaluate_locally(query) is None
+
+
+def test_symbolic_payload_does_not_run(tmp_path):
+    marker = tmp_path / "pwned"
+    code = f"open({str(marker)!r}, 'w')"
+    evaluate_locally("simplify eval(" + "+".join(f"chr({ord(c)})" for c in code) + ")")
+    assert not marker.exists()
+
+
+def test_symbolic_queries_still_work():
+    assert evaluate_locally("integrate x^2 from 0 to 1") == "1/3 ≈ 0.3333333333"
+    assert evaluate_locally("solve x^2 = 4") == "x = -2, x = 2"
+    assert evaluate_locally("derivative of sin(x) + log(x)") == "cos(x) + 1/x"
+
+
+def test_log_is_natural_log_like_wolfram_alpha():
+    assert evaluate_locally("log(e)") == "1"
+    assert evaluate_locally("log10(1000)") == "3"
+
+
+@pytest.mark.parametrize("query", ["9**9**9", "(2**5000)**8192", "2^(10^5)", "factorial(1000000)"])
+def test_huge_results_are_refused_quickly(query):
+    start = time.perf_counter()
+    assert evaluate_locally(query) is None
+    assert time.perf_counter() - start < 1
+
+
+def test_symbolic_query_times_out_in_worker():
+    hard = "expand (a+b+c+d+f+g)^30"  # minutes of work in SymPy
+    start = time.perf_counter()
+    assert local_math.evaluate_in_worker(hard, timeout=2) is None
+    assert time.perf_counter() - start < 30
+    assert local_math.evaluate_in_worker("integrate x^2 from 0 to 1", timeout=60) == "1/3 ≈ 0.3333333333"
+
+
+def test_unevaluated_integral_is_left_to_wolfram_alpha():
+    assert evaluate_locally("integrate exp(sin(x)^3) sqrt(1 + x^7) from 0 to 1") is None
+
+
+def test_symbolic_left_out_without_worker():
+    assert local_math.is_symbolic("what is integral of x^2")
+    assert evaluate_locally("integrate x^2", symbolic=False) is None
+
+
+def test_busy_pool_falls_through_to_wolfram_alpha(monkeypatch):
+    import queue
+
+    import python_pool
+
+    class BusyPool(python_pool.PythonWorkerPool):
+        def __init__(self):
+            self.timeout = 30
+            self._idle = queue.Queue()  # execute_python holds every worker
+
+    monkeypatch.setattr(python_pool, "get_python_pool", lambda: BusyPool())
+    monkeypatch.setattr(local_math, "SYMBOLIC_QUEUE_SECONDS", 0.2)
+    start = time.perf_counter()
+    assert local_math.evaluate_in_worker("integrate x^2") is None
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,45 @@
+import threading
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import output_budget
+
+
+def test_parallel_calls_of_one_step_share_the_budget(monkeypatch):
+    monkeypatch.setattr(output_budget, "_step_key_fn", lambda: "step-1")
+    monkeypatch.setattr(output_budget, "_step_usage", output_budget.OrderedDict())
+    text = "word " * (output_budget.STEP_TOKEN_BUDGET * output_budget.CHARS_PER_TOKEN // 5 - 10)  # just fits alone
+    barrier = threading.Barrier(4)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(output_budget.budget_output(text))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(result == text for result in results) == 1
+    assert sum("get_full_output" in result for result in results) == 3
+
+
+def test_pdf_pages_are_sized_to_fit_the_step_budget(monkeypatch):
+    import tools
+
+    monkeypatch.setattr(output_budget, "_step_key_fn", lambda: "step-2")
+    monkeypatch.setattr(output_budget, "_step_usage", output_budget.OrderedDict())
+    monkeypatch.setattr(tools, "get_attachment_store",
+                        lambda: type("Store", (), {"lease": lambda self, url: nullcontext(SimpleNamespace(path=url))})())
+
+    def fake_extract(path, pages=None, keyword=None, max_chars=None):
+        return "--- Page 2 ---\n" + "a" * (max_chars - 200) + "\n[Truncated after ... Request a later page range.]"
+
+    monkeypatch.setattr(tools, "extract_pdf_text", fake_extract)
+    first = tools.read_pdf_fn("doc.pdf", pages="2-40")
+    assert "get_full_output" not in first and first.startswith("--- Page 2 ---")
+
+    second = tools.read_pdf_fn("doc.pdf", pages="41-80")  # the step has spent its budget: a shorter, verbatim read
+    assert "get_full_output" not in second and len(second) < len(first)
@@ -0,0 +1,41 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+from pypdf import PdfWriter
+
+from pdf_text import PageRangeError, extract_pdf_text, parse_page_range
+
+
+def test_empty_file_yields_empty_text(tmp_path):
+    path = tmp_path / "empty.pdf"
+    path.write_bytes(b"")
+    assert extract_pdf_text(str(path)) == ""
+
+
+def test_page_specs_are_parsed_and_clamped():
+    assert parse_page_range("1,4, 7-9", 20) == [0, 3, 6, 7, 8]
+    assert parse_page_range("18-", 20) == [17, 18, 19]
+    assert parse_page_range("3-50", 5) == [2, 3, 4]
+
+
+@pytest.mark.parametrize("pages", ["a-b", "5-2", "two", "1-x"])
+def test_malformed_page_specs_are_rejected(pages):
+    with pytest.raises(PageRangeError):
+        parse_page_range(pages, 10)
+
+
+def test_read_pdf_reports_a_malformed_page_spec(tmp_path, monkeypatch):
+    import tools
+
+    path = tmp_path / "doc.pdf"
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+    monkeypatch.setattr(tools, "get_attachment_store",
+                        lambda: SimpleNamespace(lease=lambda url: nullcontext(SimpleNamespace(path=str(path)))))
+
+    assert tools.read_pdf_fn("doc.pdf", pages="5-2").startswith("Error reading PDF: Invalid page spec '5-2'")
+    assert "--- Page 2 ---" in tools.read_pdf_fn("doc.pdf", pages="2")
@@ -0,0 +1,27 @@
+import multiprocessing
+
+import pytest
+
+import python_pool
+from python_pool import PythonWorkerPool, _Worker
+
+
+def test_worker_that_does_not_start_in_time_is_killed():
+    with pytest.raises(TimeoutError):
+        _Worker(multiprocessing.get_context("spawn"), 512, startup_timeout=0.001)
+
+
+def test_failed_starts_are_retried_until_the_pool_is_full(monkeypatch):
+    starts = []
+
+    class FlakyWorker:
+        def __init__(self, ctx, memory_limit_mb, startup_timeout):
+            starts.append(startup_timeout)
+            if len(starts) <= 2:
+                raise TimeoutError("not ready")
+
+    monkeypatch.setattr(python_pool, "_Worker", FlakyWorker)
+    monkeypatch.setattr(python_pool, "RESPAWN_DELAY_SECONDS", (0,))
+    pool = PythonWorkerPool(size=1, startup_timeout=7)
+    assert isinstance(pool._idle.get(timeout=5), FlakyWorker)
+    assert starts == [7, 7, 7]
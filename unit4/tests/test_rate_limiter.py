@@ -0,0 +1,74 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+
+import rate_limiter
+from rate_limiter import AdaptiveTokenBucket, event_hooks, retry_after_seconds
+
+
+class ProviderError(Exception):
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+def test_retry_after_is_found_on_wrapped_errors():
+    try:
+        try:
+            raise ProviderError({"retry-after": "7"})
+        except ProviderError as e:
+            raise RuntimeError("agent step failed") from e
+    except RuntimeError as wrapped:
+        assert retry_after_seconds(wrapped) == 7.0
+    assert retry_after_seconds(RuntimeError("no response")) is None
+
+
+def test_every_llm_request_takes_a_token(monkeypatch):
+    statuses = iter([429, 200, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), headers={"retry-after": "0.2"})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler), event_hooks=event_hooks(False))
+    aclient = httpx.AsyncClient(transport=httpx.MockTransport(handler), event_hooks=event_hooks(True))
+    limiter = AdaptiveTokenBucket(rate=100, burst=10, max_rate=100)
+    monkeypatch.setattr(rate_limiter, "_limiter", limiter)
+
+    assert client.get("http://llm/v1/messages").status_code == 429
+    assert limiter.rate == 50  # cut on the 429
+
+    start = time.monotonic()
+    assert client.get("http://llm/v1/messages").status_code == 200
+    assert time.monotonic() - start >= 0.15  # waited out Retry-After
+    assert asyncio.run(aclient.get("http://llm/v1/messages")).status_code == 200
+    assert limiter.rate > 50  # recovering after successes
+
+
+def test_anthropic_clients_carry_the_hooks():
+    import anthropic
+    import cassette
+
+    hooks = event_hooks(False)
+    client = anthropic.Anthropic(api_key="test", **cassette.anthropic_client_kwargs(False, hooks))
+    assert client._client.event_hooks == hooks
+    assert cassette.anthropic_client_kwargs(False) == {}  # no hooks and no cassette: the SDK default client
+
+
+def test_only_status_codes_and_sdk_errors_count_as_rate_limits():
+    import anthropic
+
+    assert not rate_limiter.is_rate_limit_error(RuntimeError("the search API says: rate limit exceeded"))
+    assert not rate_limiter.is_rate_limit_error(ValueError("server overloaded, too many requests"))
+    assert rate_limiter.is_rate_limit_error(ProviderError({}))  # 429 on the response
+
+    response = httpx.Response(429, request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"))
+    sdk_error = anthropic.RateLimitError("slow down", response=response, body=None)
+    try:
+        try:
+            raise sdk_error
+        except anthropic.RateLimitError as e:
+            raise RuntimeError("workflow step failed") from e
+    except RuntimeError as wrapped:
+        assert rate_limiter.is_rate_limit_error(wrapped)
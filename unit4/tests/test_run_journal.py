@@ -0,0 +1,25 @@
+from run_journal import MAX_TASK_ATTEMPTS, RunJournal
+
+
+def test_entry_after_truncated_line_survives(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.record("t1", "q1", "a1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"task_id": "t2", "question": "q2", "submitt')  # crash mid-write
+
+    resumed = RunJournal(str(path))
+    assert set(resumed.load()) == {"t1"}
+    resumed.record("t2", "q2", "a2")
+    assert {task: entry["submitted_answer"] for task, entry in RunJournal(str(path)).load().items()} == {"t1": "a1", "t2": "a2"}
+
+
+def test_failures_are_counted_and_become_permanent(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    for _ in range(MAX_TASK_ATTEMPTS - 1):
+        journal.record_failure("bad", "AGENT ERROR: boom")
+    journal.record("good", "q", "a")
+    assert set(journal.load()) == {"good"}
+    assert journal.permanently_failed(["bad"]) == []
+    journal.record_failure("bad", "AGENT ERROR: boom")
+    assert journal.permanently_failed(["bad", "good"]) == ["bad"]
@@ -0,0 +1,95 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import spreadsheet
+
+SALES = pd.DataFrame({
+    "Category": ["Food", "Food", "Drinks", "Food", "Drinks"],
+    "Item": ["Burger", "Salad", "Soda", "Fries", "Tea"],
+    "Price": [8.0, 6.5, 2.0, 3.0, 2.5],
+})
+
+
+@pytest.fixture
+def sheets(monkeypatch, tmp_path):
+    """Attachments served from local files by a fake store; counts how often each one is parsed."""
+    files = {}
+    parsed = []
+
+    def add(url, path, sha256, content_type="text/csv"):
+        files[url] = SimpleNamespace(path=str(path), sha256=sha256, content_type=content_type)
+
+    def lease(attachment):
+        parsed.append(attachment.path)
+        return nullcontext(attachment)
+
+    store = SimpleNamespace(fetch=lambda url: files[url], lease=lease)
+    monkeypatch.setattr(spreadsheet, "get_attachment_store", lambda: store)
+    monkeypatch.setattr(spreadsheet, "PARQUET_CACHE_DIR", str(tmp_path / "parquet"))
+    return SimpleNamespace(add=add, parsed=parsed)
+
+
+@pytest.fixture
+def sales(sheets, tmp_path):
+    path = tmp_path / "sales.csv"
+    SALES.to_csv(path, index=False)
+    sheets.add("https://files/sales.csv", path, "abc123")
+    return spreadsheet.load_sheet_table("https://files/sales.csv")
+
+
+def test_parquet_cache_is_keyed_by_content_and_sheet(sheets, tmp_path):
+    csv_path = tmp_path / "sales.csv"
+    SALES.to_csv(csv_path, index=False)
+    sheets.add("https://files/a.csv", csv_path, "same-sha")
+    sheets.add("https://mirror/b.csv", csv_path, "same-sha")
+
+    first = spreadsheet.load_sheet_table("https://files/a.csv")
+    second = spreadsheet.load_sheet_table("https://mirror/b.csv")
+    assert first.equals(second)
+    assert len(sheets.parsed) == 1  # same content through another URL: one conversion
+
+    xlsx_path = tmp_path / "book.xlsx"
+    with pd.ExcelWriter(xlsx_path) as writer:
+        SALES.to_excel(writer, sheet_name="Sales", index=False)
+        SALES.head(2).to_excel(writer, sheet_name="Top", index=False)
+    sheets.add("https://files/book.xlsx", xlsx_path, "book-sha")
+
+    assert spreadsheet.load_sheet_table("https://files/book.xlsx", sheet="Sales").num_rows == 5
+    assert spreadsheet.load_sheet_table("https://files/book.xlsx", sheet="Top").num_rows == 2
+    assert spreadsheet.load_sheet_table("https://files/book.xlsx", sheet="Top").num_rows == 2
+    assert len(sheets.parsed) == 3  # each sheet is parsed once
+
+
+def test_describe_schema_lists_columns_and_types(sales):
+    header, category, item, price = spreadsheet.describe_schema(sales).splitlines()
+    assert header == "Rows: 5, Columns: 3"
+    assert category.startswith("- Category: ") and category.endswith("string")  # large_string on pandas 3
+    assert item.startswith("- Item: ") and price == "- Price: double"
+
+
+def test_summary_statistics_cover_every_column(sales):
+    stats = spreadsheet.summary_statistics(sales)
+    assert all(name in stats for name in ("Category", "Item", "Price"))
+    assert "4.4" in stats  # mean price
+
+
+def test_query_filters_and_aggregates_over_all_rows(sales):
+    assert "3 matching rows" in spreadsheet.query_sheet(sales, filter="Category == 'Food'")
+    assert spreadsheet.query_sheet(sales, filter="Price > 2.2", column="Price", aggregation="sum") == \
+        "sum of Price over 4 matching rows: 20.0"
+    assert spreadsheet.query_sheet(sales, aggregation="count") == "count of rows: 5"
+    assert spreadsheet.query_sheet(sales, aggregation="median").startswith("Pass a column")
+
+
+def test_group_by_labels_what_it_computed(sales):
+    means = spreadsheet.query_sheet(sales, group_by="Category", column="Price", aggregation="mean")
+    assert means.startswith("mean of Price by Category (5 matching rows):")
+    assert "Drinks" in means and "2.25" in means
+
+    counts = spreadsheet.query_sheet(sales, group_by="Category", aggregation="count")
+    assert counts.startswith("Row counts by Category (5 matching rows):")
+    assert spreadsheet.query_sheet(sales, group_by="Category", aggregation="sum").startswith("Pass a column")
+    assert spreadsheet.query_sheet(sales, group_by="Category").startswith("Row counts by Category:")
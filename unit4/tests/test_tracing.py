@@ -0,0 +1,26 @@
+import pytest
+
+import tracing
+
+
+def test_task_summary_sums_attempts_and_is_dropped_afterwards():
+    with tracing.task_summary("t1") as summary:
+        with pytest.raises(RuntimeError):
+            with tracing.question_trace("t1", path=None) as trace:
+                trace.add_span("llm", trace.model, 0.0, 2.0, input_tokens=100, output_tokens=10)
+                raise RuntimeError("first attempt failed")
+        with tracing.question_trace("t1", path=None) as trace:
+            trace.add_span("llm", trace.model, 0.0, 1.0, input_tokens=50, output_tokens=5)
+
+    assert summary["attempts"] == 2
+    assert summary["llm_calls"] == 2
+    assert summary["llm_seconds"] == 3.0
+    assert summary["input_tokens"] == 150
+    assert tracing._summaries == {}
+
+
+def test_traces_outside_a_task_summary_keep_nothing():
+    for _ in range(3):
+        with tracing.question_trace("t2", path=None):
+            pass
+    assert tracing._summaries == {}
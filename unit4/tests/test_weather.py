@@ -0,0 +1,23 @@
+import tools
+
+
+def fail_fetch(*args):
+    raise AssertionError("invalid arguments must not reach the API")
+
+
+def test_invalid_dates_are_reported_before_fetching(monkeypatch):
+    monkeypatch.setattr(tools, "get_weather_forecast", fail_fetch)
+    assert tools.get_weather_forecast_tool_fn(48.1, 11.6, start_date="next monday") == \
+        "Invalid start_date 'next monday', expected YYYY-MM-DD."
+    assert "is after end_date" in tools.get_weather_forecast_tool_fn(48.1, 11.6, "2026-10-20", "2026-10-18")
+    assert "Unknown aggregation" in tools.get_weather_forecast_tool_fn(48.1, 11.6, aggregation="weekly")
+
+
+def test_forecast_defaults_to_hourly(monkeypatch):
+    forecast = {"hourly": {"time": ["2026-10-17T00:00", "2026-10-17T01:00", "2026-10-18T00:00"],
+                           "temperature_2m": [1.0, 2.0, 3.0], "precipitation": [0.0, 1.5, 0.0]}}
+    monkeypatch.setattr(tools, "get_weather_forecast", lambda latitude, longitude: forecast)
+    hourly = tools.get_weather_forecast_tool_fn(48.1, 11.6)
+    assert hourly.startswith("Hourly Weather Forecast") and hourly.count("Time:") == 3
+    daily = tools.get_weather_forecast_tool_fn(48.1, 11.6, start_date="2026-10-17", aggregation="daily")
+    assert "Date: 2026-10-17, Min: 1.0°C, Max: 2.0°C, Total precipitation: 1.5mm" in daily
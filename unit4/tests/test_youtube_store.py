@@ -0,0 +1,45 @@
+import threading
+import time
+
+import numpy as np
+
+import youtube_store
+from youtube_store import Transcript, query_transcript
+
+
+def make_transcript():
+    return Transcript(np.array([0, 10, 20], dtype=np.float32), np.array([10, 10, 10], dtype=np.float32),
+                      ["hello there", "the bird sings", "goodbye"])
+
+
+def test_bad_time_window_is_reported_not_raised():
+    answer = query_transcript(make_transcript(), start_time="ten seconds")
+    assert answer.startswith("Could not read the time window: invalid time 'ten seconds'")
+    assert "bird" in query_transcript(make_transcript(), start_time="0:12", end_time="0:15")
+
+
+def test_different_videos_are_fetched_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(youtube_store, "TRANSCRIPT_DIR", str(tmp_path))
+    in_flight, peak = [0], [0]
+    guard = threading.Lock()
+
+    def slow_fetch(video_id):
+        with guard:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.2)
+        with guard:
+            in_flight[0] -= 1
+        return [{"text": f"video {video_id}", "start": 0.0, "duration": 1.0}]
+
+    monkeypatch.setattr(youtube_store, "_fetch_segments", slow_fetch)
+    youtube_store.load_transcript.cache_clear()
+    threads = [threading.Thread(target=youtube_store.load_transcript, args=(f"video{i:06d}",)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    youtube_store.load_transcript.cache_clear()
+
+    assert peak[0] == 3
+    assert (tmp_path / "video000001.npz").exists()
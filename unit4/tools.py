@@ -1,21 +1,53 @@
-import requests
+import asyncio
+import functools
+import cassette
+import http_client
+import rate_limiter
 import os
-import pandas as pd
 from dotenv import load_dotenv
 from llama_index.core.tools import FunctionTool
-from datetime import date
 from huggingface_hub import list_models
 import random
+from cache import PersistentCache, make_key
+from attachments import get_attachment_store
+from output_budget import budgeted, get_full_output, remaining_chars, STEP_TOKEN_BUDGET, CHARS_PER_TOKEN
 
 load_dotenv()
 
 
+def run_in_thread(fn):
+    """Async twin of a blocking tool function: runs it in a worker thread so the event loop stays free."""
+    @functools.wraps(fn)
+    async def async_fn(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return async_fn
+
+
 ##### Web search tool using LangSearch API #####
 
-def langsearch_web_search(query: str, fresh="noLimit", summary=True, count=5):
-    api_key = os.getenv("LANGSEARCH_API_KEY")
-    url = "https://api.langsearch.com/v1/web-search"
+SEARCH_CACHE = PersistentCache("langsearch")
+SEARCH_CACHE_ENABLED = os.getenv("LANGSEARCH_CACHE", "1") != "0"
+# how long a cached result stays valid, by LangSearch freshness window
+SEARCH_CACHE_TTL = {
+    "day": 30 * 60,
+    "oneDay": 30 * 60,
+    "oneWeek": 6 * 3600,
+    "oneMonth": 24 * 3600,
+    "oneYear": 7 * 24 * 3600,
+    "noLimit": 30 * 24 * 3600,
+}
+DEFAULT_SEARCH_CACHE_TTL = 3600
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).strip(" ?!.")
+
+
+LANGSEARCH_URL = "https://api.langsearch.com/v1/web-search"
 
+
+def _langsearch_request(query: str, fresh: str, summary: bool, count: int) -> dict:
+    api_key = os.getenv("LANGSEARCH_API_KEY")
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -26,35 +58,74 @@ def langsearch_web_search(query: str, fresh="noLimit", summary=True, count=5):
         "summary": summary,
         "count": count,
     }
+    return {"headers": headers, "json": payload}
 
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()  # Raises an error if the request failed
 
+def _parse_langsearch_response(data: dict) -> list:
     result = []
-    for item in response.json()["data"]["webPages"]["value"]:
+    for item in data["data"]["webPages"]["value"]:
         result.append({"url": item["url"], "title": item["name"], "snippet": item["snippet"], "summary": item["summary"]})
+    return result
 
+
+def langsearch_web_search(query: str, fresh="noLimit", summary=True, count=5, use_cache=True):
+    cache_key = make_key(normalize_query(query), fresh, bool(summary), int(count))
+    use_cache = use_cache and SEARCH_CACHE_ENABLED
+    if use_cache:
+        cached = SEARCH_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    response = http_client.post(LANGSEARCH_URL, retry_unprocessed=True, **_langsearch_request(query, fresh, summary, count))
+    response.raise_for_status()  # Raises an error if the request failed
+    result = _parse_langsearch_response(response.json())
+
+    if use_cache:
+        SEARCH_CACHE.set(cache_key, result, SEARCH_CACHE_TTL.get(fresh, DEFAULT_SEARCH_CACHE_TTL))
     return result
 
 
-def langsearch_tool_fn(query: str, verbose: bool=False) -> str:
-    results = langsearch_web_search(query, count=5)
+async def alangsearch_web_search(query: str, fresh="noLimit", summary=True, count=5, use_cache=True):
+    cache_key = make_key(normalize_query(query), fresh, bool(summary), int(count))
+    use_cache = use_cache and SEARCH_CACHE_ENABLED
+    if use_cache:
+        cached = SEARCH_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    response = await http_client.apost(LANGSEARCH_URL, retry_unprocessed=True, **_langsearch_request(query, fresh, summary, count))
+    response.raise_for_status()
+    result = _parse_langsearch_response(response.json())
+
+    if use_cache:
+        SEARCH_CACHE.set(cache_key, result, SEARCH_CACHE_TTL.get(fresh, DEFAULT_SEARCH_CACHE_TTL))
+    return result
 
 
+def _format_search_results(results: list, verbose: bool) -> str:
     if verbose:
-        text_results = "\n".join([
+        return "\n".join([
             f"{r['title']} ({r['url']}): \nSummary: {r['summary']}" for r in results]
             )
-        return text_results
-    
-    text_results = "\n".join([
+    return "\n".join([
         f"{r['title']} ({r['url']}): \nSnippet: {r['snippet']}" for r in results]
         )
 
-    return text_results
+
+@budgeted("search")
+def langsearch_tool_fn(query: str, verbose: bool=False) -> str:
+    results = langsearch_web_search(query, count=5)
+    return _format_search_results(results, verbose)
+
+
+@budgeted("search")
+async def alangsearch_tool_fn(query: str, verbose: bool=False) -> str:
+    results = await alangsearch_web_search(query, count=5)
+    return _format_search_results(results, verbose)
 
 websearch_tool = FunctionTool.from_defaults(
     fn=langsearch_tool_fn,
+    async_fn=alangsearch_tool_fn,
     name="langsearch_websearch",
     description="Uses the LangSearch API to search the web and return titles and urls, and snippets or summaries. " \
     "Set verbose to True to return summaries instead of snippets." \
@@ -65,64 +136,176 @@ websearch_tool = FunctionTool.from_defaults(
 
 ##### Weather forecast API tool using Open-Meteo API (both current weather and weather forecast for the next 7 days) #####
 
-### weather forecast tool for next 7 days
+import time
+import numpy as np
 
-def get_weather_forecast(latitude: float, longitude: float) -> dict:
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+WEATHER_CACHE = PersistentCache("weather")
+WEATHER_GRID_DEGREES = 0.1          # ~11 km cells; nearby lookups share one fetch
+MODEL_UPDATE_SECONDS = 3600         # Open-Meteo refreshes its forecasts hourly
+HOURLY_VARIABLES = ["temperature_2m", "precipitation"]
+CURRENT_VARIABLES = ["temperature_2m", "precipitation", "weather_code", "wind_speed_10m", "cloud_cover"]
+
+
+def _grid_cell(latitude: float, longitude: float) -> tuple[float, float]:
+    step = WEATHER_GRID_DEGREES
+    return round(round(float(latitude) / step) * step, 4), round(round(float(longitude) / step) * step, 4)
+
+
+def _weather_params(latitude: float, longitude: float) -> dict:
+    """One request per cell fetches both the hourly forecast and the current conditions."""
+    return {
         "latitude": latitude,
         "longitude": longitude,
-        "hourly": ["temperature_2m", "precipitation"],
-        "current_weather": False,
+        "hourly": HOURLY_VARIABLES,
+        "current": CURRENT_VARIABLES,
+        "timezone": "auto",
     }
-    response = requests.get(url, params=params)
+
+
+def _seconds_until_model_update() -> int:
+    return int(MODEL_UPDATE_SECONDS - time.time() % MODEL_UPDATE_SECONDS) + 1
+
+
+def get_weather(latitude: float, longitude: float) -> dict:
+    cell = _grid_cell(latitude, longitude)
+    cache_key = make_key(*cell)
+    cached = WEATHER_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = http_client.get(WEATHER_URL, params=_weather_params(*cell))
     response.raise_for_status()
+    weather = response.json()
+    WEATHER_CACHE.set(cache_key, weather, _seconds_until_model_update())
+    return weather
 
-    return response.json()
 
+async def aget_weather(latitude: float, longitude: float) -> dict:
+    cell = _grid_cell(latitude, longitude)
+    cache_key = make_key(*cell)
+    cached = WEATHER_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await http_client.aget(WEATHER_URL, params=_weather_params(*cell))
+    response.raise_for_status()
+    weather = response.json()
+    WEATHER_CACHE.set(cache_key, weather, _seconds_until_model_update())
+    return weather
 
-def get_weather_forecast_tool_fn(latitude: float, longitude: float) -> str:
-    forecast = get_weather_forecast(latitude, longitude)
-    hourly_data = forecast.get("hourly", {})
-    times = hourly_data.get("time", [])
-    temperatures = hourly_data.get("temperature_2m", [])
-    precipitations = hourly_data.get("precipitation", [])
 
-    if not times or not temperatures or not precipitations:
+### weather forecast tool for next 7 days
+
+def _hourly_arrays(forecast: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    hourly_data = forecast.get("hourly", {})
+    times = np.array(hourly_data.get("time", []), dtype="datetime64[m]")
+    temperatures = np.array(hourly_data.get("temperature_2m", []), dtype=float)  # None -> nan
+    precipitations = np.array(hourly_data.get("precipitation", []), dtype=float)
+    return times, temperatures, precipitations
+
+
+FORECAST_AGGREGATIONS = ("hourly", "daily")
+
+
+def _forecast_args_error(start_date: str | None, end_date: str | None, aggregation: str) -> str | None:
+    """An error message for the agent if the window or aggregation is invalid, checked before any fetch."""
+    if aggregation not in FORECAST_AGGREGATIONS:
+        return f"Unknown aggregation '{aggregation}', expected one of {FORECAST_AGGREGATIONS}."
+    dates = {}
+    for name, value in (("start_date", start_date), ("end_date", end_date)):
+        if value:
+            try:
+                dates[name] = np.datetime64(str(value).strip(), "D")
+            except ValueError:
+                return f"Invalid {name} '{value}', expected YYYY-MM-DD."
+    if len(dates) == 2 and dates["start_date"] > dates["end_date"]:
+        return f"start_date {start_date} is after end_date {end_date}."
+    return None
+
+
+def _format_forecast(forecast: dict, start_date: str | None = None, end_date: str | None = None,
+                     aggregation: str = "hourly") -> str:
+    times, temperatures, precipitations = _hourly_arrays(forecast)
+    if not len(times) or len(temperatures) != len(times) or len(precipitations) != len(times):
         return "No weather forecast data available."
 
-    result = f"Hourly Weather Forecast for next 7 days (from today {date.today()}):\n"
-    for time, temp, precip in zip(times, temperatures, precipitations):
-        result += f"Time: {time}, Temperature: {temp}°C, Precipitation: {precip}mm\n"
+    days = times.astype("datetime64[D]")
+    window = np.ones(len(times), dtype=bool)
+    if start_date:
+        window &= days >= np.datetime64(str(start_date).strip(), "D")
+    if end_date:
+        window &= days <= np.datetime64(str(end_date).strip(), "D")
+    if not window.any():
+        return f"No forecast data for the requested dates; the forecast covers {days[0]} to {days[-1]}."
+    times, days, temperatures, precipitations = times[window], days[window], temperatures[window], precipitations[window]
+    zone = forecast.get("timezone_abbreviation") or forecast.get("timezone") or "GMT"
+
+    if aggregation == "hourly":
+        lines = [f"Hourly Weather Forecast ({zone}) from {days[0]} to {days[-1]}:"]
+        lines += [f"Time: {t}, Temperature: {temp}°C, Precipitation: {precip}mm"
+                  for t, temp, precip in zip(times, temperatures, precipitations)]
+        return "\n".join(lines)
+
+    # hours are sorted, so every day is one contiguous run starting at `starts`
+    day_values, starts = np.unique(days, return_index=True)
+    t_min = np.fmin.reduceat(temperatures, starts)
+    t_max = np.fmax.reduceat(temperatures, starts)
+    rain = np.add.reduceat(np.nan_to_num(precipitations), starts)
+    lines = [f"Daily Weather Forecast ({zone}) from {day_values[0]} to {day_values[-1]}:"]
+    lines += [f"Date: {day}, Min: {lo:.1f}°C, Max: {hi:.1f}°C, Total precipitation: {total:.1f}mm"
+              for day, lo, hi, total in zip(day_values, t_min, t_max, rain)]
+    return "\n".join(lines)
 
-    return result
+
+def get_weather_forecast(latitude: float, longitude: float) -> dict:
+    return get_weather(latitude, longitude)
+
+
+async def aget_weather_forecast(latitude: float, longitude: float) -> dict:
+    return await aget_weather(latitude, longitude)
+
+
+@budgeted("table")
+def get_weather_forecast_tool_fn(latitude: float, longitude: float, start_date: str | None = None,
+                                 end_date: str | None = None, aggregation: str = "hourly") -> str:
+    error = _forecast_args_error(start_date, end_date, aggregation)
+    if error:
+        return error
+    return _format_forecast(get_weather_forecast(latitude, longitude), start_date, end_date, aggregation)
+
+
+@budgeted("table")
+async def aget_weather_forecast_tool_fn(latitude: float, longitude: float, start_date: str | None = None,
+                                        end_date: str | None = None, aggregation: str = "hourly") -> str:
+    error = _forecast_args_error(start_date, end_date, aggregation)
+    if error:
+        return error
+    return _format_forecast(await aget_weather_forecast(latitude, longitude), start_date, end_date, aggregation)
 
 
 get_weather_forecast_tool = FunctionTool.from_defaults(
     fn=get_weather_forecast_tool_fn,
+    async_fn=aget_weather_forecast_tool_fn,
     name="get_weather_forecast",
     description="Uses the Open-Meteo Weather Forecast API to get the weather at a location for the next 7 days. " \
-    "Returns time (hourly), temperature (Celsius) and precipitation (mm)." \
+    "By default returns hourly temperature (Celsius) and precipitation (mm); set aggregation='daily' for one " \
+    "line per day with min/max temperature and total precipitation. Pass start_date and/or end_date (YYYY-MM-DD, local time) " \
+    "to only get those days." \
     "\nBest use get_coordinates before to get the latitude and longitude of the location you want the weather forecast for."
 )
 
 ### current weather tool
 
 def get_current_weather(latitude: float, longitude: float) -> dict:
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "current": ["temperature_2m", "precipitation", "weather_code", "wind_speed_10m", "cloud_cover"],
-        "timezone": "auto"
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    return get_weather(latitude, longitude)
 
-    return response.json()
 
-def get_current_weather_tool_fn(latitude: float, longitude: float) -> str:
-    weather = get_current_weather(latitude, longitude)
+async def aget_current_weather(latitude: float, longitude: float) -> dict:
+    return await aget_weather(latitude, longitude)
+
+
+def _format_current_weather(weather: dict) -> str:
     current_weather = weather["current"]
     temperature = current_weather["temperature_2m"]
     precipitation = current_weather["precipitation"]
@@ -133,8 +316,17 @@ def get_current_weather_tool_fn(latitude: float, longitude: float) -> str:
     result = f"Current Weather:\nTemperature: {temperature}°C\nPrecipitation: {precipitation}mm\nWind Speed: {wind_speed}km/h\nCloud Cover: {cloudcover}%"
     return result
 
+
+def get_current_weather_tool_fn(latitude: float, longitude: float) -> str:
+    return _format_current_weather(get_current_weather(latitude, longitude))
+
+
+async def aget_current_weather_tool_fn(latitude: float, longitude: float) -> str:
+    return _format_current_weather(await aget_current_weather(latitude, longitude))
+
 get_current_weather_tool = FunctionTool.from_defaults(
     fn=get_current_weather_tool_fn,
+    async_fn=aget_current_weather_tool_fn,
     name="get_current_weather",
     description="Uses the Open-Meteo Weather Forecast API to get the current weather at a location." \
     "Returns time (hourly), temperature (Celsius), precipitation (mm), wind speed (km/h) and cloud coverage (%)." \
@@ -146,204 +338,365 @@ get_current_weather_tool = FunctionTool.from_defaults(
 
 import anthropic
 import base64
+import threading
+import weakref
+from image_prep import prepare_image
+
+VISION_MODEL = "claude-haiku-4-5-20251001"
+VISION_CACHE = PersistentCache("vision")
+VISION_CACHE_TTL = 30 * 24 * 3600
+DEFAULT_IMAGE_QUESTION = "Describe everything you see in this image in detail."
+
+_anthropic_client = None
+_anthropic_client_lock = threading.Lock()
+_async_anthropic_clients = weakref.WeakKeyDictionary()
+
+
+def get_anthropic_client() -> anthropic.Anthropic:
+    global _anthropic_client
+    with _anthropic_client_lock:
+        if _anthropic_client is None:
+            _anthropic_client = anthropic.Anthropic(
+                **{"api_key": os.getenv("ANTHROPIC_API_KEY"),
+                   **cassette.anthropic_client_kwargs(is_async=False, event_hooks=rate_limiter.event_hooks(False))}
+            )
+    return _anthropic_client
 
-def analyze_image_fn(image_url: str, question: str = "Describe everything you see in this image in detail.") -> str:
-    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-    img_response = requests.get(image_url)
-    img_response.raise_for_status()
-    image_data = base64.standard_b64encode(img_response.content).decode("utf-8")
-    media_type = img_response.headers.get("content-type", "image/jpeg").split(";")[0]
 
-    message = client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=1024,
-        messages=[
+def get_async_anthropic_client() -> anthropic.AsyncAnthropic:
+    """One async client per event loop, since its connection pool is bound to the loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_anthropic_clients.get(loop)
+    if client is None:
+        client = anthropic.AsyncAnthropic(
+            **{"api_key": os.getenv("ANTHROPIC_API_KEY"),
+               **cassette.anthropic_client_kwargs(is_async=True, event_hooks=rate_limiter.event_hooks(True))}
+        )
+        _async_anthropic_clients[loop] = client
+    return client
+
+
+def _vision_cache_key(image_urls: list[str], question: str) -> str:
+    store = get_attachment_store()
+    image_hashes = [store.fetch(url).sha256 for url in image_urls]
+    return make_key(image_hashes, " ".join(question.lower().split()))
+
+
+def _image_request(image_urls: list[str], question: str) -> dict:
+    store = get_attachment_store()
+    content = []
+    for i, image_url in enumerate(image_urls):
+        attachment = store.fetch(image_url)
+        media_type = attachment.content_type if attachment.content_type.startswith("image/") else "image/jpeg"
+        image_bytes, media_type = prepare_image(store.read_bytes(attachment), media_type)
+        if len(image_urls) > 1:
+            content.append({"type": "text", "text": f"Image {i + 1}:"})
+        content.append(
             {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": media_type,
-                            "data": image_data,
-                        },
-                    },
-                    {"type": "text", "text": question},
-                ],
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": media_type,
+                    "data": base64.standard_b64encode(image_bytes).decode("utf-8"),
+                },
             }
-        ],
+        )
+    content.append({"type": "text", "text": question})
+
+    return dict(
+        model=VISION_MODEL,
+        max_tokens=1024,
+        messages=[{"role": "user", "content": content}],
     )
-    return message.content[0].text
+
+
+@budgeted("text")
+def analyze_image_fn(image_url: str, question: str = DEFAULT_IMAGE_QUESTION,
+                     additional_image_urls: list[str] | None = None) -> str:
+    image_urls = [image_url, *(additional_image_urls or [])]
+    cache_key = _vision_cache_key(image_urls, question)
+    cached = VISION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    message = get_anthropic_client().messages.create(**_image_request(image_urls, question))
+    answer = message.content[0].text
+    VISION_CACHE.set(cache_key, answer, VISION_CACHE_TTL)
+    return answer
+
+
+@budgeted("text")
+async def aanalyze_image_fn(image_url: str, question: str = DEFAULT_IMAGE_QUESTION,
+                            additional_image_urls: list[str] | None = None) -> str:
+    image_urls = [image_url, *(additional_image_urls or [])]
+    cache_key = await asyncio.to_thread(_vision_cache_key, image_urls, question)  # may download
+    cached = VISION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    request = await asyncio.to_thread(_image_request, image_urls, question)  # resize + base64 off the loop
+    message = await get_async_anthropic_client().messages.create(**request)
+    answer = message.content[0].text
+    VISION_CACHE.set(cache_key, answer, VISION_CACHE_TTL)
+    return answer
 
 analyze_image_tool = FunctionTool.from_defaults(
     fn=analyze_image_fn,
+    async_fn=aanalyze_image_fn,
     name="analyze_image",
     description="Downloads an image from a URL and uses Claude vision to analyze it. "
     "Pass the image URL and an optional specific question about the image. "
+    "When a question involves several images, pass the others as additional_image_urls to analyze them together. "
     "Use this whenever a question involves an image, chart, diagram, or visual content.",
 )
 
 
 ##### Wolfram Alpha tool for mathematical and factual queries #####
 
+import local_math
+
+WOLFRAM_URL = "http://api.wolframalpha.com/v1/result"
+WOLFRAM_CACHE = PersistentCache("wolfram")
+WOLFRAM_CACHE_TTL = 30 * 24 * 3600
+
+
+def _local_or_cached_math(query: str) -> tuple[str | None, str]:
+    """
+    Returns (answer, cache_key); answer is None when Wolfram Alpha has to be asked.
+    Blocking: symbolic queries run in a worker process for up to LOCAL_MATH_TIMEOUT_SECONDS.
+    """
+    answer = local_math.evaluate_locally(query, symbolic=False)
+    if answer is not None:
+        local_math.record("local")
+        return answer, ""
+    cache_key = make_key(" ".join(query.lower().split()))
+    answer = WOLFRAM_CACHE.get(cache_key)
+    if answer is not None:
+        local_math.record("cached")
+        return answer, cache_key
+    if local_math.is_symbolic(query):
+        answer = local_math.evaluate_in_worker(query)  # None on timeout: fall through to the API
+        if answer is not None:
+            local_math.record("local")
+            WOLFRAM_CACHE.set(cache_key, answer, WOLFRAM_CACHE_TTL)
+    return answer, cache_key
+
+
 def wolfram_alpha_fn(query: str) -> str:
+    answer, cache_key = _local_or_cached_math(query)
+    if answer is not None:
+        return answer
+
+    local_math.record("remote")
     app_id = os.getenv("WOLFRAM_ALPHA_APP_ID")
-    response = requests.get(
-        "http://api.wolframalpha.com/v1/result",
+    response = http_client.get(
+        WOLFRAM_URL,
         params={"i": query, "appid": app_id},
         timeout=10,
     )
     if response.status_code == 200:
+        WOLFRAM_CACHE.set(cache_key, response.text, WOLFRAM_CACHE_TTL)
+        return response.text
+    return f"Wolfram Alpha could not compute an answer for: {query}"
+
+
+async def awolfram_alpha_fn(query: str) -> str:
+    answer, cache_key = await asyncio.to_thread(_local_or_cached_math, query)
+    if answer is not None:
+        return answer
+
+    local_math.record("remote")
+    app_id = os.getenv("WOLFRAM_ALPHA_APP_ID")
+    response = await http_client.aget(WOLFRAM_URL, params={"i": query, "appid": app_id}, timeout=10)
+    if response.status_code == 200:
+        WOLFRAM_CACHE.set(cache_key, response.text, WOLFRAM_CACHE_TTL)
         return response.text
     return f"Wolfram Alpha could not compute an answer for: {query}"
 
 wolfram_alpha_tool = FunctionTool.from_defaults(
     fn=wolfram_alpha_fn,
+    async_fn=awolfram_alpha_fn,
     name="wolfram_alpha",
-    description="Sends a query to Wolfram Alpha and returns a concise computed answer. "
+    description="Answers a math query locally when possible (arithmetic, percentages, unit conversions, "
+    "integrals, derivatives, equations) and otherwise sends it to Wolfram Alpha for a concise computed answer. "
     "Best for mathematical calculations, unit conversions, equations, integrals, "
     "statistics, and factual lookups (e.g. 'integrate x^2 from 0 to 1', '15% of 340', 'sqrt(2) + pi').",
 )
 
-##### Get Coordinates tool using Open-Meteo API #####
+##### Get Coordinates tool (offline gazetteer, then cached Open-Meteo geocoding) #####
+
+import geocoding
+
 
 def get_coordinates_fn(location: str) -> dict:
-    url = "https://geocoding-api.open-meteo.com/v1/search"
-    params = {"name": location, "count": 1}
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    return geocoding.resolve(location)
+
+
+async def aget_coordinates_fn(location: str) -> dict:
+    return await geocoding.aresolve(location)
 
-    data = response.json()
-    if "results" in data and len(data["results"]) > 0:
-        result = data["results"][0]
-        return {
-            "latitude": result.get("latitude"),
-            "longitude": result.get("longitude"),
-            "name": result.get("name"),
-            "country": result.get("country"),
-        }
-    else:
-        return {"error": f"No coordinates found for location: {location}"}
-    
 get_coordinates_tool = FunctionTool.from_defaults(
     fn=get_coordinates_fn,
+    async_fn=aget_coordinates_fn,
     name="get_coordinates",
     description="Uses the Open-Meteo Geocoding API to get the coordinates of a location. " \
     "Returns the latitude and longitude of the location, as well as the name and country if available."
 )
 
 
+def get_coordinates_batch_fn(locations: list[str]) -> dict:
+    return geocoding.resolve_many(locations)
+
+
+async def aget_coordinates_batch_fn(locations: list[str]) -> dict:
+    return await geocoding.aresolve_many(locations)
+
+get_coordinates_batch_tool = FunctionTool.from_defaults(
+    fn=get_coordinates_batch_fn,
+    async_fn=aget_coordinates_batch_fn,
+    name="get_coordinates_batch",
+    description="Gets the coordinates of several locations in one call. " \
+    "Returns a mapping from each location to its latitude, longitude, name and country (or an error)."
+)
+
+
 ##### PDF reader tool #####
 
-import io
-from pypdf import PdfReader
+from pdf_text import extract_pdf_text, PageRangeError, DEFAULT_MAX_CHARS
 
-def read_pdf_fn(file_url: str) -> str:
-    response = requests.get(file_url)
-    response.raise_for_status()
-    pdf = PdfReader(io.BytesIO(response.content))
-    text = ""
-    for page in pdf.pages:
-        text += page.extract_text() + "\n"
-    return text[:15000] if len(text) > 15000 else text
+@budgeted("document")
+def read_pdf_fn(file_url: str, pages: str | None = None, keyword: str | None = None,
+                full_document: bool = False) -> str:
+    # stop where the step budget would compact the text anyway, so requested pages arrive verbatim
+    max_chars = None if full_document else min(DEFAULT_MAX_CHARS, remaining_chars())
+    try:
+        with get_attachment_store().lease(file_url) as attachment:
+            return extract_pdf_text(attachment.path, pages=pages, keyword=keyword, max_chars=max_chars)
+    except PageRangeError as e:
+        return f"Error reading PDF: {e}"
 
 read_pdf_tool = FunctionTool.from_defaults(
     fn=read_pdf_fn,
+    async_fn=run_in_thread(read_pdf_fn),
     name="read_pdf",
-    description="Downloads a PDF from a URL and returns the extracted text. "
-    "Use this when a question references an attached .pdf file.",
+    description="Downloads a PDF from a URL and returns the extracted text, page by page. "
+    "Use this when a question references an attached .pdf file. "
+    f"Output stops after about {STEP_TOKEN_BUDGET * CHARS_PER_TOKEN} characters; pass pages (e.g. '3' or '2-5,9') to read a specific section, "
+    "keyword to only get pages mentioning it, or full_document=True when every page is needed "
+    "(it is then returned as an outline you can page through with get_full_output).",
 )
 
 
 ##### CSV / Excel reader tool #####
 
-def read_spreadsheet_fn(file_url: str) -> str:
-    if ".xls" in file_url.lower():
-        df = pd.read_excel(file_url)
-    else:
-        df = pd.read_csv(file_url)
-    return df.to_string(max_rows=100)
+import spreadsheet
+
+@budgeted("table")
+def read_spreadsheet_fn(file_url: str, operation: str = "preview", filter: str | None = None,
+                        group_by: str | None = None, column: str | None = None, aggregation: str | None = None,
+                        columns: list[str] | None = None, sheet: str | None = None) -> str:
+    try:
+        table = spreadsheet.load_sheet_table(file_url, sheet=sheet)
+        if operation == "schema":
+            return spreadsheet.describe_schema(table)
+        if operation == "stats":
+            return spreadsheet.summary_statistics(table)
+        if operation == "query":
+            return spreadsheet.query_sheet(table, filter=filter, group_by=group_by, column=column,
+                                           aggregation=aggregation, columns=columns)
+        preview = spreadsheet.query_sheet(table, limit=20)
+        return f"{spreadsheet.describe_schema(table)}\n\n{preview}"
+    except Exception as e:
+        return f"Error reading spreadsheet: {e}"
 
 read_spreadsheet_tool = FunctionTool.from_defaults(
     fn=read_spreadsheet_fn,
+    async_fn=run_in_thread(read_spreadsheet_fn),
     name="read_spreadsheet",
-    description="Downloads and reads a CSV or Excel (.xlsx/.xls) file from a URL and returns its contents as text. "
-    "Use this when a question references an attached spreadsheet, CSV, or Excel file.",
+    description="Reads a CSV or Excel (.xlsx/.xls) file from a URL and answers questions over ALL of its rows. "
+    "Use this when a question references an attached spreadsheet, CSV, or Excel file. "
+    "operation='preview' (default) shows the schema and first rows, 'schema' lists columns and types, "
+    "'stats' gives summary statistics, and 'query' computes exact results: "
+    "filter is a pandas query expression (e.g. \"Category == 'Food' and Price > 3\"), "
+    "group_by a column name, column the column to aggregate, "
+    f"aggregation one of {', '.join(spreadsheet.AGGREGATIONS)}, and columns limits the printed columns. "
+    "Pass sheet to read a specific Excel sheet.",
 )
 
 
 ##### Audio transcription tool using HF Inference API (Whisper) #####
 
-from huggingface_hub import InferenceClient
+from audio_transcribe import transcribe_attachment
 
+@budgeted("text")
 def transcribe_audio_fn(file_url: str) -> str:
-    audio_response = requests.get(file_url)
-    audio_response.raise_for_status()
-    client = InferenceClient(
-        provider="hf-inference",
-        api_key=os.getenv("HF_TOKEN"),
-    )
-    result = client.automatic_speech_recognition(
-        audio_response.content,
-        model="openai/whisper-large-v3",
-    )
-    return result.text
+    return transcribe_attachment(file_url)
 
 transcribe_audio_tool = FunctionTool.from_defaults(
     fn=transcribe_audio_fn,
+    async_fn=run_in_thread(transcribe_audio_fn),
     name="transcribe_audio",
     description="Downloads an audio file from a URL and transcribes it to text using Whisper. "
+    "Long recordings are returned as [mm:ss]-timestamped segments. "
     "Use this when a question references an attached audio file (.mp3, .wav, .m4a, etc.).",
 )
 
 
 ##### Python code execution tool #####
 
-import sys
-from io import StringIO
+from python_pool import get_python_pool
 
+@budgeted("text")
 def execute_python_fn(code: str) -> str:
-    old_stdout = sys.stdout
-    sys.stdout = StringIO()
-    try:
-        exec(code, {"__builtins__": __builtins__})
-        output = sys.stdout.getvalue()
-    except Exception as e:
-        output = f"Error: {e}"
-    finally:
-        sys.stdout = old_stdout
+    output = get_python_pool().run(code)
     return output.strip() or "Code executed with no printed output."
 
 execute_python_tool = FunctionTool.from_defaults(
     fn=execute_python_fn,
+    async_fn=run_in_thread(execute_python_fn),
     name="execute_python",
-    description="Executes Python code and returns the printed output. "
+    description="Executes Python code in an isolated worker process and returns the printed output. "
     "Use this for complex calculations, data manipulation, or logic that other tools cannot handle. "
-    "Always use print() to output the result.",
+    "Always use print() to output the result. numpy, pandas and math are available; "
+    "each call starts with fresh variables and is stopped after a timeout.",
 )
 
 
 ##### YouTube transcript tool #####
 
-from youtube_transcript_api import YouTubeTranscriptApi
 import re
+from youtube_store import load_transcript, query_transcript
 
-def get_youtube_transcript_fn(url: str) -> str:
-    match = re.search(r"(?:v=|youtu\.be/)([A-Za-z0-9_-]{11})", url)
+@budgeted("text")
+def get_youtube_transcript_fn(url: str, keyword: str | None = None, start_time: str | None = None,
+                              end_time: str | None = None) -> str:
+    match = re.search(r"(?:v=|youtu\.be/|shorts/)([A-Za-z0-9_-]{11})", url)
     if not match:
         return f"Could not extract video ID from URL: {url}"
     video_id = match.group(1)
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        return " ".join([t["text"] for t in transcript])
+        transcript = load_transcript(video_id)
     except Exception as e:
         return f"Could not retrieve transcript: {e}"
+    return query_transcript(transcript, keyword=keyword, start_time=start_time, end_time=end_time)
 
 youtube_transcript_tool = FunctionTool.from_defaults(
     fn=get_youtube_transcript_fn,
+    async_fn=run_in_thread(get_youtube_transcript_fn),
     name="get_youtube_transcript",
-    description="Fetches the transcript/subtitles of a YouTube video given its URL. "
-    "Use this whenever a question references a YouTube video link.",
+    description="Fetches the timestamped transcript/subtitles of a YouTube video given its URL. "
+    "Use this whenever a question references a YouTube video link. "
+    "Pass keyword to only get the segments mentioning it, and/or start_time and end_time "
+    "(seconds or mm:ss, e.g. '3:00' to '4:00') to only get that part of the video.",
+)
+
+
+##### Full text of compacted tool outputs #####
+
+get_full_output_tool = FunctionTool.from_defaults(
+    fn=get_full_output,
+    name="get_full_output",
+    description="Long tool outputs are compacted to fit the context and end with a note giving a handle. "
+    "Pass that handle to read the full output, a page at a time: offset is the character to start at "
+    "and length the number of characters to return.",
 )
@@ -0,0 +1,247 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.llm import LLMChatEndEvent, LLMChatStartEvent
+from llama_index.core.tools import FunctionTool
+
+TRACE_PATH = os.getenv("GAIA_TRACE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gaia_trace.jsonl"))
+# USD per million (input, output) tokens
+MODEL_PRICES_PER_MTOK = {"claude-haiku-4-5-20251001": (1.0, 5.0)}
+DEFAULT_MODEL = "claude-haiku-4-5-20251001"
+
+_current_trace = contextvars.ContextVar("gaia_question_trace", default=None)
+_summaries = {}  # task_id -> summed summaries, only while a task_summary block is open
+_summaries_lock = threading.Lock()
+_file_lock = threading.Lock()
+
+
+##### Per-question trace #####
+
+class QuestionTrace:
+    """Collects LLM and tool spans of one agent run."""
+
+    def __init__(self, task_id: str | None, model: str = DEFAULT_MODEL):
+        self.task_id = task_id
+        self.model = model
+        self.start = time.time()
+        self.spans = []
+        self.pending_llm_starts = deque()
+        self._lock = threading.Lock()
+
+    def add_span(self, kind: str, name: str, start: float, end: float, input_bytes: int = 0, output_bytes: int = 0,
+                 input_tokens: int = 0, output_tokens: int = 0, error: str | None = None):
+        span = {
+            "task_id": self.task_id, "kind": kind, "name": name, "start": start, "end": end,
+            "duration": end - start, "input_bytes": input_bytes, "output_bytes": output_bytes,
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "error": error,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def llm_calls(self) -> int:
+        with self._lock:
+            return sum(1 for s in self.spans if s["kind"] == "llm") + len(self.pending_llm_starts)
+
+    def summary(self, end: float) -> dict:
+        llm = [s for s in self.spans if s["kind"] == "llm"]
+        tools = [s for s in self.spans if s["kind"] == "tool"]
+        input_tokens = sum(s["input_tokens"] for s in llm)
+        output_tokens = sum(s["output_tokens"] for s in llm)
+        price_in, price_out = MODEL_PRICES_PER_MTOK.get(self.model, (0.0, 0.0))
+        return {
+            "latency": end - self.start,
+            "llm_calls": len(llm),
+            "llm_seconds": sum(s["duration"] for s in llm),
+            "tool_calls": len(tools),
+            "tool_seconds": sum(s["duration"] for s in tools),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": (input_tokens * price_in + output_tokens * price_out) / 1_000_000,
+            "errors": sum(1 for s in self.spans if s["error"]),
+        }
+
+
+def current_trace() -> QuestionTrace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def question_trace(task_id: str | None, path: str | None = TRACE_PATH):
+    """Traces everything the agent does inside the block; spans are appended to `path` on exit."""
+    trace = QuestionTrace(task_id)
+    token = _current_trace.set(trace)
+    error = None
+    try:
+        yield trace
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_trace.reset(token)
+        end = time.time()
+        while trace.pending_llm_starts:
+            start, input_bytes = trace.pending_llm_starts.popleft()
+            trace.add_span("llm", trace.model, start, end, input_bytes=input_bytes, error="did not complete")
+        summary = trace.summary(end)
+        _add_to_task_summary(task_id, summary)
+        if path:
+            question_span = {"task_id": task_id, "kind": "question", "name": "question", "start": trace.start,
+                             "end": end, "duration": end - trace.start, "error": error, **summary}
+            with _file_lock, open(path, "a", encoding="utf-8") as f:
+                for span in [*trace.spans, question_span]:
+                    f.write(json.dumps(span, default=str) + "\n")
+
+
+def current_step():
+    """Identifies the agent step being executed: (question, LLM calls so far), or None outside a question."""
+    trace = current_trace()
+    return None if trace is None else (trace.task_id, trace.start, trace.llm_calls())
+
+
+def _add_to_task_summary(task_id: str | None, summary: dict):
+    with _summaries_lock:
+        total = _summaries.get(task_id)
+        if total is not None:
+            for key, value in summary.items():
+                total[key] = total.get(key, 0) + value
+            total["attempts"] = total.get("attempts", 0) + 1
+
+
+@contextmanager
+def task_summary(task_id: str | None):
+    """
+    Yields a dict that sums the summaries of every question trace of `task_id` inside the block,
+    so failed attempts count towards latency and cost. Nothing is kept once the block exits.
+    """
+    summary = {}
+    with _summaries_lock:
+        _summaries[task_id] = summary
+    try:
+        yield summary
+    finally:
+        with _summaries_lock:
+            _summaries.pop(task_id, None)
+
+
+##### Tool instrumentation #####
+
+def _payload_size(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+def instrument_tool(tool: FunctionTool) -> FunctionTool:
+    """Returns a copy of `tool` whose sync and async functions record a span per call."""
+    name = tool.metadata.name
+
+    def _record(start: float, kwargs: dict, result=None, error: Exception | None = None):
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span("tool", name, start, time.time(), input_bytes=_payload_size(kwargs),
+                           output_bytes=_payload_size(result) if error is None else 0,
+                           error=f"{type(error).__name__}: {error}" if error else None)
+
+    sync_fn, async_fn = tool.fn, tool.async_fn
+
+    @functools.wraps(sync_fn)
+    def traced_fn(*args, **kwargs):
+        start = time.time()
+        try:
+            result = sync_fn(*args, **kwargs)
+        except Exception as e:
+            _record(start, kwargs, error=e)
+            raise
+        _record(start, kwargs, result)
+        return result
+
+    @functools.wraps(async_fn)
+    async def traced_async_fn(*args, **kwargs):
+        start = time.time()
+        try:
+            result = await async_fn(*args, **kwargs)
+        except Exception as e:
+            _record(start, kwargs, error=e)
+            raise
+        _record(start, kwargs, result)
+        return result
+
+    return FunctionTool.from_defaults(fn=traced_fn, async_fn=traced_async_fn, tool_metadata=tool.metadata)
+
+
+##### LLM instrumentation (llama_index instrumentation events) #####
+
+def _token_counts(response) -> tuple[int, int]:
+    counts = getattr(response, "additional_kwargs", None) or {}
+    if "prompt_tokens" in counts:
+        return int(counts.get("prompt_tokens") or 0), int(counts.get("completion_tokens") or 0)
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+    return int(getattr(usage, "input_tokens", 0) or 0), int(getattr(usage, "output_tokens", 0) or 0)
+
+
+class LLMSpanHandler(BaseEventHandler):
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMSpanHandler"
+
+    def handle(self, event, **kwargs):
+        trace = current_trace()
+        if trace is None:
+            return
+        if isinstance(event, LLMChatStartEvent):
+            input_bytes = sum(len(str(m.content or "")) for m in event.messages)
+            trace.pending_llm_starts.append((time.time(), input_bytes))
+        elif isinstance(event, LLMChatEndEvent) and trace.pending_llm_starts:
+            start, input_bytes = trace.pending_llm_starts.popleft()
+            response = event.response
+            output_bytes = len(str(response.message.content or "")) if response is not None else 0
+            input_tokens, output_tokens = _token_counts(response)
+            trace.add_span("llm", trace.model, start, time.time(), input_bytes=input_bytes, output_bytes=output_bytes,
+                           input_tokens=input_tokens, output_tokens=output_tokens,
+                           error=None if response is not None else "no response")
+
+
+_llm_handler = None
+
+
+def install_llm_instrumentation():
+    """Registers the LLM span handler on the root llama_index dispatcher (once per process)."""
+    global _llm_handler
+    if _llm_handler is None:
+        _llm_handler = LLMSpanHandler()
+        get_dispatcher().add_event_handler(_llm_handler)
+
+
+##### Aggregation #####
+
+def aggregate_trace(path: str = TRACE_PATH):
+    """Returns p50/p95/p99 latency per LLM model and tool from a JSONL trace file."""
+    import pandas as pd
+
+    spans = pd.read_json(path, lines=True)
+    spans = spans[spans["kind"].isin(["llm", "tool", "question"])]
+    grouped = spans.groupby(["kind", "name"])["duration"]
+    table = grouped.quantile([0.5, 0.95, 0.99]).unstack()
+    table.columns = ["p50", "p95", "p99"]
+    table.insert(0, "calls", grouped.size())
+    table["errors"] = spans.groupby(["kind", "name"])["error"].apply(lambda e: e.notna().sum())
+    return table
+
+
+if __name__ == "__main__":
+    print(aggregate_trace(sys.argv[1] if len(sys.argv) > 1 else TRACE_PATH).round(3).to_string())
@@ -0,0 +1,177 @@
+import os
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+import cassette
+from attachments import ATTACHMENT_CACHE_DIR
+
+TRANSCRIPT_DIR = os.path.join(ATTACHMENT_CACHE_DIR, "youtube")
+MAX_FULL_TRANSCRIPT_CHARS = 15000
+CONTEXT_SEGMENTS = 1            # neighbouring segments returned around a keyword hit
+TIMESTAMP_EVERY_SECONDS = 30    # timestamp granularity when returning the whole transcript
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+_fetch_locks = defaultdict(threading.Lock)  # video id -> lock, so different videos download in parallel
+_fetch_locks_guard = threading.Lock()
+
+
+def _tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_time(value) -> float:
+    """Parses seconds ("185"), "mm:ss" or "hh:mm:ss" into seconds; raises ValueError otherwise."""
+    parts = str(value).strip().split(":")
+    if len(parts) > 3:
+        raise ValueError(f"invalid time '{value}'")
+    seconds = 0.0
+    for part in parts:
+        try:
+            number = float(part)
+        except ValueError:
+            number = float("nan")
+        if not 0 <= number < float("inf"):
+            raise ValueError(f"invalid time '{value}'")
+        seconds = seconds * 60 + number
+    return seconds
+
+
+def format_time(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+##### Compact on-disk segment store #####
+
+class Transcript:
+    """Timestamped segments of one video plus an inverted index from token to segment ids."""
+
+    def __init__(self, starts: np.ndarray, durations: np.ndarray, texts: list[str]):
+        self.starts = starts
+        self.durations = durations
+        self.texts = texts
+        postings = defaultdict(list)
+        for i, text in enumerate(texts):
+            for token in set(_tokenize(text)):
+                postings[token].append(i)
+        self.index = {token: np.array(ids, dtype=np.int32) for token, ids in postings.items()}
+
+    def line(self, i: int) -> str:
+        return f"[{format_time(self.starts[i])}] {self.texts[i]}"
+
+    def search(self, keyword: str) -> np.ndarray:
+        """Segment ids containing every keyword token, falling back to any token."""
+        postings = [self.index.get(token, np.empty(0, dtype=np.int32)) for token in _tokenize(keyword)]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        hits = postings[0]
+        for ids in postings[1:]:
+            hits = np.intersect1d(hits, ids)
+        if len(hits) == 0:
+            hits = np.unique(np.concatenate(postings))
+        return hits
+
+    def window(self, start: float | None, end: float | None) -> np.ndarray:
+        ends = self.starts + self.durations
+        first = 0 if start is None else int(np.searchsorted(ends, start, side="right"))
+        last = len(self.starts) if end is None else int(np.searchsorted(self.starts, end, side="left"))
+        return np.arange(first, last, dtype=np.int32)
+
+
+def _transcript_path(video_id: str) -> str:
+    return os.path.join(TRANSCRIPT_DIR, f"{video_id}.npz")
+
+
+@cassette.replayable("youtube_transcript")
+def _fetch_segments(video_id: str) -> list[dict]:
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    if hasattr(YouTubeTranscriptApi, "get_transcript"):
+        return YouTubeTranscriptApi.get_transcript(video_id)
+    return YouTubeTranscriptApi().fetch(video_id).to_raw_data()  # youtube-transcript-api >= 1.0
+
+
+@lru_cache(maxsize=32)
+def load_transcript(video_id: str) -> Transcript:
+    """Returns the transcript for `video_id`, fetching it from YouTube only the first time."""
+    path = _transcript_path(video_id)
+    with _fetch_locks_guard:
+        fetch_lock = _fetch_locks[video_id]
+    with fetch_lock:
+        if not os.path.exists(path):
+            segments = _fetch_segments(video_id)
+            texts = [" ".join(s["text"].split()) for s in segments]
+            os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+            tmp_path = path + ".tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                starts=np.array([s["start"] for s in segments], dtype=np.float32),
+                durations=np.array([s.get("duration", 0.0) for s in segments], dtype=np.float32),
+                texts=np.array(texts, dtype=np.str_),
+            )
+            os.replace(tmp_path, path)
+
+    with np.load(path) as data:
+        return Transcript(data["starts"], data["durations"], data["texts"].tolist())
+
+
+##### Query #####
+
+def query_transcript(transcript: Transcript, keyword: str | None = None, start_time=None, end_time=None) -> str:
+    n = len(transcript.texts)
+    if n == 0:
+        return "The transcript is empty."
+
+    selected = None
+    if start_time is not None or end_time is not None:
+        try:
+            start = parse_time(start_time) if start_time is not None else None
+            end = parse_time(end_time) if end_time is not None else None
+        except ValueError as e:
+            return f"Could not read the time window: {e}. Use seconds, mm:ss or hh:mm:ss."
+        selected = transcript.window(start, end)
+    if keyword:
+        hits = transcript.search(keyword)
+        if selected is not None:
+            hits = np.intersect1d(hits, selected)
+        if len(hits) == 0:
+            return f"No segments mention '{keyword}'."
+        around = (hits[:, None] + np.arange(-CONTEXT_SEGMENTS, CONTEXT_SEGMENTS + 1)).ravel()
+        selected = np.unique(np.clip(around, 0, n - 1))
+
+    if selected is not None:
+        if len(selected) == 0:
+            return "No transcript segments in that time window."
+        lines = []
+        previous = None
+        for i in selected:
+            if previous is not None and i != previous + 1:
+                lines.append("...")
+            lines.append(transcript.line(i))
+            previous = i
+        return "\n".join(lines)
+
+    # whole transcript: prose with a timestamp every TIMESTAMP_EVERY_SECONDS
+    parts = []
+    next_stamp = 0.0
+    used = 0
+    for i in range(n):
+        piece = transcript.texts[i]
+        if transcript.starts[i] >= next_stamp:
+            piece = f"\n[{format_time(transcript.starts[i])}] {piece}"
+            next_stamp = transcript.starts[i] + TIMESTAMP_EVERY_SECONDS
+        if used + len(piece) > MAX_FULL_TRANSCRIPT_CHARS:
+            parts.append(
+                f"\n[Truncated at {format_time(transcript.starts[i])} of {format_time(transcript.starts[-1])}. "
+                f"Pass start_time/end_time or keyword to read a specific part.]"
+            )
+            break
+        parts.append(piece)
+        used += len(piece) + 1
+    return " ".join(parts).strip()